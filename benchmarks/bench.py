@@ -0,0 +1,183 @@
+"""Benchmarks for building, transforming and aligning de Bruijn graphs.
+
+Every case is run over a grid of sizes (number of sequences, sequence length,
+divergence, k and the number of tandem repeats). The best wall time of a few repeats and the peak traced memory
+are recorded, and the results can be compared against a stored baseline:
+
+    python benchmarks/bench.py                                 # quick grid, compare with baseline.json
+    python benchmarks/bench.py --grid full --output out.json
+    python benchmarks/bench.py --save-baseline                 # refresh baseline.json
+
+The exit status is 1 when any case is slower or larger than the baseline by more
+than the tolerance.
+"""
+import argparse
+import gc
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import dbg_align
+from dbg_align import AlignmentMethod, AlignmentPlanner, DeBruijnGraph, MockAlignmentPlugin, PluginCostAlignment
+from dbg_align.synthetic import generate
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+GRIDS = {
+    "quick": {"n_sequences": [3, 8], "length": [200, 1000], "divergence": [0.02], "k": [11], "repeats": [0, 4]},
+    "full": {"n_sequences": [3, 8, 20], "length": [200, 1000, 5000], "divergence": [0.01, 0.05], "k": [11, 21], "repeats": [0, 8]},
+}
+
+
+def make_sequences(n_sequences: int, length: int, divergence: float, k: int, repeats: int = 0, seed: int = 0) -> Dict[str, str]:
+    """Returns related random sequences, substitutions and 1-3 base indels make up the divergence.
+
+    Without `repeats` the sequences are drawn without repeated kmers. Otherwise that
+    many tandem repeats, a 3 base unit copied 6 times, are planted in the ancestor, so
+    the de Bruijn graph has cycle edges and the partial order graph splits kmers that
+    sequences enter at different phases.
+    """
+    return generate(n_sequences, length, kmer_length=k, snp_rate=divergence * 0.8, indel_rate=divergence * 0.2,
+                    tandem_repeats=repeats, seed=seed).sequences
+
+
+def _graph(params) -> DeBruijnGraph:
+    dbg = DeBruijnGraph(params["k"])
+    dbg.add_sequence(make_sequences(**params))
+    return dbg
+
+
+# each case takes the grid parameters and returns the function to time, setup is not timed
+def case_add_sequence(params) -> Callable:
+    sequences = make_sequences(**params)
+    def run():
+        DeBruijnGraph(params["k"]).add_sequence(sequences)
+    return run
+
+def case_getitem(params) -> Callable:
+    dbg = _graph(params)
+    return lambda: [dbg[index] for index in range(1, len(dbg) + 1)]
+
+def case_to_pog(params) -> Callable:
+    dbg = _graph(params)
+    return dbg.to_pog
+
+def case_bubbles(params) -> Callable:
+    pog = _graph(params).to_pog()
+    return pog.bubbles
+
+def case_buffer_mock(params) -> Callable:
+    planner = AlignmentPlanner(_graph(params).to_pog())
+    return lambda: planner.execute(MockAlignmentPlugin(), AlignmentMethod.DEBRUIJNGRAPH)
+
+def case_buffer_cost(params) -> Callable:
+    planner = AlignmentPlanner(_graph(params).to_pog())
+    return lambda: planner.execute(PluginCostAlignment(), AlignmentMethod.DEBRUIJNGRAPH)
+
+CASES = {
+    "add_sequence": case_add_sequence,
+    "getitem": case_getitem,
+    "to_pog": case_to_pog,
+    "bubbles": case_bubbles,
+    "buffer_mock": case_buffer_mock,
+    "buffer_cost": case_buffer_cost,
+}
+
+
+def measure(run: Callable, repeats: int = 3) -> Tuple[float, int]:
+    """Returns the best wall time of `repeats` runs and the peak memory of one traced run."""
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def case_key(name: str, params: dict) -> str:
+    return name + "[" + ",".join(f"{key}={params[key]}" for key in sorted(params)) + "]"
+
+
+def run(grid: Dict[str, list], cases: List[str] = None, repeats: int = 3, log: Callable = None) -> Dict[str, dict]:
+    """Runs every case over every combination of the grid, keyed by case and parameters."""
+    results = {}
+    keys = sorted(grid)
+    for name in cases or CASES:
+        for values in itertools.product(*(grid[key] for key in keys)):
+            params = dict(zip(keys, values))
+            seconds, memory = measure(CASES[name](params), repeats)
+            key = case_key(name, params)
+            results[key] = {"seconds": seconds, "memory": memory}
+            if log:
+                log(f"{key:<70} {seconds * 1000:10.2f} ms {memory / 1024:10.1f} KiB")
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float = 0.5, noise: Dict[str, float] = None) -> List[str]:
+    """Returns a description of every result more than `tolerance` above its baseline.
+
+    Differences below `noise` (2 ms and 4 KiB by default) are ignored, timer jitter
+    dominates the smallest cases.
+    """
+    noise = noise or {"seconds": 0.002, "memory": 4096}
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric in ("seconds", "memory"):
+            if result[metric] > reference[metric] * (1 + tolerance) and result[metric] - reference[metric] > noise[metric]:
+                regressions.append(f"{key} {metric}: {result[metric]:.4g} against {reference[metric]:.4g}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grid", choices=sorted(GRIDS), default="quick")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="run only these cases")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed fractional slowdown or growth")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = run(GRIDS[args.grid], args.case, args.repeats, log=print)
+    document = {
+        "version": dbg_align.__version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(document, indent=2))
+    if args.save_baseline:
+        if args.baseline.exists(): # keep the cases of other grids
+            stored = json.loads(args.baseline.read_text())
+            document["results"] = {**stored["results"], **results}
+        args.baseline.write_text(json.dumps(document, indent=2))
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, nothing to compare")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text())["results"], args.tolerance)
+    for regression in regressions:
+        print("REGRESSION", regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
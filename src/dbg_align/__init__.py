@@ -1,19 +1,103 @@
-"""dbg_align: A package for aligning sequences using de Bruijn graphs."""
-
-from .debruijngraph import DeBruijnGraph
-from .dbg_edge import DBGEdge
-from .dbg_node import DBGNode
-from .utils import display_mermaid_in_jupyter, display_graphviz
-from .partialordergraph import PartialOrderGraph
-from .pog_node import POG_Node
-from .pog_bubble import POG_Bubble
-from .alignment_operation import AlignmentOperation
-from .composite_alignment import CompositeAlignment
-from .alignment import AlignmentPlugin, MockAlignmentPlugin
-from .allignment_buffer import AlignmentBuffer
-from .mock_alignment import MockAlignmentPlugin
-from .alignment_cost_plugin import PluginCostAlignment
-from .constants import AlignmentMethod
+"""dbg_align: A package for aligning sequences using de Bruijn graphs.
+
+Names are loaded lazily: `import dbg_align` only sets up the table below, and each
+submodule (with cogent3, numpy, graphviz or IPython behind it) is imported the first
+time one of its names is used.
+"""
+import importlib
+from typing import TYPE_CHECKING
 
 __version__ = "0.1.0"
 __author__ = "Richard Morris"
+
+# exported name -> submodule that defines it
+_EXPORTS = {
+    "DeBruijnGraph": "debruijngraph",
+    "SparseDeBruijnGraph": "sparse_debruijngraph",
+    "DiskDeBruijnGraph": "disk_debruijngraph",
+    "FilteredDeBruijnGraph": "filtered_debruijngraph",
+    "CountMinSketch": "count_min",
+    "DBGEdge": "dbg_edge",
+    "DBGNode": "dbg_node",
+    "display_mermaid_in_jupyter": "utils",
+    "display_graphviz": "utils",
+    "PartialOrderGraph": "partialordergraph",
+    "POG_Node": "pog_node",
+    "POG_Bubble": "pog_bubble",
+    "CoordinateIndex": "coordinate_index",
+    "Region": "subgraph",
+    "AlignmentOperation": "alignment_operation",
+    "CompositeAlignment": "composite_alignment",
+    "Profile": "profile",
+    "AlignmentPlugin": "alignment",
+    "AlignmentBuffer": "allignment_buffer",
+    "MockAlignmentPlugin": "mock_alignment",
+    "PluginCostAlignment": "alignment_cost_plugin",
+    "BandedAlignmentPlugin": "banded_alignment",
+    "PartialOrderAligner": "poa",
+    "GraphAlignment": "poa",
+    "AlignmentMethod": "constants",
+    "MemoryBudgetExceeded": "memory",
+    "MemoryUsage": "memory",
+    "MergeOrderOptimizer": "merge_order",
+    "MergePlan": "merge_order",
+    "AlignmentPlanner": "planner",
+    "PlanBudget": "planner",
+    "AlignmentBlock": "planner",
+    "SequenceClusterer": "minhash",
+    "SharedGraph": "shared_graph",
+    "GraphStats": "graph_stats",
+}
+
+# submodules reachable as attributes of the package without an explicit import
+_SUBMODULES = {"cli", "instrumentation", "export", "streaming", "synthetic", "utils"}
+
+__all__ = [*_EXPORTS, *sorted(_SUBMODULES)]
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *__all__})
+
+
+if TYPE_CHECKING:
+    from .debruijngraph import DeBruijnGraph
+    from .sparse_debruijngraph import SparseDeBruijnGraph
+    from .disk_debruijngraph import DiskDeBruijnGraph
+    from .filtered_debruijngraph import FilteredDeBruijnGraph
+    from .count_min import CountMinSketch
+    from .dbg_edge import DBGEdge
+    from .dbg_node import DBGNode
+    from .utils import display_mermaid_in_jupyter, display_graphviz
+    from .partialordergraph import PartialOrderGraph
+    from .pog_node import POG_Node
+    from .pog_bubble import POG_Bubble
+    from .coordinate_index import CoordinateIndex
+    from .subgraph import Region
+    from .alignment_operation import AlignmentOperation
+    from .composite_alignment import CompositeAlignment
+    from .profile import Profile
+    from .alignment import AlignmentPlugin
+    from .allignment_buffer import AlignmentBuffer
+    from .mock_alignment import MockAlignmentPlugin
+    from .alignment_cost_plugin import PluginCostAlignment
+    from .banded_alignment import BandedAlignmentPlugin
+    from .poa import PartialOrderAligner, GraphAlignment
+    from .constants import AlignmentMethod
+    from .memory import MemoryBudgetExceeded, MemoryUsage
+    from . import cli, instrumentation, export, streaming, synthetic, utils
+    from .merge_order import MergeOrderOptimizer, MergePlan
+    from .planner import AlignmentPlanner, PlanBudget, AlignmentBlock
+    from .minhash import SequenceClusterer
+    from .shared_graph import SharedGraph
+    from .graph_stats import GraphStats
@@ -7,6 +7,17 @@ from .composite_alignment import CompositeAlignment
 from abc import ABC, abstractmethod
 
 class AlignmentPlugin(ABC):
+    def configuration(self) -> dict:
+        """The settings that change the plugin's results, plugins with settings override this."""
+        return {}
+
+    def fingerprint(self) -> str:
+        """Identifies the plugin type and configuration, results are only reused by a plugin with the same fingerprint."""
+        import hashlib
+        import json
+        description = {"plugin": f"{type(self).__module__}.{type(self).__qualname__}", "configuration": self.configuration()}
+        return hashlib.sha1(json.dumps(description, sort_keys=True, default=repr).encode()).hexdigest()
+
     @abstractmethod
     def align_sequences(self, seq1: str, seq2: str) -> Any:
         """
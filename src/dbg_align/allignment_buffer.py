@@ -3,13 +3,29 @@ from .composite_alignment import AlignmentOperation, CompositeAlignment
 from .alignment import AlignmentPlugin
 from .alignment_operation import AlignmentOperation
 from functools import singledispatch
+from . import instrumentation
 
 class AlignmentBuffer:
-    def __init__(self, alignment_plugin: callable):
+    """Runs alignment operations through a plugin and keeps their results by index.
+
+    With a `checkpoint` directory every completed operation and its result are appended
+    to an on disk log (flushed every `checkpoint_interval` seconds). A buffer opened on
+    an existing checkpoint, with a plugin of the same fingerprint, takes the results
+    of the operations recorded there instead of running them again, so rerunning an
+    interrupted plan resumes where it stopped. `resumed` counts the operations reused.
+    """
+    def __init__(self, alignment_plugin: callable, checkpoint: Union[str, "Path"] = None, checkpoint_interval: float = 5.0):
         self.alignment_plugin: AlignmentPlugin = alignment_plugin
         self.operations: list = []
         self.results: Dict[int, Any] = {}
         self.next_index: int = 0
+        self.checkpoint = None
+        self.resumed = 0
+        self._position = 0 # operations run since the buffer was made, clear() does not reset it
+        self._keys: Dict[int, str] = {} # result index -> checkpoint digest of the operation behind it
+        if checkpoint is not None:
+            from .checkpoint import Checkpoint
+            self.checkpoint = Checkpoint(checkpoint, alignment_plugin.fingerprint(), checkpoint_interval)
 
     def add_alignment(self, *args: Any) -> int:
         methods = {
@@ -24,40 +40,49 @@ class AlignmentBuffer:
             return methods[arg_types](*args)
         else:
             raise NotImplementedError("Unsupported argument types.")        
-    def add_sequences(self, seq1: str, seq2: str) -> int:
-        self.operations.append((AlignmentOperation.SEQUENCE_SEQUENCE, seq1, seq2))
-        result = self.alignment_plugin.align_sequences(seq1, seq2)
+
+    def _run(self, operation: tuple, align: callable, *args: Any) -> int:
+        self.operations.append(operation)
+        position = self._position
+        self._position += 1
+        key = None
+        if self.checkpoint is not None:
+            from .checkpoint import digest
+            # profiles are named by the digest of the operation that made them, not by their index
+            key = digest(operation[0].name, tuple(self._keys.get(arg, arg) if isinstance(arg, int) else arg for arg in operation[1:]))
+        if key is not None and position in self.checkpoint:
+            result = self.checkpoint.load(position, key)
+            self.resumed += 1
+        else:
+            with instrumentation.timer(f"plugin.{operation[0].name}"):
+                result = align(*args)
+            if key is not None:
+                self.checkpoint.record(position, key, result)
         self.results[self.next_index] = result
+        if key is not None:
+            self._keys[self.next_index] = key
         current_index = self.next_index
         self.next_index += 1
         return current_index
 
+    def add_sequences(self, seq1: str, seq2: str) -> int:
+        return self._run((AlignmentOperation.SEQUENCE_SEQUENCE, seq1, seq2), self.alignment_plugin.align_sequences, seq1, seq2)
+
     def add_sequence_to_profile(self, seq: str, profile_index: int) -> int:
-        self.operations.append((AlignmentOperation.SEQUENCE_PROFILE, seq, profile_index))
-        result = self.alignment_plugin.align_sequence_to_profile(seq, self.results[profile_index])
-        self.results[self.next_index] = result
-        current_index = self.next_index
-        self.next_index += 1
-        return current_index
+        return self._run((AlignmentOperation.SEQUENCE_PROFILE, seq, profile_index),
+                         self.alignment_plugin.align_sequence_to_profile, seq, self.results[profile_index])
 
     def add_profile_to_sequence(self, profile_index: int, seq: str) -> int:
-        self.operations.append((AlignmentOperation.SEQUENCE_PROFILE, profile_index, seq))
-        result = self.alignment_plugin.align_sequence_to_profile(seq, self.results[profile_index])
-        self.results[self.next_index] = result
-        current_index = self.next_index
-        self.next_index += 1
-        return current_index
+        return self._run((AlignmentOperation.SEQUENCE_PROFILE, profile_index, seq),
+                         self.alignment_plugin.align_sequence_to_profile, seq, self.results[profile_index])
 
     def add_profiles(self, profile_index1: int, profile_index2: int) -> int:
-        self.operations.append((AlignmentOperation.PROFILE_PROFILE, profile_index1, profile_index2))
-        result = self.alignment_plugin.align_profiles(self.results[profile_index1], self.results[profile_index2])
-        self.results[self.next_index] = result
-        current_index = self.next_index
-        self.next_index += 1
-        return current_index
+        return self._run((AlignmentOperation.PROFILE_PROFILE, profile_index1, profile_index2),
+                         self.alignment_plugin.align_profiles, self.results[profile_index1], self.results[profile_index2])
 
     def concatenate(self, elements: list) -> int:
-        result = self.alignment_plugin.concatenate([self.results[e] if isinstance(e, int) else e for e in elements])
+        with instrumentation.timer("plugin.concatenate"):
+            result = self.alignment_plugin.concatenate([self.results[e] if isinstance(e, int) else e for e in elements])
         self.results[self.next_index] = result
         current_index = self.next_index
         self.next_index += 1
@@ -91,4 +116,16 @@ class AlignmentBuffer:
         self.operations = []
         self.results = {}
         self.next_index = 0
+        self._keys = {}
+
+    def close(self) -> None:
+        """Flushes and closes the checkpoint, if there is one."""
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
@@ -0,0 +1,189 @@
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from .alignment import AlignmentPlugin
+from .alignment_operation import AlignmentOperation
+from .composite_alignment import CompositeAlignment
+from .profile import Profile
+
+
+def _as_profile(element: Union[str, CompositeAlignment, Profile]) -> Profile:
+    """Converts a sequence or composite alignment into a Profile."""
+    if isinstance(element, Profile):
+        return element
+    if isinstance(element, str):
+        return Profile([element])
+    return element.to_profile()
+
+
+class BandedAlignmentPlugin(AlignmentPlugin):
+    """Global alignment restricted to a diagonal band of the DP matrix.
+
+    Alternatives inside a POG bubble sit between shared k-mer anchors, so they rarely
+    drift far from the diagonal. Unless `band` is given, the band half-width is the
+    length spread of the bubble being aligned, which AlignmentPlanner passes to
+    `band_from_bubble` before each step, and it is doubled whenever the
+    optimal path touches the edge of the band. With `exact` set the band is also
+    doubled until the banded score beats the best score any path leaving the band
+    could reach, so results score the same as a full alignment.
+
+    Profiles are exchanged as `Profile` objects, composites of equal length gapped
+    rows are accepted as input too.
+    """
+    def __init__(self, band: int = None, padding: int = 2, match: float = 1.0, mismatch: float = -1.0, gap: float = -2.0, exact: bool = True):
+        self.band = band
+        self.bubble_band = None
+        self.padding = padding
+        self.exact = exact
+        self.match = match
+        self.mismatch = mismatch
+        self.gap = gap
+        self.records: list = []
+        self.cells_computed = 0
+        self.cells_full = 0
+        self.widenings = 0
+
+    def configuration(self) -> dict:
+        settings = {"padding": self.padding, "match": self.match, "mismatch": self.mismatch, "gap": self.gap, "exact": self.exact}
+        if not self.exact: # exact results do not depend on the starting band
+            settings["band"] = self.band
+        return settings
+
+    @property
+    def cells_saved(self) -> int:
+        """Number of DP cells that were not computed compared with full alignments."""
+        return self.cells_full - self.cells_computed
+
+    def band_from_bubble(self, bubble: Optional["POG_Bubble"]) -> int:
+        """Sets the band half-width of the next alignments from the spread of branch lengths in a bubble.
+
+        A band given to the constructor takes precedence, None clears the bubble's band
+        for alignments outside bubbles. Returns the band half-width in use.
+        """
+        self.bubble_band = bubble.length_spread() if bubble is not None else None
+        return self.band if self.band is not None else (self.bubble_band or 0)
+
+    def align_sequences(self, seq1: str, seq2: str) -> Profile:
+        profile, band, cells = self._align(_as_profile(seq1), _as_profile(seq2))
+        self.records.append((AlignmentOperation.SEQUENCE_SEQUENCE, seq1, seq2, band, cells))
+        return profile
+
+    def align_sequence_to_profile(self, seq: str, profile: Profile) -> Profile:
+        result, band, cells = self._align(_as_profile(seq), _as_profile(profile))
+        self.records.append((AlignmentOperation.SEQUENCE_PROFILE, seq, profile, band, cells))
+        return result
+
+    def align_profiles(self, profile1: Profile, profile2: Profile) -> Profile:
+        profile, band, cells = self._align(_as_profile(profile1), _as_profile(profile2))
+        self.records.append((AlignmentOperation.PROFILE_PROFILE, profile1, profile2, band, cells))
+        return profile
+
+    def concatenate(self, elements: List[Union[str, Profile]]) -> Profile:
+        # conserved fragments are shared by every row
+        profile = Profile.concatenate([e if isinstance(e, str) else _as_profile(e) for e in elements])
+        self.records.append(('concatenate', elements))
+        return profile
+
+    def get_records(self) -> list:
+        return self.records
+
+    def _align(self, profile_a: Profile, profile_b: Profile) -> Tuple[Profile, int, int]:
+        n, m = profile_a.width, profile_b.width
+        self.cells_full += (n + 1) * (m + 1)
+        substitution = profile_a.substitution_matrix(self.match, self.mismatch, self.gap)
+        scored_a = profile_a.frequencies @ substitution
+        freq_b = profile_b.frequencies
+
+        band = max((self.band if self.band is not None else self.bubble_band) or 0, abs(n - m)) + self.padding
+        cells = 0
+        while True:
+            band = min(max(band, 1), max(n, m, 1))
+            matrix, computed = self._fill(scored_a, freq_b, n, m, band)
+            cells += computed
+            path, touches_edge = self._traceback(matrix, scored_a, freq_b, n, m, band)
+            if band >= max(n, m):
+                break
+            if not touches_edge and not (self.exact and matrix[-1][1][-1] < self._outside_band_bound(n, m, band)):
+                break
+            band *= 2
+            self.widenings += 1
+        self.cells_computed += cells
+        return self._gapped_profile(profile_a, profile_b, path), band, cells
+
+    def _outside_band_bound(self, n: int, m: int, band: int) -> float:
+        """Upper bound on the score of any path that leaves a band of the given half-width."""
+        # leaving the band and coming back to the end diagonal costs at least this many gaps
+        gaps = 2 * (band + 1) - abs(n - m)
+        return max(self.match, 0.0) * min(n, m) + self.gap * gaps
+
+    def _fill(self, scored_a: np.ndarray, freq_b: np.ndarray, n: int, m: int, band: int):
+        """Fills the banded DP matrix one row at a time, keeping each row as (first column, scores)."""
+        gap = self.gap
+        matrix = []
+        lo, hi = 0, min(m, band)
+        matrix.append((lo, np.arange(hi + 1) * gap))
+        computed = hi + 1
+        for i in range(1, n + 1):
+            prev_lo, prev = matrix[-1]
+            prev_hi = prev_lo + len(prev) - 1
+            lo, hi = max(0, i - band), min(m, i + band)
+            js = np.arange(lo, hi + 1)
+            pre = np.full(len(js), -np.inf)
+            # vertical move from the previous row (column of a against a gap)
+            up = (js >= prev_lo) & (js <= prev_hi)
+            pre[up] = prev[js[up] - prev_lo] + gap
+            # diagonal move
+            diag = (js >= 1) & (js - 1 >= prev_lo) & (js - 1 <= prev_hi)
+            if diag.any():
+                jd = js[diag]
+                substitution = scored_a[i - 1] @ freq_b[jd - 1].T
+                pre[diag] = np.maximum(pre[diag], prev[jd - 1 - prev_lo] + substitution)
+            # horizontal moves along the row: H[j] = max_k(pre[k] + (j - k) * gap)
+            offset = js * gap
+            row = np.maximum.accumulate(pre - offset) + offset
+            matrix.append((lo, row))
+            computed += len(js)
+        return matrix, computed
+
+    def _traceback(self, matrix, scored_a: np.ndarray, freq_b: np.ndarray, n: int, m: int, band: int):
+        """Returns the alignment path as (a column or -1, b column or -1) pairs and whether it hit the band edge."""
+        def value(i, j):
+            lo, row = matrix[i]
+            if j < lo or j >= lo + len(row):
+                return -np.inf
+            return row[j - lo]
+
+        path = []
+        touches_edge = False
+        i, j = n, m
+        while i > 0 or j > 0:
+            if (j == i + band and j < m) or (j == i - band and j > 0):
+                touches_edge = True
+            current = value(i, j)
+            if i > 0 and j > 0 and np.isclose(current, value(i - 1, j - 1) + scored_a[i - 1] @ freq_b[j - 1]):
+                path.append((i - 1, j - 1))
+                i, j = i - 1, j - 1
+            elif i > 0 and np.isclose(current, value(i - 1, j) + self.gap):
+                path.append((i - 1, -1))
+                i -= 1
+            else:
+                path.append((-1, j - 1))
+                j -= 1
+        path.reverse()
+        return path, touches_edge
+
+    @staticmethod
+    def _gapped_profile(profile_a: Profile, profile_b: Profile, path) -> Profile:
+        columns = np.array(path, dtype=np.int64).reshape(-1, 2)
+        blocks = []
+        for profile, index in ((profile_a, columns[:, 0]), (profile_b, columns[:, 1])):
+            codes = profile.codes
+            gapped = np.full((profile.n_rows, len(index)), profile.gap_code, dtype=np.uint8)
+            present = index >= 0
+            gapped[:, present] = codes[:, index[present]]
+            blocks.append(gapped)
+        names = None
+        if profile_a.names is not None and profile_b.names is not None:
+            names = profile_a.names + profile_b.names
+        return Profile.from_codes(np.concatenate(blocks, axis=0), names, profile_a.alphabet)
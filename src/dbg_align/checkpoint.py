@@ -0,0 +1,130 @@
+"""On disk record of the operations an AlignmentBuffer has completed, so a run can resume.
+
+A checkpoint is a directory holding two append only files:
+
+- `log.jsonl`: a header line with the plugin's fingerprint, then one line per
+  completed operation with its position in the run, a digest of its arguments and
+  where its pickled result lies in the frames file.
+- `frames.pkl`: the pickled results one after another.
+
+Results are written before the log line that points at them, and a log line only
+counts when its frame is complete, so a run killed part way through a write loses
+at most the operations since the last flush. Reopening the directory with a plugin
+of another type or configuration raises ValueError rather than mixing results.
+"""
+import hashlib
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple, Union
+
+
+def digest(operation: str, args: tuple) -> str:
+    """A short digest of an operation and its arguments, the profile arguments are given by the digests of their own operations."""
+    h = hashlib.sha1(operation.encode())
+    for arg in args:
+        h.update(f"|{type(arg).__name__}:".encode())
+        h.update(arg.encode() if isinstance(arg, str) else repr(arg).encode())
+    return h.hexdigest()
+
+
+class Checkpoint:
+    """The log and frames of one run, loaded when the directory already holds a checkpoint.
+
+    `interval` is the number of seconds between flushes to disk, 0 flushes after
+    every operation.
+    """
+    LOG, FRAMES = "log.jsonl", "frames.pkl"
+
+    def __init__(self, path: Union[str, Path], fingerprint: str, interval: float = 5.0):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.interval = interval
+        self.entries: Dict[int, Tuple[str, int, int]] = {} # position -> (digest, frame offset, frame size)
+        self.path.mkdir(parents=True, exist_ok=True)
+        log_end, frames_end = self._load()
+        self._log = open(self.path / self.LOG, "r+b" if log_end else "wb")
+        self._frames = open(self.path / self.FRAMES, "r+b" if frames_end else "wb")
+        # drop anything after the last complete entry, a run cut short may have left half a line or frame
+        self._log.truncate(log_end)
+        self._frames.truncate(frames_end)
+        self._log.seek(log_end)
+        self._frames.seek(frames_end)
+        if not log_end:
+            self._log.write((json.dumps({"fingerprint": fingerprint}) + "\n").encode())
+        self._flushed = time.monotonic()
+        self.flush()
+
+    def _load(self) -> Tuple[int, int]:
+        """Reads the entries of an existing checkpoint, returns the size of the valid part of each file."""
+        log, frames = self.path / self.LOG, self.path / self.FRAMES
+        if not log.exists():
+            return 0, 0
+        frames_size = frames.stat().st_size if frames.exists() else 0
+        log_end = frames_end = 0
+        with open(log, "rb") as handle:
+            for number, line in enumerate(handle):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if number == 0:
+                    if record.get("fingerprint") != self.fingerprint:
+                        raise ValueError(f"Checkpoint {self.path} was made with another plugin or plugin configuration")
+                elif record["offset"] + record["size"] > frames_size:
+                    break
+                else:
+                    self.entries[record["position"]] = (record["digest"], record["offset"], record["size"])
+                    frames_end = record["offset"] + record["size"]
+                log_end += len(line)
+        return log_end, frames_end
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, position: int) -> bool:
+        return position in self.entries
+
+    def load(self, position: int, key: str) -> Any:
+        """Returns the result recorded for the operation at a position of the run.
+
+        Raises ValueError when the operation recorded there had other arguments, the
+        run is then not the one the checkpoint was made for.
+        """
+        recorded, offset, size = self.entries[position]
+        if recorded != key:
+            raise ValueError(f"Operation {position} differs from the one in checkpoint {self.path}")
+        self._frames.flush()
+        with open(self.path / self.FRAMES, "rb") as handle:
+            handle.seek(offset)
+            return pickle.loads(handle.read(size))
+
+    def record(self, position: int, key: str, result: Any):
+        """Appends a completed operation, flushing when the interval has passed."""
+        frame = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        offset = self._frames.tell()
+        self._frames.write(frame)
+        self._log.write((json.dumps({"position": position, "digest": key, "offset": offset, "size": len(frame)}) + "\n").encode())
+        self.entries[position] = (key, offset, len(frame))
+        if time.monotonic() - self._flushed >= self.interval:
+            self.flush()
+
+    def flush(self):
+        # frames first, a log line must never point past the end of the frames file
+        for handle in (self._frames, self._log):
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._flushed = time.monotonic()
+
+    def close(self):
+        if not self._log.closed:
+            self.flush()
+            self._log.close()
+            self._frames.close()
+
+    def __repr__(self):
+        return f"Checkpoint({str(self.path)!r}, {len(self)} operations)"
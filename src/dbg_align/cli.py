@@ -0,0 +1,338 @@
+"""Command line driver: aligns the sequences of one or more FASTA files.
+
+    dbg-align input.fasta -k 21 --output-dir aligned
+    dbg-align data/*.fasta --jobs 8 --progress progress.jsonl --summary summary.json
+
+Each input file is read, threaded through a de Bruijn graph, turned into a partial
+order graph and aligned by an AlignmentPlanner with the chosen plugin and method.
+Plugins that return profiles (banded) have their alignment written as FASTA or MAF,
+block by block as the graph is aligned.
+
+With more than one job the files are spread over a process pool. Every finished file
+appends a JSON line to the progress file, files already recorded as done there are
+skipped when the command is run again. With --checkpoint-dir the alignments finished
+within a file are saved too, so a file that was cut short resumes part way through.
+The summary is a single JSON document with the per file records and totals. The
+exit status is 1 when any file failed.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+PLUGINS = ("banded", "mock", "cost")
+METHODS = {
+    "auto": None,
+    "progressive": "PROGRESSIVE",
+    "debruijn": "DEBRUIJNGRAPH",
+    "braided": "BRAIDEDDEBRUIJGRAPH",
+}
+
+
+def read_fasta(path: Path) -> Dict[str, str]:
+    """Reads a FASTA file into a dict of name to sequence, without going through cogent3."""
+    sequences: Dict[str, List[str]] = {}
+    name = None
+    with open(path) as handle:
+        for line in handle:
+            line = line.strip()
+            if not line or line.startswith(";"):
+                continue
+            if line.startswith(">"):
+                name = line[1:].split()[0] if line[1:].split() else f"Sequence_{len(sequences) + 1}"
+                if name in sequences:
+                    raise ValueError(f"Duplicate sequence name '{name}' in {path}")
+                sequences[name] = []
+            elif name is None:
+                raise ValueError(f"{path} is not FASTA, sequence data before the first header")
+            else:
+                sequences[name].append(line.upper())
+    return {name: "".join(parts) for name, parts in sequences.items()}
+
+
+def write_fasta(rows: Iterator[Tuple[str, str]], stream: TextIO, width: int = 60):
+    for name, row in rows:
+        stream.write(f">{name}\n")
+        for start in range(0, len(row), width) if width else [0]:
+            stream.write((row[start:start + width] if width else row) + "\n")
+
+
+def _plugin(name: str) -> "AlignmentPlugin":
+    if name == "banded":
+        from .banded_alignment import BandedAlignmentPlugin
+        return BandedAlignmentPlugin()
+    if name == "mock":
+        from .mock_alignment import MockAlignmentPlugin
+        return MockAlignmentPlugin()
+    from .alignment_cost_plugin import PluginCostAlignment
+    return PluginCostAlignment()
+
+
+def output_names(inputs: List[str]) -> Dict[str, str]:
+    """Returns the name each input's output file and checkpoint directory are made from, keyed by input.
+
+    The name is the input's stem. Inputs that share a stem (compared ignoring case,
+    as some file systems do) get the first 8 hex digits of a hash of their resolved
+    path appended, so `a/x.fa` and `b/x.fasta` write to different files. An input
+    given twice would still collide and is rejected.
+    """
+    import hashlib
+    resolved = [Path(path).resolve() for path in inputs]
+    repeated = sorted({str(path) for path in resolved if resolved.count(path) > 1})
+    if repeated:
+        raise ValueError(f"Inputs given more than once: {', '.join(repeated)}")
+    stems = [path.stem.casefold() for path in resolved]
+    names = {}
+    for path, resolved_path, stem in zip(inputs, resolved, stems):
+        name = resolved_path.stem
+        if stems.count(stem) > 1:
+            name += "-" + hashlib.sha1(str(resolved_path).encode()).hexdigest()[:8]
+        names[path] = name
+    return names
+
+
+def align_file(path: str, options: dict, name: str = None) -> dict:
+    """Aligns one FASTA file, returns its record. Errors are recorded rather than raised.
+
+    Output and checkpoint paths are made from `name`, the file's stem by default.
+    """
+    from . import instrumentation
+    record = {"input": path, "status": "ok", "output": None, "seconds": {}}
+    started = time.perf_counter()
+
+    def phase(name: str, begin: float) -> float:
+        now = time.perf_counter()
+        record["seconds"][name] = now - begin
+        return now
+
+    recorder = instrumentation.Recorder() if options.get("instrument") else None
+    try:
+        with instrumentation.instrumented(recorder) if recorder else nullcontext():
+            _align(Path(path), name or Path(path).stem, options, record, phase, started)
+    except Exception as error: # one bad file must not stop a batch
+        record["status"] = "error"
+        record["error"] = f"{type(error).__name__}: {error}"
+    record["seconds"]["total"] = time.perf_counter() - started
+    if recorder is not None:
+        record["instrumentation"] = recorder.report()
+    return record
+
+
+def _align(path: Path, name: str, options: dict, record: dict, phase, now: float):
+    from .constants import AlignmentMethod
+    from .debruijngraph import DeBruijnGraph
+    from .merge_order import MergeOrderOptimizer
+    from .planner import AlignmentPlanner, PlanBudget
+    from . import streaming
+    from .pog_bubble import POG_Bubble
+    from .sparse_debruijngraph import SparseDeBruijnGraph
+
+    sequences = read_fasta(path)
+    if len(sequences) < 2:
+        raise ValueError(f"{path} holds {len(sequences)} sequences, at least 2 are needed")
+    record["sequences"] = len(sequences)
+    now = phase("read", now)
+
+    k = options["k"]
+    if k == "auto":
+        k = DeBruijnGraph.suggest_kmer_length(sequences)
+    record["k"] = k
+    graph_type = SparseDeBruijnGraph if options.get("sparse") else DeBruijnGraph
+    dbg = graph_type(k, options.get("moltype", "dna"))
+    dbg.add_sequence(sequences)
+    record["nodes"] = len(dbg.graph)
+    now = phase("graph", now)
+
+    pog = dbg.to_pog()
+    record["bubbles"] = sum(1 for segment in pog.segments() if isinstance(segment, POG_Bubble))
+    now = phase("pog", now)
+
+    planner = AlignmentPlanner(pog, merge_order=MergeOrderOptimizer(options.get("merge_order", "naive")))
+    method = METHODS[options.get("method", "auto")]
+    budget = PlanBudget(options.get("max_seconds"), options.get("max_memory"))
+    plugin = _plugin(options.get("plugin", "banded"))
+    checkpoint = Path(options["checkpoint_dir"]) / name if options.get("checkpoint_dir") else None
+    output_dir = options.get("output_dir")
+    if not output_dir or options.get("plugin", "banded") != "banded": # nothing to write, only profiles can be written
+        result = planner.execute(plugin, AlignmentMethod[method] if method else None, budget, checkpoint=checkpoint)
+        record["method"] = result.record.method.name
+        record["cost"] = list(result.record.estimate.cost)
+        phase("align", now)
+        if checkpoint is not None:
+            shutil.rmtree(checkpoint, ignore_errors=True)
+        return
+
+    estimate = planner.estimate(AlignmentMethod[method]) if method else planner.select(budget)
+    record["method"] = estimate.method.name
+    record["cost"] = list(estimate.cost)
+    fmt = options.get("format", "fasta")
+    output = Path(output_dir) / f"{name}.aligned.{fmt}"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    # blocks are written as they are aligned, time spent producing them counts as aligning
+    aligning = [0.0]
+    columns = [0]
+    def timed(blocks: Iterator["AlignmentBlock"]) -> Iterator["AlignmentBlock"]:
+        while True:
+            begin = time.perf_counter()
+            block = next(blocks, None)
+            aligning[0] += time.perf_counter() - begin
+            if block is None:
+                return
+            columns[0] += block.width
+            yield block
+    blocks = timed(planner.blocks(plugin, estimate.method, checkpoint=checkpoint))
+    if fmt == "maf":
+        streaming.write_maf(blocks, output, pog)
+    else:
+        streaming.write_fasta(blocks, output)
+    record["output"] = str(output)
+    record["columns"] = columns[0]
+    record["seconds"]["align"] = aligning[0]
+    record["seconds"]["write"] = time.perf_counter() - now - aligning[0]
+    if checkpoint is not None: # the file is done, a rerun is skipped through the progress file
+        shutil.rmtree(checkpoint, ignore_errors=True)
+
+
+def load_progress(path: Optional[Path]) -> Dict[str, dict]:
+    """Returns the records of files already done, keyed by input path."""
+    done = {}
+    if path is None or not path.exists():
+        return done
+    with open(path) as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError: # a line cut short by an interrupted run
+                continue
+            if record.get("status") == "ok":
+                done[record["input"]] = record
+    return done
+
+
+def run_batch(inputs: List[str], options: dict, jobs: int = 1, progress: Path = None, restart: bool = False, log=None) -> dict:
+    """Aligns every input, in a process pool when `jobs` > 1, and returns the summary.
+
+    Raises ValueError before anything is aligned when two inputs would write to the
+    same files, see `output_names`.
+    """
+    started = time.perf_counter()
+    inputs = [str(Path(path).resolve()) for path in inputs]
+    names = output_names(inputs)
+    done = {} if restart else load_progress(progress)
+    if restart and progress is not None and progress.exists():
+        progress.unlink()
+    pending = [path for path in inputs if path not in done]
+    records = {path: dict(done[path], skipped=True) for path in inputs if path in done}
+
+    handle = open(progress, "a") if progress is not None else None
+    def finished(record: dict):
+        records[record["input"]] = record
+        if handle is not None:
+            handle.write(json.dumps(record) + "\n")
+            handle.flush()
+        if log:
+            log(f"{record['status']:<6} {record['seconds']['total']:8.2f}s {record['input']}" + (f"  {record['error']}" if "error" in record else ""))
+    try:
+        if jobs > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+                futures = [pool.submit(align_file, path, options, names[path]) for path in pending]
+                for future in as_completed(futures):
+                    finished(future.result())
+        else:
+            for path in pending:
+                finished(align_file(path, options, names[path]))
+    finally:
+        if handle is not None:
+            handle.close()
+
+    ordered = [records[path] for path in inputs]
+    from . import __version__
+    return {
+        "version": __version__,
+        "options": options,
+        "files": ordered,
+        "totals": {
+            "files": len(ordered),
+            "ok": sum(1 for r in ordered if r["status"] == "ok" and not r.get("skipped")),
+            "skipped": sum(1 for r in ordered if r.get("skipped")),
+            "failed": sum(1 for r in ordered if r["status"] != "ok"),
+            "seconds": time.perf_counter() - started,
+        },
+    }
+
+
+def _kmer_length(value: str):
+    if value == "auto":
+        return value
+    k = int(value)
+    if k < 2:
+        raise argparse.ArgumentTypeError("k must be at least 2")
+    return k
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="dbg-align", description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="FASTA files, one alignment per file")
+    parser.add_argument("-k", "--kmer-length", type=_kmer_length, default=11, help="kmer length or 'auto' (default 11)")
+    parser.add_argument("--sparse", action="store_true", help="build a sparse minimizer de Bruijn graph")
+    parser.add_argument("--moltype", default="dna")
+    parser.add_argument("--plugin", choices=PLUGINS, default="banded")
+    parser.add_argument("--method", choices=sorted(METHODS), default="auto")
+    parser.add_argument("--merge-order", choices=("naive", "huffman", "guide_tree", "auto"), default="naive")
+    parser.add_argument("--max-seconds", type=float, help="time budget when the method is chosen automatically")
+    parser.add_argument("--max-memory", type=float, help="memory budget in bytes when the method is chosen automatically")
+    parser.add_argument("-o", "--output-dir", type=Path, help="write alignments to this directory")
+    parser.add_argument("--format", choices=("fasta", "maf"), default="fasta", help="alignment file format (default fasta)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="worker processes (default 1, 0 for one per CPU)")
+    parser.add_argument("--progress", type=Path, help="JSON lines file of finished inputs, used to resume")
+    parser.add_argument("--restart", action="store_true", help="ignore and replace the progress file")
+    parser.add_argument("--checkpoint-dir", type=Path, help="save finished alignments of each file here, an interrupted file resumes from them")
+    parser.add_argument("--summary", type=Path, help="write the JSON summary here, '-' for stdout")
+    parser.add_argument("--instrument", action="store_true", help="record phase timers and counters per file")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    command = parser()
+    args = command.parse_args(argv)
+    options = {
+        "k": args.kmer_length,
+        "sparse": args.sparse,
+        "moltype": args.moltype,
+        "plugin": args.plugin,
+        "method": args.method,
+        "merge_order": args.merge_order,
+        "max_seconds": args.max_seconds,
+        "max_memory": args.max_memory,
+        "output_dir": str(args.output_dir) if args.output_dir else None,
+        "format": args.format,
+        "checkpoint_dir": str(args.checkpoint_dir) if args.checkpoint_dir else None,
+        "instrument": args.instrument,
+    }
+    jobs = args.jobs or os.cpu_count() or 1
+    log = None if args.quiet else lambda line: print(line, file=sys.stderr)
+    try:
+        summary = run_batch(args.inputs, options, jobs, args.progress, args.restart, log)
+    except ValueError as error: # inputs that would overwrite each other's output
+        command.error(str(error))
+    if args.summary is not None:
+        text = json.dumps(summary, indent=2)
+        if str(args.summary) == "-":
+            print(text)
+        else:
+            args.summary.write_text(text)
+    if log:
+        totals = summary["totals"]
+        log(f"{totals['ok']} aligned, {totals['skipped']} skipped, {totals['failed']} failed in {totals['seconds']:.2f}s")
+    return 1 if summary["totals"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
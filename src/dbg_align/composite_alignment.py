@@ -12,3 +12,48 @@ class CompositeAlignment:
             A list of components which can be either string fragments or other CompositeAlignments.
         """
         self.components = components
+
+    def rows(self) -> List[str]:
+        """
+        Flatten the nested components into the list of string fragments they hold.
+
+        Returns
+        -------
+        list
+            The string fragments in depth first order.
+        """
+        rows = []
+        for component in self.components:
+            if isinstance(component, CompositeAlignment):
+                rows.extend(component.rows())
+            else:
+                rows.append(component)
+        return rows
+
+    def concatenate(self) -> 'CompositeAlignment':
+        """
+        Collapse the nesting of this composite into a single level.
+
+        Returns
+        -------
+        CompositeAlignment
+            A composite whose components are all string fragments.
+        """
+        return CompositeAlignment(self.rows())
+
+    def to_profile(self, names: List[str] = None) -> 'Profile':
+        """
+        Convert a composite of equal length gapped rows into a Profile.
+
+        Parameters
+        ----------
+        names : list, optional
+            Names for the rows of the profile.
+
+        Returns
+        -------
+        Profile
+            The flat profile holding the same rows.
+        """
+        from .profile import Profile
+        return Profile(self.rows(), names)
@@ -0,0 +1,148 @@
+"""Positions of partial order graph nodes along each of the graph's sequences.
+
+Walking a sequence through the graph with `get_next` costs a scan of each node's
+successors, so a single walk is done per sequence and kept: the nodes the sequence
+passes through in order, with the offset at which each node's fragment starts. Position
+to node lookups are then a bisection and node to position lookups a dict access.
+
+    index = pog.coordinates()
+    node, offset = index.node_at("human", 1200)
+    index.offset(node, "chimp")
+    index.slice("human", 1000, 1100)
+"""
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Tuple, Union
+
+from . import instrumentation
+from .pog_node import POG_Node
+
+
+class CoordinateIndex:
+    """For every sequence of a partial order graph, its nodes sorted by their offset in the sequence.
+
+    Only nodes with text take up positions, the root and the synthetic end node are
+    still given offsets (0 and the sequence length) so they can be used as boundaries.
+    The index describes the graph as it was when built, `PartialOrderGraph.coordinates`
+    keeps one up to date.
+    """
+    def __init__(self, pog: "PartialOrderGraph"):
+        self.names = {name: value[0] for name, value in pog.sequence_names.items()}
+        self._starts: Dict[int, List[int]] = {}
+        self._nodes: Dict[int, List[POG_Node]] = {}
+        self._offsets: Dict[POG_Node, Dict[int, int]] = {}
+        self._ends: Dict[int, POG_Node] = {} # the last node of each sequence, normally the synthetic end node
+        self.root = pog.root
+        with instrumentation.timer("pog.coordinates"):
+            for index in sorted(set(self.names.values())):
+                self._walk(pog.root, index)
+
+    def _walk(self, root: POG_Node, index: int):
+        starts, nodes = [], []
+        offset = 0
+        node_offsets = self._offsets
+        node = root if root is not None and index in root.sequence_set else None
+        while node is not None:
+            offsets = node_offsets.get(node)
+            if offsets is None:
+                offsets = node_offsets[node] = {}
+            elif index in offsets:
+                raise ValueError(f"Sequence {index} loops back on itself in the partial order graph")
+            offsets[index] = offset
+            self._ends[index] = node
+            fragment = node.fragment
+            if fragment:
+                starts.append(offset)
+                nodes.append(node)
+                offset += len(fragment)
+            for node in node.next: # inlined get_next
+                if index in node.sequence_set:
+                    break
+            else:
+                node = None
+        starts.append(offset) # the end of the last node, so a node's span is starts[i]:starts[i + 1]
+        self._starts[index] = starts
+        self._nodes[index] = nodes
+
+    def sequence_index(self, sequence: Union[int, str]) -> int:
+        """Returns the index of a sequence given by index or name."""
+        index = self.names[sequence] if isinstance(sequence, str) else sequence
+        if index not in self._starts:
+            raise KeyError(f"Sequence '{sequence}' not found")
+        return index
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __contains__(self, sequence: Union[int, str]) -> bool:
+        return (sequence in self.names) if isinstance(sequence, str) else (sequence in self._starts)
+
+    def length(self, sequence: Union[int, str]) -> int:
+        return self._starts[self.sequence_index(sequence)][-1]
+
+    def path(self, sequence: Union[int, str]) -> List[POG_Node]:
+        """Returns the nodes with text that the sequence passes through, in order."""
+        return list(self._nodes[self.sequence_index(sequence)])
+
+    def node_at(self, sequence: Union[int, str], position: int) -> Tuple[POG_Node, int]:
+        """Returns the node covering a position of the sequence and the position's offset into its fragment."""
+        index = self.sequence_index(sequence)
+        starts = self._starts[index]
+        if not 0 <= position < starts[-1]:
+            raise IndexError(f"Position {position} is outside sequence {sequence} of length {starts[-1]}")
+        i = bisect_right(starts, position) - 1
+        return self._nodes[index][i], position - starts[i]
+
+    def offsets(self, node: POG_Node) -> Dict[int, int]:
+        """Returns the offset at which the node starts in each sequence passing through it."""
+        return dict(self._offsets.get(node, {}))
+
+    def offset(self, node: POG_Node, sequence: Union[int, str]) -> int:
+        """Returns the offset at which the node starts in a sequence, KeyError if the sequence does not pass through it."""
+        index = self.sequence_index(sequence)
+        offsets = self._offsets.get(node, {})
+        if index not in offsets:
+            raise KeyError(f"Sequence '{sequence}' does not pass through {node!r}")
+        return offsets[index]
+
+    def nodes_between(self, sequence: Union[int, str], start: int, end: int) -> List[Tuple[POG_Node, int]]:
+        """Returns the nodes overlapping positions start:end of the sequence with the offset each starts at."""
+        index = self.sequence_index(sequence)
+        starts, nodes = self._starts[index], self._nodes[index]
+        first = max(bisect_right(starts, start) - 1, 0)
+        last = min(bisect_left(starts, end), len(nodes))
+        return [(nodes[i], starts[i]) for i in range(first, last)]
+
+    def enclosing(self, sequence: Union[int, str], start: int, end: int) -> Tuple[POG_Node, POG_Node]:
+        """Returns the closest nodes before position start and from position end of the sequence that every sequence passes through.
+
+        Every sequence enters the stretch between the two nodes through the first and
+        leaves it through the second, so it can be cut out of the graph on its own.
+        Falls back to the root and the end node, the search only reads the nodes it passes.
+        """
+        index = self.sequence_index(sequence)
+        starts, nodes = self._starts[index], self._nodes[index]
+        everyone = self._starts.keys()
+        shared = lambda node: node.sequence_set.issuperset(everyone)
+        first = bisect_right(starts, start) - 1 # the node covering start
+        before = next((nodes[i] for i in range(min(first, len(nodes)) - 1, -1, -1) if shared(nodes[i])), self.root)
+        last = bisect_left(starts, end) if end > start else first + 1 # the first node starting at or after end
+        after = next((nodes[i] for i in range(last, len(nodes)) if shared(nodes[i])), self._ends[index])
+        return before, after
+
+    def slice(self, sequence: Union[int, str], start: int = 0, end: int = None) -> str:
+        """Returns positions start:end of the sequence, reading only the nodes that cover them."""
+        length = self.length(sequence)
+        start, end, _ = slice(start, end).indices(length)
+        if start >= end:
+            return ""
+        covering = self.nodes_between(sequence, start, end)
+        text = "".join(node.fragment for node, _ in covering)
+        first = covering[0][1]
+        return text[start - first:end - first]
+
+    def sequence(self, sequence: Union[int, str]) -> str:
+        """Returns the whole text of a sequence."""
+        return "".join(node.fragment for node in self._nodes[self.sequence_index(sequence)])
+
+    def __repr__(self):
+        return f"CoordinateIndex({len(self)} sequences, {len(self._offsets)} nodes)"
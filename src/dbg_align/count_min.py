@@ -0,0 +1,82 @@
+"""Approximate kmer counts in fixed memory.
+
+A count-min sketch keeps `depth` rows of `width` counters. Every item is hashed to one
+counter per row and adding it increments all of them; its count is read back as the
+smallest of them. Collisions only ever add, so counts are never underestimated and,
+with N items added, exceed the true count by more than e * N / width with probability
+at most exp(-depth). Kmers are hashed with `kmer_hash.kmer_hashes`, so counting a
+sequence is a handful of numpy operations whatever its length.
+"""
+import math
+from typing import Iterable
+
+import numpy as np
+
+from .kmer_hash import _mix, encode, kmer_hashes
+
+
+class CountMinSketch:
+    """A `depth` x `width` table of uint32 counters, see the module docstring.
+
+    Sketches with the same shape and seed count the same way and can be added together.
+    """
+    def __init__(self, width: int = 1 << 20, depth: int = 4, seed: int = 0):
+        if width < 1 or depth < 1:
+            raise ValueError("A count-min sketch needs at least one row and one column")
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+        self.total = 0
+        self._salts = _mix(np.arange(1, depth + 1, dtype=np.uint64) + np.uint64(seed) * np.uint64(depth + 1))
+
+    @classmethod
+    def for_error(cls, epsilon: float, delta: float, seed: int = 0) -> "CountMinSketch":
+        """Returns a sketch whose counts exceed the true count by more than epsilon * total with probability at most delta."""
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)), seed)
+
+    def _columns(self, hashes: np.ndarray) -> np.ndarray:
+        return (_mix((hashes[None, :] ^ self._salts[:, None]).ravel()) % np.uint64(self.width)).reshape(self.depth, -1)
+
+    def add(self, hashes: np.ndarray):
+        """Counts one occurrence of every hash, repeated hashes count once per repeat."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        for row, columns in enumerate(self._columns(hashes)):
+            np.add.at(self.table[row], columns, 1)
+        self.total += len(hashes)
+
+    def counts(self, hashes: np.ndarray) -> np.ndarray:
+        """Returns the estimated count of every hash."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return np.empty(0, dtype=np.uint32)
+        columns = self._columns(hashes)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def add_sequence(self, sequence: str, k: int):
+        """Counts every kmer of a sequence."""
+        self.add(kmer_hashes(encode(sequence), k))
+
+    def add_sequences(self, sequences: Iterable[str], k: int):
+        for sequence in sequences:
+            self.add_sequence(sequence, k)
+
+    def kmer_counts(self, sequence: str, k: int) -> np.ndarray:
+        """Returns the estimated count of each kmer of a sequence, `counts[i]` for `sequence[i:i + k]`."""
+        return self.counts(kmer_hashes(encode(sequence), k))
+
+    def __iadd__(self, other: "CountMinSketch") -> "CountMinSketch":
+        if (other.width, other.depth, other.seed) != (self.width, self.depth, self.seed):
+            raise ValueError("Only sketches with the same width, depth and seed can be added")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+    def __repr__(self):
+        return f"CountMinSketch(width={self.width}, depth={self.depth}, total={self.total})"
@@ -1,10 +1,86 @@
+from typing import Union
 from .dbg_node import DBGNode
 
+
+class RepeatText:
+    """Text that repeats a short unit, stored as the unit and the total length.
+
+    Tandem repeats make long cycle text with a short period, this keeps them in
+    O(period) memory and only expands them when the literal text is asked for.
+    """
+    __slots__ = ("unit", "length")
+
+    def __init__(self, unit: str, length: int):
+        self.unit = unit
+        self.length = length
+
+    @staticmethod
+    def period(text: str) -> int:
+        """Length of the shortest unit that text is a prefix of repeats of (the KMP failure function)."""
+        failure = [0] * len(text)
+        matched = 0
+        for position in range(1, len(text)):
+            while matched and text[position] != text[matched]:
+                matched = failure[matched - 1]
+            if text[position] == text[matched]:
+                matched += 1
+            failure[position] = matched
+        return len(text) - (failure[-1] if text else 0)
+
+    @classmethod
+    def compact(cls, text: str) -> Union[str, "RepeatText"]:
+        """Returns a RepeatText when text has at least two copies of a shorter unit, otherwise the text itself."""
+        if len(text) < 4:
+            return text
+        period = cls.period(text)
+        return cls(text[:period], len(text)) if period * 2 <= len(text) else text
+
+    def __str__(self):
+        copies, remainder = divmod(self.length, len(self.unit))
+        return self.unit * copies + self.unit[:remainder]
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other):
+        return str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self.unit.__sizeof__()
+
+    def __repr__(self):
+        return f"RepeatText({self.unit!r} x {self.length / len(self.unit):g})"
+
+
 class DBGEdge:
-    def __init__(self, target_node: DBGNode, sequence_index : int = None, cycle : str = "") -> None:
+    def __init__(self, target_node: DBGNode, sequence_index : int = None, cycle : str = "", fragment : str = "") -> None:
         self.target_node = target_node
         self.sequence = sequence_index
         self.cycle = cycle
+        self.fragment = fragment # sequence skipped between the source and target kmers of a sparse graph
+
+    @property
+    def cycle(self) -> str:
+        """The text of the repeat this edge steps over, expanded from its compact form."""
+        cycle = self._cycle
+        return cycle if cycle.__class__ is str else str(cycle)
+
+    @cycle.setter
+    def cycle(self, text: Union[str, RepeatText]):
+        self._cycle = RepeatText.compact(text) if isinstance(text, str) else text
+
+    @property
+    def compact_cycle(self) -> Union[str, RepeatText]:
+        """The cycle text as stored, without expanding a repeat."""
+        return self._cycle
+
+    @property
+    def text(self) -> str:
+        """The sequence emitted when following this edge, before the target's own text."""
+        return self.cycle + self.fragment
 
     def __repr__(self):
         return f"Edge ->{self.target_node.kmer} seq: ({self.sequences})"
@@ -13,25 +13,30 @@ class DBGNode:
             for edge in current_node.edges:
                 pass
     def get_sequence(self, sequence_index: int) -> Optional[str]:
+        """Rebuilds a sequence from this node on: the first kmer in full, then each edge's text and the next kmer's entry text."""
+        # appended in place, CPython grows a string with one reference without copying,
+        # where a list of parts would hold a pointer for every single character
+        sequence = self.kmer or ""
+        whole_kmer = not self.kmer # the first kmer after the root is read in full
         current_node = self
-        sequence = ""
-        if self.kmer:  # ie: this is not a root we are calling this from
-            sequence += self.kmer
-        while current_node:
-            if current_node.kmer: # if we're not at the root
-                if not sequence: # take the whole kmer
-                    sequence += current_node.kmer
-                else: # take the last character
-                    sequence += current_node.kmer[-1]
-            cycle = current_node.get_cycle(sequence_index)
-            if cycle:
-                sequence += "".join(current_node.get_cycle(sequence_index))
-            next_node = current_node.get_next(sequence_index)
-            if next_node is None:
-                return sequence
-            current_node = next_node
+        while True:
+            edge = current_node.get_edge(sequence_index)
+            if edge is None:
+                break
+            text = edge.text # cycle text, or sequence skipped between kmers that are not neighbours
+            if text:
+                sequence += text
+            current_node = edge.target_node
+            if current_node is None:
+                break
+            sequence += current_node.kmer if whole_kmer else current_node.entry_text()
+            whole_kmer = False
         return sequence
    
+    def entry_text(self) -> str:
+        """The text this node adds to a sequence arriving from another kmer, which overlaps all but its last character."""
+        return self.kmer[-1]
+
     def get_edge(self, sequence_id : int) -> Optional["DBGEdge"]:
         for edge in self.edges:
             if sequence_id == edge.sequence:
@@ -1,97 +1,157 @@
+import sys
 from collections import deque
 from functools import singledispatchmethod
-from typing import Union
+from typing import TYPE_CHECKING, Dict, Tuple, Union
 
-import cogent3
-from cogent3.core.moltype import MolType
-from graphviz import Digraph
+from . import instrumentation
+from .memory import MemoryUsage, check_budget, dict_entry_size, object_size
+
+if TYPE_CHECKING:
+    from cogent3.core.moltype import MolType
 
 class DeBruijnGraph:
     """ A class to represent a de Bruijn graph for a set of sequences.
 
     Note: Indexes for sequences are 1 based (ie: start from 1).
+
+    With a `memory_budget` (in bytes) adding a sequence that would take the estimated
+    size of the graph past the budget raises MemoryBudgetExceeded before the graph is
+    changed, unless `_reclaim` manages to free enough memory first.
+
+    `moltype` is a cogent3 MolType or its name, a name is only resolved (and cogent3
+    imported) the first time the moltype is used.
     """
-    def __init__(self, kmer_length: int, moltype: MolType = cogent3.DNA):
-        from .dbg_node import DBGNode
+    def __init__(self, kmer_length: int, moltype: Union["MolType", str] = "dna", memory_budget: int = None):
         self.kmer_length = kmer_length
-        self.root = DBGNode(kmer = None)  # Root node of the graph
+        self.memory_budget = memory_budget
+        self._unit_sizes = None
+        self.root = self._new_node(None)  # Root node of the graph
         self.graph = {}
         self.moltype = moltype
         self.sequence_names = {}  # dict keyed on sequence names, returns tuple containing index and lengths of the sequence
         self.is_compressed = False
+        self.edge_count = 0 # edges created, including cycle edges
+        self.cycle_edge_count = 0 # edges that hold the text of a cycle
+
+    @property
+    def moltype(self) -> "MolType":
+        if isinstance(self._moltype, str):
+            import cogent3
+            self._moltype = cogent3.get_moltype(self._moltype)
+        return self._moltype
+
+    @moltype.setter
+    def moltype(self, moltype: Union["MolType", str]):
+        self._moltype = moltype
 
     @classmethod
     def generate_kmers(cls, sequence: str, k: int):
         for i in range(len(sequence) - k + 1):
             yield sequence[i:i + k]
 
-    def to_pog(self)->"DeBruijnGraph":
+    @classmethod
+    def suggest_kmer_length(cls, sequences, k_values=None, max_sequences: int = 20, max_length: int = 2000, seed: int = 0, statistics: bool = False):
+        """Suggests the k-mer length that minimises the predicted alignment work.
+
+        A sample of at most `max_sequences` sequences, cut to windows of `max_length`
+        characters, is scored for every k in `k_values` (3 to 63 by default) without
+        building a graph. With `statistics` set the KmerStatistics of every k are
+        returned as well, best first.
+        """
+        from .kmer_statistics import as_strings, suggest_kmer_length
+        ranked = suggest_kmer_length(as_strings(sequences), k_values, max_sequences, max_length, seed)
+        if statistics:
+            return ranked[0].kmer_length, ranked
+        return ranked[0].kmer_length
+
+    def to_pog(self, memory_budget: int = None)->"PartialOrderGraph":
         from .partialordergraph import PartialOrderGraph
-        pog = PartialOrderGraph(self)
+        pog = PartialOrderGraph(self, memory_budget)
         return pog
 
     @singledispatchmethod
     def add_sequence(self, sequence, name=None):
-        # Placeholder for unrecognized types
+        # cogent3 types are recognised without importing cogent3, holding one means it is loaded already
+        cogent3 = sys.modules.get("cogent3")
+        if cogent3 is not None and isinstance(sequence, cogent3.Sequence):
+            return self._add_cogent3_sequence(sequence, name)
+        if cogent3 is not None and isinstance(sequence, cogent3.SequenceCollection):
+            for member in sequence:
+                self._add_cogent3_sequence(member, member.name or None)
+            return
         raise TypeError("Unsupported sequence type")
 
     @add_sequence.register(str)
     def _(self, sequence: str, name=None):
-        from .dbg_edge import DBGEdge, DBGNode
-        
         # check string for characters in alphabet
         self.moltype.verify_sequence(sequence)
         if len(sequence) < self.kmer_length:
             raise ValueError("Sequence is shorter than kmer length")
+        if self.memory_budget is not None:
+            self._check_budget(sequence)
         sequence_index = len(self)+1
         if not name:
             name = f"Sequence_{sequence_index}"
         self.sequence_names[name] = (sequence_index, len(sequence))
-        # Convert the sequence into kmers and add them to the graph
+        nodes, edges, cycle_edges = len(self.graph), self.edge_count, self.cycle_edge_count
+        with instrumentation.timer("dbg.add_sequence"):
+            self._add_kmers(sequence, sequence_index)
+        if instrumentation.enabled():
+            instrumentation.count("dbg.kmers", len(sequence) - self.kmer_length + 1)
+            instrumentation.count("dbg.nodes", len(self.graph) - nodes)
+            instrumentation.count("dbg.edges", self.edge_count - edges)
+            instrumentation.count("dbg.cycle_edges", self.cycle_edge_count - cycle_edges)
+
+    def _new_node(self, kmer: str) -> "DBGNode":
+        """Creates a node, subclasses override this to use their own node type."""
+        from .dbg_node import DBGNode
+        return DBGNode(kmer)
+
+    def _add_kmers(self, sequence: str, sequence_index: int):
+        """Threads a validated sequence through the graph, creating nodes and edges for its kmers.
+
+        A run of kmers the sequence has already passed through is a cycle. It is not
+        threaded through the graph again: its text goes on a cycle edge from the node
+        before the run to the first kmer after it (or to no node at the end of the
+        sequence). The text is sliced from the sequence once the run ends and stored
+        compactly, so a long tandem repeat costs O(1) per kmer.
+        """
+        from .dbg_edge import DBGEdge
         current_node = self.root
-        for kmer in self.generate_kmers(sequence, self.kmer_length):
+        visited = set() # kmers this sequence has passed through
+        cycle_edge, cycle_start = None, 0 # the open cycle edge and where its text starts in the sequence
+        last = self.kmer_length - 1
+        for position, kmer in enumerate(self.generate_kmers(sequence, self.kmer_length)):
+            if kmer in visited:
+                if cycle_edge is None:
+                    current_node.edges.append(DBGEdge(target_node=None, sequence_index=sequence_index))
+                    cycle_edge, cycle_start = current_node.edges[-1], position + last
+                    self.edge_count += 1
+                    self.cycle_edge_count += 1
+                continue
             next_node = self.graph.get(kmer)
-            if not next_node: # Node doens't exist it, add it and make an edge for this sequence to it or connect a cycle edge to it
-                next_node = DBGNode(kmer)
+            if next_node is None:
+                next_node = self._new_node(kmer)
                 self.graph[kmer] = next_node
-                cycle_edge = current_node.get_cycle_edge(sequence_index)
-                if cycle_edge: # it's a cycle we can close
-                    cycle_edge.target_node = next_node
-                else:    
-                    current_node.edges.append(DBGEdge(target_node=next_node, sequence_index=sequence_index)) 
-                current_node = next_node
-            else: # Node already exists, check if we have an edge for this sequence
-                if next_node.get_cycle_edge(sequence_index): # it's a cycle if the next node has an edge for this sequence
-                    cycle_edge = next_node.get_cycle_edge(sequence_index)
-                    if not cycle_edge:
-                        pass
-                    cycle_edge.cycle += kmer[-1]
-                    # keep current node the same
-                else: # create a cycle_edge
-                    if next_node.get_edge(sequence_index):# This sequence already passes through this node
-                        current_node.edges.append(DBGEdge(target_node=None, sequence_index=sequence_index, cycle=kmer[-1]))
-                        # keep current node the same
-                    else:
-                        cycle_edge = current_node.get_cycle_edge(sequence_index)
-                        if cycle_edge: # it's a cycle we can close
-                            cycle_edge.target_node = next_node
-                        else:    
-                            current_node.edges.append(DBGEdge(target_node=next_node, sequence_index=sequence_index)) 
-                        current_node = next_node
-
-    @add_sequence.register(cogent3.Sequence)
-    def _(self, sequence: cogent3.Sequence, name=None):
+            if cycle_edge is not None: # the cycle ends on a kmer this sequence has not been through
+                cycle_edge.cycle = sequence[cycle_start:position + last]
+                cycle_edge.target_node = next_node
+                cycle_edge = None
+            else:
+                current_node.edges.append(DBGEdge(target_node=next_node, sequence_index=sequence_index))
+                self.edge_count += 1
+            visited.add(kmer)
+            current_node = next_node
+        if cycle_edge is not None: # the sequence ends inside a cycle
+            cycle_edge.cycle = sequence[cycle_start:]
+
+    def _add_cogent3_sequence(self, sequence: "cogent3.Sequence", name=None):
         if sequence.moltype != self.moltype:
             raise ValueError("Sequence moltype does not match dBg moltype")
         name = name or sequence.name
         if not name:
             name = f"Sequence_{len(self)+1}"
-        self.add_sequence(str(sequence), name)    
-
-    @add_sequence.register(cogent3.SequenceCollection)
-    def _(self, sequences: cogent3.SequenceCollection):
-        for sequence in sequences:
-            self.add_sequence(sequence, sequence.name or None)
+        self.add_sequence(str(sequence), name)
 
     @add_sequence.register(list)
     def _(self, sequences, names = None):
@@ -107,17 +167,126 @@ class DeBruijnGraph:
         for name, sequence in sequences.items():
             self.add_sequence(sequence, name)
 
+    def merge(self, other: "DeBruijnGraph") -> "DeBruijnGraph":
+        """Adds the sequences of another graph to this one, without re-reading them.
+
+        The other graph's sequences are renumbered to follow this graph's, its kmers
+        are added where they are missing and its edges (cycle edges included) are
+        copied onto the matching nodes. The result is the graph sequential insertion
+        of the other graph's sequences would have built, in time proportional to the
+        other graph, so merge the smaller graph into the larger. Returns self.
+        """
+        from .dbg_edge import DBGEdge
+        if type(other) is not type(self) or other.kmer_length != self.kmer_length:
+            raise ValueError("Only graphs of the same type and kmer length can be merged")
+        if other.moltype != self.moltype:
+            raise ValueError("Graph moltypes do not match")
+        clashes = set(self.sequence_names).intersection(other.sequence_names)
+        if clashes:
+            raise ValueError(f"Sequence names {sorted(clashes)} are in both graphs")
+        if self.memory_budget is not None:
+            check_budget(self.memory_budget, self.estimate_memory(), other.estimate_memory(), "Merging a graph")
+        offset = len(self)
+        with instrumentation.timer("dbg.merge"):
+            for kmer in other.graph.keys(): # nodes first, so every copied edge has its target
+                if kmer not in self.graph:
+                    self.graph[kmer] = self._new_node(kmer)
+            for source in [other.root, *other.graph.values()]:
+                node = self.root if source.kmer is None else self.graph[source.kmer]
+                for edge in source.edges:
+                    target = edge.target_node
+                    node.edges.append(DBGEdge(target_node=self.graph[target.kmer] if target is not None else None,
+                                              sequence_index=edge.sequence + offset, cycle=edge.compact_cycle, fragment=edge.fragment))
+            for name, (index, length) in sorted(other.sequence_names.items(), key=lambda item: item[1][0]):
+                self.sequence_names[name] = (index + offset, length)
+            self.edge_count += other.edge_count
+            self.cycle_edge_count += other.cycle_edge_count
+        return self
+
+    @classmethod
+    def union(cls, *graphs: "DeBruijnGraph") -> "DeBruijnGraph":
+        """Returns a new graph holding the sequences of every graph, numbered in the order the graphs are given."""
+        if not graphs:
+            raise ValueError("union needs at least one graph")
+        first = graphs[0]
+        result = type(first)(first.kmer_length, first.moltype)
+        for graph in graphs:
+            result.merge(graph)
+        return result
+
     def names(self):
         """Returns an iterable collection of sequence names."""
         return list(self.sequence_names.keys())
 
+    def memory_usage(self) -> MemoryUsage:
+        """Walks the graph and returns the bytes held by nodes, edges, kmer strings, cycle text, skipped fragments and indexes."""
+        nodes = edges = kmers = cycles = fragments = 0
+        for node in [self.root, *self.graph.values()]:
+            nodes += object_size(node) + sys.getsizeof(node.edges)
+            if node.kmer:
+                kmers += sys.getsizeof(node.kmer)
+            for edge in node.edges:
+                edges += object_size(edge)
+                if edge.compact_cycle:
+                    cycles += sys.getsizeof(edge.compact_cycle)
+                if getattr(edge, "fragment", ""):
+                    fragments += sys.getsizeof(edge.fragment)
+        index = sys.getsizeof(self.graph) + sys.getsizeof(self.sequence_names)
+        index += sum(sys.getsizeof(name) + sys.getsizeof(value) for name, value in self.sequence_names.items())
+        return MemoryUsage({"nodes": nodes, "edges": edges, "kmers": kmers, "cycles": cycles, "fragments": fragments, "index": index})
+
+    def unit_sizes(self) -> Dict[str, int]:
+        """Typical bytes per node (with its kmer and index entry) and per edge, measured once per graph."""
+        if self._unit_sizes is None:
+            from .dbg_edge import DBGEdge
+            node = self._new_node("A" * self.kmer_length)
+            pointer = sys.getsizeof([None, None]) - sys.getsizeof([None])
+            self._unit_sizes = {
+                "node": object_size(node) + sys.getsizeof(node.edges) + sys.getsizeof(node.kmer) + dict_entry_size(),
+                "edge": object_size(DBGEdge(target_node=None, sequence_index=1)) + pointer,
+                "char": sys.getsizeof("AA") - sys.getsizeof("A"),
+            }
+        return self._unit_sizes
+
+    def estimate_memory(self) -> int:
+        """Estimates the size of the graph from its node and edge counts, without walking it."""
+        sizes = self.unit_sizes()
+        return (len(self.graph) + 1) * sizes["node"] + self.edge_count * sizes["edge"]
+
+    def pog_node_bound(self) -> int:
+        """Upper bound on the nodes of the partial order graph: one per kmer, cycle and sequence start, plus root and end."""
+        return len(self.graph) + self.cycle_edge_count + len(self) + 2
+
+    def _predict_growth(self, sequence: str) -> Tuple[int, int]:
+        """Returns upper bounds on the nodes and edges adding a sequence creates."""
+        kmers = set(self.generate_kmers(sequence, self.kmer_length))
+        # every kmer step of a sequence adds an edge for it, only unseen kmers add nodes
+        return sum(1 for kmer in kmers if kmer not in self.graph), len(sequence) - self.kmer_length + 1
+
+    def _check_budget(self, sequence: str):
+        sizes = self.unit_sizes()
+        nodes, edges = self._predict_growth(sequence)
+        required = nodes * sizes["node"] + edges * sizes["edge"] + len(sequence) * sizes["char"]
+        used = self.estimate_memory()
+        if used + required > self.memory_budget and self._reclaim(used + required - self.memory_budget):
+            used = self.estimate_memory()
+        check_budget(self.memory_budget, used, required, "Adding a sequence")
+
+    def _reclaim(self, required: int) -> bool:
+        """Tries to free `required` bytes, by compacting or spilling, returns True if anything was freed.
+
+        The in memory graph has nothing to give back, graphs with other storage override this.
+        """
+        return False
+
+    def stats(self) -> "GraphStats":
+        """Returns node, unitig, anchor coverage and cycle statistics computed over flat arrays, see `graph_stats`."""
+        from .graph_stats import graph_stats
+        return graph_stats(self)
+
     def has_cycles(self):
         """Returns True if the graph contains cycles."""
-        for node in self.graph.values():
-            # if any node.edge has a non-empty cycle list then there is a cycle
-            if any(edge.cycle for edge in node.edges):
-                return True
-        return False
+        return self.cycle_edge_count > 0
     
     def sequence_length(self, sequence_index: int) -> int:
         """Returns the length of a sequence in the graph."""
@@ -214,6 +383,21 @@ class DeBruijnGraph:
             mermaid_str += f"{node.kmer} --> e;\n"
         return mermaid_str
 
+    def write_mermaid(self, target: Union[str, "TextIO"], **options) -> int:
+        """Streams a mermaid description of the graph to a path or text stream.
+
+        Unlike `to_mermaid` the text is never held in memory. Options are those of
+        `export.dbg_elements`: seeds and radius for a region, unitigs, min_coverage
+        and max_label. Returns the number of vertices and edges written.
+        """
+        from .export import dbg_elements, write_mermaid
+        return write_mermaid(dbg_elements(self, **options), target)
+
+    def write_graphviz(self, target: Union[str, "TextIO"], **options) -> int:
+        """Streams a graphviz dot description of the graph, see `write_mermaid`."""
+        from .export import dbg_elements, write_graphviz
+        return write_graphviz(dbg_elements(self, **options), target)
+
     def to_graphviz(self, show_kmers: bool = True):
         def sanitize_identifier(identifier):
             # Replace spaces and special characters with underscores
@@ -223,6 +407,7 @@ class DeBruijnGraph:
         if not self.root:
             return None
 
+        from graphviz import Digraph
         dot = Digraph(comment='De Bruijn Graph')
         dot.attr('graph', rankdir='LR')  # Lay out the graph from left to right
 
@@ -0,0 +1,526 @@
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import weakref
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from .dbg_edge import DBGEdge, RepeatText
+from .dbg_node import DBGNode
+from .debruijngraph import DeBruijnGraph
+from .memory import MemoryUsage, object_size
+
+if TYPE_CHECKING:
+    from cogent3.core.moltype import MolType
+
+_EDGE = struct.Struct("<QIII") # target id (0 for none), sequence index, cycle length, fragment length
+_COUNT = struct.Struct("<I")
+
+
+class DiskKmerTable:
+    """A memory mapped open addressing hash table from kmers to node ids.
+
+    Slots hold the kmer bytes and a node id, id 0 marks an empty slot. Probing is
+    linear from a crc32 of the kmer, which is stable across processes so a table can be
+    reopened. The file is rebuilt at twice the size when it is 70% full.
+    """
+    LOAD = 0.7
+
+    def __init__(self, path: Path, kmer_length: int, capacity: int = 1 << 16, count: int = 0):
+        self.path = Path(path)
+        self.kmer_length = kmer_length
+        self.count = count
+        self._map(capacity, create=not self.path.exists())
+
+    def _map(self, capacity: int, create: bool):
+        dtype = np.dtype([("kmer", f"S{self.kmer_length}"), ("id", "<u8")])
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.slots = np.memmap(self.path, dtype=dtype, mode="w+" if create else "r+", shape=(capacity,))
+        self.keys = self.slots["kmer"]
+        self.ids = self.slots["id"]
+
+    def _find(self, kmer: bytes) -> int:
+        slot = zlib.crc32(kmer) & self.mask
+        ids, keys = self.ids, self.keys
+        while ids[slot] and keys[slot] != kmer:
+            slot = (slot + 1) & self.mask
+        return slot
+
+    def lookup(self, kmer: bytes) -> int:
+        return int(self.ids[self._find(kmer)])
+
+    def insert(self, kmer: bytes, node_id: int):
+        if (self.count + 1) > self.capacity * self.LOAD:
+            self._grow()
+        slot = self._find(kmer)
+        if not self.ids[slot]:
+            self.count += 1
+        self.keys[slot] = kmer
+        self.ids[slot] = node_id
+
+    def _grow(self):
+        used = self.ids != 0
+        keys, ids = np.array(self.keys[used]), np.array(self.ids[used])
+        del self.slots, self.keys, self.ids
+        self.path.unlink()
+        self._map(self.capacity * 2, create=True)
+        self.count = 0
+        for kmer, node_id in zip(keys.tolist(), ids.tolist()):
+            self.insert(kmer, node_id)
+
+    def flush(self):
+        self.slots.flush()
+
+    def close(self):
+        self.flush()
+        del self.slots, self.keys, self.ids
+
+
+class DiskEdge(DBGEdge):
+    """An edge of a disk backed node, its target is held as a node id and resolved through the store.
+
+    Edges refer to their node weakly, so an evicted node is freed as soon as nothing else holds it.
+    """
+    def __init__(self, source: "DiskNode", target_id: int, sequence_index: int, cycle: str = "", fragment: str = ""):
+        self._source = weakref.ref(source)
+        self._target = target_id
+        self.sequence = sequence_index
+        self._cycle = RepeatText.compact(cycle) if isinstance(cycle, str) else cycle
+        self.fragment = fragment
+
+    @property
+    def source(self) -> "DiskNode":
+        return self._source()
+
+    @property
+    def target_node(self) -> Optional["DiskNode"]:
+        return self.source.store.node(self._target) if self._target else None
+
+    @target_node.setter
+    def target_node(self, node: Optional["DiskNode"]):
+        self._target = node.node_id if node is not None else 0
+        self.source.changed()
+
+    @DBGEdge.cycle.setter
+    def cycle(self, cycle: Union[str, RepeatText]):
+        DBGEdge.cycle.fset(self, cycle)
+        self.source.changed()
+
+
+class _EdgeList(list):
+    """The edge list of a DiskNode, changes mark the node as needing to be written."""
+    def __init__(self, node: "DiskNode", edges=()):
+        super().__init__(edges)
+        self._node = weakref.ref(node)
+
+    @property
+    def node(self) -> "DiskNode":
+        return self._node()
+
+    def _disk_edge(self, edge: DBGEdge) -> DiskEdge:
+        if isinstance(edge, DiskEdge) and edge.source is self.node:
+            return edge
+        target = edge.target_node
+        return DiskEdge(self.node, target.node_id if target is not None else 0, edge.sequence, edge.compact_cycle, edge.fragment)
+
+    def append(self, edge: DBGEdge):
+        super().append(self._disk_edge(edge))
+        self.node.changed()
+
+    def extend(self, edges):
+        super().extend(self._disk_edge(edge) for edge in edges)
+        self.node.changed()
+
+    def insert(self, index: int, edge: DBGEdge):
+        super().insert(index, self._disk_edge(edge))
+        self.node.changed()
+
+    def remove(self, edge: DBGEdge):
+        super().remove(edge)
+        self.node.changed()
+
+    def pop(self, index: int = -1) -> DiskEdge:
+        edge = super().pop(index)
+        self.node.changed()
+        return edge
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.node.changed()
+
+    def __setitem__(self, index, edge):
+        super().__setitem__(index, self._disk_edge(edge) if isinstance(edge, DBGEdge) else [self._disk_edge(e) for e in edge])
+        self.node.changed()
+
+
+class DiskNode(DBGNode):
+    """A de Bruijn node whose edges live on disk while it is not in the store's cache."""
+    def __init__(self, store: "DiskNodeStore", kmer: Optional[str], node_id: int = 0):
+        self.store = store
+        self.kmer = kmer
+        self.node_id = node_id
+        self.dirty = True
+        self.edges = _EdgeList(self)
+
+    def changed(self):
+        self.dirty = True
+        self.store.touch(self)
+
+    def encode(self) -> bytes:
+        parts = [_COUNT.pack(len(self.edges))]
+        for edge in self.edges:
+            cycle, fragment = str(edge.cycle).encode(), edge.fragment.encode()
+            parts += [_EDGE.pack(edge._target, edge.sequence, len(cycle), len(fragment)), cycle, fragment]
+        return b"".join(parts)
+
+    def decode(self, blob: bytes):
+        edges = []
+        count, = _COUNT.unpack_from(blob, 0)
+        offset = _COUNT.size
+        for _ in range(count):
+            target, sequence, cycle_length, fragment_length = _EDGE.unpack_from(blob, offset)
+            offset += _EDGE.size
+            cycle = blob[offset:offset + cycle_length].decode()
+            offset += cycle_length
+            fragment = blob[offset:offset + fragment_length].decode()
+            offset += fragment_length
+            edges.append(DiskEdge(self, target, sequence, cycle, fragment))
+        list.extend(self.edges, edges)
+        self.dirty = False
+
+
+class DiskNodeStore:
+    """The kmer to node mapping of a DiskDeBruijnGraph, used in place of its `graph` dict.
+
+    Node edge lists are written to an append only heap file when a changed node leaves
+    the LRU cache of `cache_size` nodes. A node that is still referenced after leaving
+    the cache stays the one instance of its kmer, so changes made through it are never
+    split between two copies.
+
+    Rewriting a node leaves its old blob behind, so once these dead bytes outnumber the
+    live ones (and the heap is past `COMPACT_SIZE`) the live blobs are copied to a new
+    heap. The heap stays within twice its live bytes at the cost of copying each live
+    byte about once per doubling.
+    """
+    COMPACT_SIZE = 1 << 20
+    def __init__(self, directory: Path, kmer_length: int, cache_size: int, count: int = 0, capacity: int = 1 << 16):
+        self.directory = Path(directory)
+        self.kmer_length = kmer_length
+        self.cache_size = max(16, cache_size)
+        self.table = DiskKmerTable(self.directory / "kmers.tbl", kmer_length, capacity, count)
+        self.count = count
+        records = self.directory / "nodes.bin"
+        self._records_dtype = np.dtype([("kmer", f"S{kmer_length}"), ("offset", "<u8"), ("length", "<u8")])
+        self._map_records(max(1024, count + 1), create=not records.exists())
+        heap = self.directory / "edges.heap"
+        self.heap = open(heap, "r+b" if heap.exists() else "w+b")
+        self.heap_size = heap.stat().st_size
+        self.live_bytes = int(self.records["length"][1:count + 1].sum())
+        self.cache: "OrderedDict[str, DiskNode]" = OrderedDict()
+        self.live: "weakref.WeakValueDictionary[str, DiskNode]" = weakref.WeakValueDictionary()
+        self.reads = self.writes = 0
+
+    def _map_records(self, capacity: int, create: bool):
+        path = self.directory / "nodes.bin"
+        if not create:
+            capacity = max(capacity, path.stat().st_size // self._records_dtype.itemsize)
+        self.records = np.memmap(path, dtype=self._records_dtype, mode="w+" if create else "r+", shape=(capacity,))
+
+    def _grow_records(self):
+        capacity = len(self.records) * 2
+        self.records.flush()
+        del self.records
+        with open(self.directory / "nodes.bin", "r+b") as handle:
+            handle.truncate(capacity * self._records_dtype.itemsize)
+        self._map_records(capacity, create=False)
+
+    def write_blob(self, blob: bytes) -> Tuple[int, int]:
+        offset = self.heap_size
+        self.heap.seek(offset)
+        self.heap.write(blob)
+        self.heap_size += len(blob)
+        self.writes += 1
+        return offset, len(blob)
+
+    def read_blob(self, offset: int, length: int) -> bytes:
+        self.heap.seek(offset)
+        self.reads += 1
+        return self.heap.read(length)
+
+    def _write(self, node: DiskNode):
+        offset, length = self.write_blob(node.encode())
+        self.live_bytes += length - int(self.records["length"][node.node_id])
+        self.records["offset"][node.node_id] = offset
+        self.records["length"][node.node_id] = length
+        node.dirty = False
+        if self.heap_size > self.COMPACT_SIZE and self.heap_size > 2 * self.live_bytes:
+            self.compact()
+
+    def compact(self):
+        """Copies the live blobs to a new heap in node order, dropping the blobs of rewritten nodes.
+
+        Blobs written with `write_blob` that no node record points to, such as the
+        root written by DiskDeBruijnGraph.flush, are dropped too.
+        """
+        count = self.count
+        offsets, lengths = self.records["offset"][1:count + 1], self.records["length"][1:count + 1]
+        path = self.directory / "edges.heap"
+        compacted = path.with_suffix(".compact")
+        position = 0
+        with open(compacted, "wb") as target:
+            for node_id in np.flatnonzero(lengths).tolist():
+                self.heap.seek(int(offsets[node_id]))
+                target.write(self.heap.read(int(lengths[node_id])))
+                offsets[node_id] = position
+                position += int(lengths[node_id])
+        self.heap.close()
+        os.replace(compacted, path)
+        self.heap = open(path, "r+b")
+        self.heap_size = self.live_bytes = position
+
+    def _load(self, node_id: int) -> DiskNode:
+        record = self.records[node_id]
+        node = DiskNode(self, record["kmer"].decode(), node_id)
+        if record["length"]:
+            node.decode(self.read_blob(int(record["offset"]), int(record["length"])))
+        else:
+            node.dirty = False
+        return node
+
+    def touch(self, node: DiskNode):
+        if node.kmer is None: # the root is held by the graph
+            return
+        self.cache[node.kmer] = node
+        self.cache.move_to_end(node.kmer)
+        while len(self.cache) > self.cache_size:
+            _, evicted = self.cache.popitem(last=False)
+            if evicted.dirty:
+                self._write(evicted)
+
+    def _resident(self, kmer: str, node_id: int = None) -> Optional[DiskNode]:
+        node = self.cache.get(kmer)
+        if node is None:
+            node = self.live.get(kmer)
+        if node is None:
+            node_id = node_id or self.table.lookup(kmer.encode())
+            if not node_id:
+                return None
+            node = self._load(node_id)
+            self.live[kmer] = node
+        self.touch(node)
+        return node
+
+    def node(self, node_id: int) -> DiskNode:
+        return self._resident(self.records["kmer"][node_id].decode(), node_id)
+
+    def get(self, kmer: str, default=None) -> Optional[DiskNode]:
+        node = self._resident(kmer)
+        return default if node is None else node
+
+    def __getitem__(self, kmer: str) -> DiskNode:
+        node = self._resident(kmer)
+        if node is None:
+            raise KeyError(kmer)
+        return node
+
+    def __setitem__(self, kmer: str, node: DiskNode):
+        if self.table.lookup(kmer.encode()):
+            raise ValueError(f"kmer {kmer} is already in the graph")
+        self.count += 1
+        if self.count >= len(self.records):
+            self._grow_records()
+        node.node_id = self.count
+        self.records["kmer"][node.node_id] = kmer.encode()
+        self.table.insert(kmer.encode(), node.node_id)
+        self.live[kmer] = node
+        node.changed()
+
+    def __contains__(self, kmer: str) -> bool:
+        return kmer in self.cache or bool(self.table.lookup(kmer.encode()))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def keys(self) -> Iterator[str]:
+        for node_id in range(1, self.count + 1):
+            yield self.records["kmer"][node_id].decode()
+
+    __iter__ = keys
+
+    def values(self) -> Iterator[DiskNode]:
+        for node_id in range(1, self.count + 1):
+            yield self.node(node_id)
+
+    def items(self) -> Iterator[Tuple[str, DiskNode]]:
+        for node in self.values():
+            yield node.kmer, node
+
+    def flush(self):
+        for node in self.cache.values():
+            if node.dirty:
+                self._write(node)
+        for node in list(self.live.values()):
+            if node.dirty:
+                self._write(node)
+        self.heap.flush()
+        self.records.flush()
+        self.table.flush()
+
+    def evict(self) -> int:
+        """Writes and drops every cached node, returns the number dropped."""
+        self.flush()
+        dropped = len(self.cache)
+        self.cache.clear()
+        return dropped
+
+    def disk_usage(self) -> int:
+        return sum(path.stat().st_size for path in self.directory.iterdir() if path.is_file())
+
+    def close(self):
+        self.flush()
+        self.cache.clear()
+        self.heap.close()
+        self.table.close()
+        del self.records
+
+
+class DiskDeBruijnGraph(DeBruijnGraph):
+    """A de Bruijn graph whose kmer index and edge lists are kept on disk.
+
+    The kmer to node mapping is a memory mapped open addressing table and the edges of
+    each node are serialised to an append only heap file, so only the `cache_size`
+    most recently used nodes are held in memory. Nodes are loaded on demand, which
+    keeps the `add_sequence`, `__getitem__` and `to_pog` API of DeBruijnGraph (the
+    partial order graph itself is built in memory). A `memory_budget` caps the cache
+    size, and the cache is emptied to disk whenever the budget would be exceeded.
+
+    Files go to `path`, a temporary directory removed by `close` when none is given.
+    `flush` makes the directory complete so it can be reopened with `open`.
+    """
+    def __init__(self, kmer_length: int, moltype: Union["MolType", str] = "dna", path: Union[str, Path] = None,
+                 cache_size: int = 100_000, memory_budget: int = None):
+        self._owns_directory = path is None
+        self.path = Path(tempfile.mkdtemp(prefix="dbg_") if path is None else path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._store = self._open_store(kmer_length, cache_size)
+        super().__init__(kmer_length, moltype, memory_budget)
+        self.graph = self._store
+        self._fit_cache()
+
+    def _fit_cache(self):
+        """Shrinks the cache so that it fills at most half the memory budget, the rest is headroom for a sequence."""
+        if self.memory_budget is not None:
+            sizes = self.unit_sizes()
+            self._store.cache_size = max(16, min(self._store.cache_size, self.memory_budget // (2 * (sizes["node"] + sizes["edge"]))))
+
+    def _open_store(self, kmer_length: int, cache_size: int, count: int = 0, capacity: int = 1 << 16) -> DiskNodeStore:
+        return DiskNodeStore(self.path, kmer_length, cache_size, count, capacity)
+
+    def _new_node(self, kmer: str) -> DiskNode:
+        return DiskNode(self._store, kmer)
+
+    @property
+    def cache_size(self) -> int:
+        return self._store.cache_size
+
+    def flush(self):
+        """Writes every change and the graph's metadata, after which the directory can be reopened."""
+        self._store.flush()
+        offset, length = self._store.write_blob(self.root.encode())
+        self._store.heap.flush()
+        moltype = self._moltype if isinstance(self._moltype, str) else self._moltype.label
+        metadata = {
+            "kmer_length": self.kmer_length,
+            "moltype": moltype,
+            "sequence_names": self.sequence_names,
+            "nodes": self._store.count,
+            "capacity": self._store.table.capacity,
+            "table_count": self._store.table.count,
+            "edge_count": self.edge_count,
+            "cycle_edge_count": self.cycle_edge_count,
+            "root": [offset, length],
+        }
+        (self.path / "graph.json").write_text(json.dumps(metadata))
+
+    @classmethod
+    def open(cls, path: Union[str, Path], cache_size: int = 100_000, memory_budget: int = None) -> "DiskDeBruijnGraph":
+        """Reopens a graph written by `flush`."""
+        path = Path(path)
+        metadata = json.loads((path / "graph.json").read_text())
+        graph = cls.__new__(cls)
+        graph._owns_directory = False
+        graph.path = path
+        graph._store = DiskNodeStore(path, metadata["kmer_length"], cache_size, metadata["nodes"], metadata["capacity"])
+        graph._store.table.count = metadata["table_count"]
+        DeBruijnGraph.__init__(graph, metadata["kmer_length"], metadata["moltype"], memory_budget)
+        graph.graph = graph._store
+        graph.sequence_names = {name: tuple(value) for name, value in metadata["sequence_names"].items()}
+        graph.edge_count = metadata["edge_count"]
+        graph.cycle_edge_count = metadata["cycle_edge_count"]
+        graph.root.decode(graph._store.read_blob(*metadata["root"]))
+        graph._fit_cache()
+        return graph
+
+    def close(self):
+        """Flushes and closes the files, removing them when the graph made its own temporary directory."""
+        if self._store is None:
+            return
+        if self._owns_directory:
+            self._store.close()
+            shutil.rmtree(self.path, ignore_errors=True)
+        else:
+            self.flush()
+            self._store.close()
+        self._store = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def disk_usage(self) -> int:
+        """Bytes of the graph's files."""
+        return self._store.disk_usage()
+
+    def memory_usage(self) -> MemoryUsage:
+        """The bytes held in memory: the cached nodes with their edges and text, and the indexes."""
+        resident = [self.root, *self._store.cache.values()]
+        nodes = edges = kmers = cycles = 0
+        for node in resident:
+            nodes += object_size(node) + sys.getsizeof(node.edges)
+            kmers += sys.getsizeof(node.kmer) if node.kmer else 0
+            for edge in node.edges:
+                edges += object_size(edge)
+                cycles += sys.getsizeof(edge.compact_cycle) if edge.compact_cycle else 0
+        index = sys.getsizeof(self._store.cache) + sys.getsizeof(self.sequence_names)
+        return MemoryUsage({"nodes": nodes, "edges": edges, "kmers": kmers, "cycles": cycles, "fragments": 0, "index": index})
+
+    def estimate_memory(self) -> int:
+        sizes = self.unit_sizes()
+        edges_per_node = self.edge_count / max(1, len(self.graph))
+        resident = len(self._store.cache) + 1
+        return int(resident * (sizes["node"] + edges_per_node * sizes["edge"]))
+
+    def _predict_growth(self, sequence: str) -> Tuple[int, int]:
+        # new nodes go to disk once they leave the cache, only a cache full can be resident
+        nodes, edges = super()._predict_growth(sequence)
+        return min(nodes, self.cache_size), min(edges, self.cache_size)
+
+    def _reclaim(self, required: int) -> bool:
+        return self._store.evict() > 0
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception: # interpreter shutdown, files may already be gone
+            pass
@@ -0,0 +1,311 @@
+"""Streaming mermaid and graphviz export of de Bruijn and partial order graphs.
+
+The exporters yield vertices and edges one at a time and the writers turn each
+into a line of text written straight to a stream, so no description of the whole
+graph is ever held in memory. Exports can be narrowed down before they are written:
+
+- `seeds` and `radius`: only the vertices within `radius` steps (in either
+  direction) of the seed kmers, nodes or bubbles.
+- `unitigs`: chains of nodes that every sequence passes through in the same way
+  are collapsed into one vertex.
+- `min_coverage`: vertices and edges carrying fewer sequences are left out.
+- `collapse_bubbles` (partial order graphs): every top level bubble is drawn as a
+  single edge between the conserved nodes around it.
+
+Finding the predecessors of a de Bruijn node only needs kmer lookups, so exporting
+the neighbourhood of a node of a very large dense graph does not touch the rest of
+it. Cycle edges and sparse graphs need a reverse index built in one pass.
+"""
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set, TextIO, Tuple, Union
+
+# ("node", id, label, coverage) and ("edge", source id, target id, label, coverage)
+Element = tuple
+
+START, END = "start", "end"
+
+
+def _vertex_id(node) -> str:
+    return f"n{id(node):x}"
+
+
+def _short(text: str, max_label: int) -> str:
+    if max_label and len(text) > max_label:
+        half = max(1, (max_label - 1) // 2)
+        return text[:half] + "…" + text[-half:]
+    return text
+
+
+def _edge_label(sequences: Set[int], text: str, max_label: int) -> str:
+    label = str(len(sequences))
+    return f"{label}: {_short(text, max_label)}" if text else label
+
+
+def _neighbourhood(seeds: Iterable, radius: int, successors: Callable, predecessors: Callable) -> Set:
+    selected = set(seeds)
+    frontier = deque((seed, 0) for seed in selected)
+    while frontier:
+        node, distance = frontier.popleft()
+        if distance == radius:
+            continue
+        for neighbour in [*successors(node), *predecessors(node)]:
+            if neighbour is not None and neighbour not in selected:
+                selected.add(neighbour)
+                frontier.append((neighbour, distance + 1))
+    return selected
+
+
+class _DBGView:
+    """Adjacency of a de Bruijn graph as seen by the exporter."""
+    def __init__(self, dbg: "DeBruijnGraph", indexed: bool):
+        self.dbg = dbg
+        self.root = dbg.root
+        self.alphabet = "".join(dbg.moltype.alphabets.degen_gapped) if dbg.moltype is not None else "ACGT"
+        self.reverse: Optional[Dict] = None
+        self.arriving: Optional[Dict] = None
+        if indexed:
+            self.reverse, self.arriving = {}, {}
+            for node in [self.root, *dbg.graph.values()]:
+                for target, (sequences, _) in self.successors(node).items():
+                    if target is not None:
+                        self.reverse.setdefault(target, {}).setdefault(node, set()).update(sequences)
+                        self.arriving.setdefault(target, set()).update(sequences)
+
+    @staticmethod
+    def successors(node) -> Dict[object, Tuple[Set[int], str]]:
+        """Distinct targets of a node with the sequences and text on the edges to them."""
+        targets = {}
+        for edge in node.edges:
+            sequences, text = targets.setdefault(edge.target_node, (set(), edge.text))
+            sequences.add(edge.sequence)
+        return targets
+
+    def predecessors(self, node) -> Dict[object, Set[int]]:
+        if node is self.root:
+            return {}
+        if self.reverse is not None:
+            return self.reverse.get(node, {})
+        # a kmer can only be reached from the kmers it overlaps, or from the root
+        sources = {}
+        candidates = [self.root] + [self.dbg.graph.get(char + node.kmer[:-1]) for char in self.alphabet]
+        for source in candidates:
+            if source is None:
+                continue
+            for edge in source.edges:
+                if edge.target_node is node:
+                    sources.setdefault(source, set()).add(edge.sequence)
+        return sources
+
+    def coverage(self, node) -> Set[int]:
+        if node is self.root:
+            return {index for index, _ in self.dbg.sequence_names.values()}
+        if self.arriving is not None:
+            return self.arriving.get(node, set())
+        arriving = set()
+        for sequences in self.predecessors(node).values():
+            arriving |= sequences
+        return arriving
+
+    def label(self, chain: list, max_label: int) -> str:
+        if chain[0] is self.root:
+            return START
+        text = chain[0].kmer + "".join(node.entry_text() for node in chain[1:])
+        return _short(text, max_label)
+
+
+class _POGView:
+    def __init__(self, pog: "PartialOrderGraph"):
+        self.root = pog.root
+        self.reverse: Dict = {}
+        stack, seen = [self.root], {self.root}
+        while stack:
+            node = stack.pop()
+            for successor in node.next:
+                self.reverse.setdefault(successor, {})[node] = successor.sequence_set
+                if successor not in seen:
+                    seen.add(successor)
+                    stack.append(successor)
+        self.nodes = seen
+
+    @staticmethod
+    def successors(node) -> Dict[object, Tuple[Set[int], str]]:
+        return {successor: (successor.sequence_set & node.sequence_set, "") for successor in dict.fromkeys(node.next)}
+
+    def predecessors(self, node) -> Dict[object, Set[int]]:
+        return self.reverse.get(node, {})
+
+    @staticmethod
+    def coverage(node) -> Set[int]:
+        return node.sequence_set or set()
+
+    def label(self, chain: list, max_label: int) -> str:
+        if chain[0] is self.root and chain[0].fragment is None:
+            return START
+        text = "".join(node.fragment or "" for node in chain)
+        return _short(text, max_label) if text or chain[0].next else END
+
+
+def _elements(view, nodes: Iterable, selected: Optional[Set], unitigs: bool, min_coverage: int, max_label: int) -> Iterator[Element]:
+    """Yields a vertex for every unitig start among `nodes` and the edges leaving its unitig.
+
+    `selected` limits the export to a set of nodes, None exports the whole graph.
+    """
+    root = view.root
+
+    def keep(node) -> bool:
+        if node is None or (selected is not None and node not in selected):
+            return False
+        return node is root or len(view.coverage(node)) >= min_coverage
+
+    decided: Dict[object, bool] = {}
+
+    def internal(node) -> bool:
+        if node not in decided:
+            decided[node] = continues(node)
+        return decided[node]
+
+    def continues(node) -> bool:
+        """True when a node only continues the unitig of its single predecessor."""
+        if not unitigs or node is root or not keep(node):
+            return False
+        sources = view.predecessors(node)
+        if len(sources) != 1:
+            return False
+        source, = sources
+        if source is root or not keep(source):
+            return False
+        targets = view.successors(source)
+        if len(targets) != 1 or next(iter(targets.values()))[1]:
+            return False
+        return view.coverage(source) == view.coverage(node)
+
+    needs_end = False
+    for node in nodes:
+        if not keep(node) or internal(node):
+            continue
+        chain = [node]
+        while True:
+            targets = view.successors(chain[-1])
+            if len(targets) != 1:
+                break
+            (target, (_, text)), = targets.items()
+            if text or not internal(target):
+                break
+            chain.append(target)
+        vertex = START if node is root else _vertex_id(node)
+        yield ("node", vertex, view.label(chain, max_label), len(view.coverage(node)))
+        for target, (sequences, text) in view.successors(chain[-1]).items():
+            if len(sequences) < min_coverage:
+                continue
+            if target is None:
+                needs_end = True
+                yield ("edge", vertex, END, _edge_label(sequences, text, max_label), len(sequences))
+            elif keep(target):
+                yield ("edge", vertex, _vertex_id(target), _edge_label(sequences, text, max_label), len(sequences))
+    if needs_end:
+        yield ("node", END, END, 0)
+
+
+def dbg_elements(dbg: "DeBruijnGraph", seeds: Iterable = None, radius: int = 2, unitigs: bool = True,
+                 min_coverage: int = 1, max_label: int = 40) -> Iterator[Element]:
+    """Yields the vertices and edges of a de Bruijn graph, seeds are kmers or nodes."""
+    from .sparse_debruijngraph import SparseDeBruijnGraph
+    indexed = seeds is None or isinstance(dbg, SparseDeBruijnGraph) or dbg.cycle_edge_count > 0
+    view = _DBGView(dbg, indexed)
+    if seeds is None:
+        return _elements(view, [dbg.root, *dbg.graph.values()], None, unitigs, min_coverage, max_label)
+    seed_nodes = [dbg.graph[seed] if isinstance(seed, str) else seed for seed in seeds]
+    nodes = _neighbourhood(seed_nodes, radius, lambda node: view.successors(node).keys(), lambda node: view.predecessors(node).keys())
+    return _elements(view, list(nodes), nodes, unitigs, min_coverage, max_label)
+
+
+def pog_elements(pog: "PartialOrderGraph", seeds: Iterable = None, radius: int = 2, unitigs: bool = True,
+                 min_coverage: int = 1, collapse_bubbles: bool = False, max_label: int = 40) -> Iterator[Element]:
+    """Yields the vertices and edges of a partial order graph, seeds are nodes or bubbles."""
+    from .pog_bubble import POG_Bubble
+    if collapse_bubbles:
+        return _collapsed_pog(pog, max_label)
+    view = _POGView(pog)
+    if seeds is None:
+        return _elements(view, view.nodes, None, unitigs, min_coverage, max_label)
+    seed_nodes = []
+    for seed in seeds:
+        seed_nodes.extend([seed.start, seed.end] if isinstance(seed, POG_Bubble) else [seed])
+    nodes = _neighbourhood(seed_nodes, radius, lambda node: node.next, lambda node: view.predecessors(node).keys())
+    return _elements(view, list(nodes), nodes, unitigs, min_coverage, max_label)
+
+
+def _collapsed_pog(pog: "PartialOrderGraph", max_label: int) -> Iterator[Element]:
+    from .pog_bubble import POG_Bubble
+    yield ("node", START, START, len(pog.sequence_names))
+    previous = START
+    for segment in pog.segments():
+        if isinstance(segment, POG_Bubble):
+            lengths = segment.branch_lengths().values()
+            end = segment.end
+            vertex = _vertex_id(end) if end is not None and end.fragment else END
+            label = f"bubble {len(set(segment.branches().values()))} branches {min(lengths, default=0)}-{max(lengths, default=0)} bp"
+            yield ("edge", previous, vertex, label, len(segment.start.sequence_set))
+            previous = vertex
+        else:
+            vertex = _vertex_id(segment)
+            yield ("node", vertex, _short(segment.fragment, max_label), len(segment.sequence_set))
+            if previous != vertex:
+                yield ("edge", previous, vertex, "", len(segment.sequence_set))
+            previous = vertex
+    if previous != END:
+        yield ("edge", previous, END, "", len(pog.sequence_names))
+    yield ("node", END, END, len(pog.sequence_names))
+
+
+def _open(target: Union[str, Path, TextIO]):
+    if isinstance(target, (str, Path)):
+        return open(target, "w"), True
+    return target, False
+
+
+def _quote(text: str) -> str:
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def write_mermaid(elements: Iterable[Element], target: Union[str, Path, TextIO]) -> int:
+    """Writes elements as a mermaid flowchart, returns the number of elements written."""
+    stream, owned = _open(target)
+    written = 0
+    try:
+        stream.write("graph LR;\n")
+        for element in elements:
+            if element[0] == "node":
+                _, vertex, label, _ = element
+                stream.write(f'{vertex}["{label.replace(chr(34), "#quot;")}"];\n')
+            else:
+                _, source, target_vertex, label, _ = element
+                arrow = f"-->|{label}|" if label else "-->"
+                stream.write(f"{source} {arrow} {target_vertex};\n")
+            written += 1
+    finally:
+        if owned:
+            stream.close()
+    return written
+
+
+def write_graphviz(elements: Iterable[Element], target: Union[str, Path, TextIO], name: str = "G") -> int:
+    """Writes elements as a graphviz digraph, edge widths follow coverage. Returns the number of elements written."""
+    stream, owned = _open(target)
+    written = 0
+    try:
+        stream.write(f'digraph "{_quote(name)}" {{\n  rankdir=LR;\n  node [shape=box];\n')
+        for element in elements:
+            if element[0] == "node":
+                _, vertex, label, _ = element
+                stream.write(f'  {vertex} [label="{_quote(label)}"];\n')
+            else:
+                _, source, target_vertex, label, coverage = element
+                stream.write(f'  {source} -> {target_vertex} [label="{_quote(label)}", penwidth={1 + min(coverage, 20) / 4:.2f}];\n')
+            written += 1
+        stream.write("}\n")
+    finally:
+        if owned:
+            stream.close()
+    return written
@@ -0,0 +1,117 @@
+from typing import TYPE_CHECKING, Dict, List, Tuple, Union
+
+import numpy as np
+
+from .count_min import CountMinSketch
+from .debruijngraph import DeBruijnGraph
+from .kmer_statistics import as_strings
+
+if TYPE_CHECKING:
+    from cogent3.core.moltype import MolType
+
+
+class FilteredDeBruijnGraph(DeBruijnGraph):
+    """A de Bruijn graph that only keeps kmers seen at least `min_count` times.
+
+    Sequencing errors and rare variants make kmers that occur once or twice. Their
+    abundance is counted in a fixed memory CountMinSketch, either in a first pass over
+    all the sequences (`count`, or `from_sequences` for both passes) or as sequences
+    are added with `streaming` set, in which case a kmer becomes solid once enough
+    sequences carrying it have arrived. Each sequence is threaded through its solid
+    kmers only, an edge between two solid kmers that are not neighbours carries the
+    sequence between them in `fragment`, so sequences are still rebuilt exactly while
+    low abundance kmers add no nodes and no bubbles of their own.
+    """
+    def __init__(self, kmer_length: int, moltype: Union["MolType", str] = "dna", min_count: int = 2, sketch: CountMinSketch = None,
+                 streaming: bool = False, memory_budget: int = None):
+        if min_count < 1:
+            raise ValueError("min_count must be at least 1")
+        super().__init__(kmer_length, moltype, memory_budget)
+        self.min_count = min_count
+        self.sketch = sketch if sketch is not None else CountMinSketch()
+        self.streaming = streaming
+        self.fragment_edge_count = 0
+        self.filtered_kmers = 0 # kmer occurrences skipped for low abundance
+
+    @classmethod
+    def from_sequences(cls, sequences: Union[Dict[str, str], List[str]], kmer_length: int, min_count: int = 2, **options) -> "FilteredDeBruijnGraph":
+        """Counts the kmers of the sequences, then builds the graph of their solid kmers."""
+        graph = cls(kmer_length, min_count=min_count, **options)
+        graph.count(sequences)
+        graph.add_sequence(sequences)
+        return graph
+
+    def count(self, sequences: Union[str, Dict[str, str], List[str], "SequenceCollection"]):
+        """First pass: adds the kmers of the sequences to the abundance sketch without building anything."""
+        self.sketch.add_sequences(as_strings(sequences), self.kmer_length)
+
+    def solid_positions(self, sequence: str) -> np.ndarray:
+        """Returns the start of every kmer of the sequence whose estimated count reaches min_count."""
+        return np.flatnonzero(self.sketch.kmer_counts(sequence, self.kmer_length) >= self.min_count)
+
+    def _add_kmers(self, sequence: str, sequence_index: int):
+        """Threads a sequence through its solid kmers.
+
+        An edge's text is the sequence between the end of its source kmer and the last
+        character of its target kmer: empty for neighbouring kmers, the skipped low
+        abundance stretch otherwise. Stretches that pass a kmer this sequence has
+        already been through are held as cycle text, as in the full graph.
+        """
+        from .dbg_edge import DBGEdge
+        k = self.kmer_length
+        if self.streaming:
+            self.sketch.add_sequence(sequence, k)
+        solid = self.solid_positions(sequence)
+        self.filtered_kmers += len(sequence) - k + 1 - len(solid)
+        current_node, end = self.root, 0 # end: where the text of the next edge starts
+        visited = set()
+        looped = False # the stretch since current_node passes a kmer already visited
+        for position in solid.tolist():
+            kmer = sequence[position:position + k]
+            if kmer in visited:
+                looped = True
+                continue
+            next_node = self.graph.get(kmer)
+            if next_node is None:
+                next_node = self._new_node(kmer)
+                self.graph[kmer] = next_node
+            # the first kmer is read in full, later ones add their last character
+            text = sequence[end:position] if current_node is self.root else sequence[end:position + k - 1]
+            current_node.edges.append(self._edge(DBGEdge, next_node, sequence_index, text, looped))
+            visited.add(kmer)
+            current_node, end, looped = next_node, position + k, False
+        if end < len(sequence): # the tail after the last solid kmer, or a sequence without any
+            current_node.edges.append(self._edge(DBGEdge, None, sequence_index, sequence[end:], looped))
+
+    def _edge(self, edge_type, target, sequence_index: int, text: str, looped: bool):
+        self.edge_count += 1
+        if looped:
+            self.cycle_edge_count += 1
+            return edge_type(target, sequence_index, cycle=text)
+        if text:
+            self.fragment_edge_count += 1
+        return edge_type(target, sequence_index, fragment=text)
+
+    def merge(self, other: "FilteredDeBruijnGraph") -> "FilteredDeBruijnGraph":
+        """Adds another filtered graph's sequences and kmer counts, see DeBruijnGraph.merge."""
+        if type(other) is type(self):
+            if other.min_count != self.min_count:
+                raise ValueError("Only graphs filtered with the same min_count can be merged")
+            if (other.sketch.width, other.sketch.depth, other.sketch.seed) != (self.sketch.width, self.sketch.depth, self.sketch.seed):
+                raise ValueError("Only graphs counted with the same sketch shape and seed can be merged")
+        super().merge(other)
+        self.sketch += other.sketch
+        self.fragment_edge_count += other.fragment_edge_count
+        self.filtered_kmers += other.filtered_kmers
+        return self
+
+    def pog_node_bound(self) -> int:
+        # the text skipped by an edge can need a node of its own
+        return super().pog_node_bound() + self.fragment_edge_count
+
+    def _predict_growth(self, sequence: str) -> Tuple[int, int]:
+        solid = len(self.solid_positions(sequence))
+        return solid, solid + 1
+
+    def __repr__(self):
+        return f"filtered dbg k:{self.kmer_length}, min_count:{self.min_count}, mol:{self.moltype}, seq's:{len(self)})"
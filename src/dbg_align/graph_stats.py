@@ -0,0 +1,218 @@
+"""Whole graph statistics computed in vectorised passes over flattened graphs.
+
+`graph_stats` answers triage questions (how big is this graph, how much of each
+sequence sits on anchors every sequence shares, how many DP cells would each
+AlignmentMethod take) without walking node objects or replaying plans:
+
+    print(graph_stats(pog))
+
+The graph is first laid out as flat arrays by `shared_graph.flatten`, a SharedGraph
+is read as it is, so statistics of a published graph cost no copy at all. Every
+figure after that is a handful of numpy passes over the arrays.
+
+Bubbles are the stretches between consecutive anchors, the nodes with text that
+every sequence passes through. A bubble's branches are the stretches of each sequence
+through it. Its depth is the largest number of distinct sequence sets met along one
+branch, nested bubbles narrow the set of sequences a branch is shared by, so this is
+the nesting depth when sequence sets nest. DP cells follow `PartialOrderGraph.work`:
+progressive alignment aligns the sequences sorted by length, each to the next, the
+graph methods do the same with the branches of each bubble, braided branches counted
+once per distinct text, as in `MergeOrderOptimizer.bubble_items`.
+"""
+import math
+from typing import Dict, Union
+
+import numpy as np
+
+from .constants import AlignmentMethod
+
+
+class GraphStats:
+    """The statistics of one graph, see the module docstring.
+
+    `coverage` maps each sequence name to the fraction of it on anchors, of its
+    length in a partial order graph and of its kmers in a de Bruijn graph.
+    `bubble_sizes` is a histogram of nodes per bubble keyed on powers of two (the
+    count of bubbles with at most that many nodes and more than half as many),
+    `bubble_depths` one keyed on depth. `cells` holds the estimated DP cells of each
+    AlignmentMethod that can be estimated from the graph, a de Bruijn graph only has
+    the methods that depend on sequence lengths alone.
+    """
+    def __init__(self, kind: str, sequences: int, nodes: int, edges: int, unitigs: int, anchors: int, cycles: int,
+                 coverage: Dict[str, float], bubbles: int = 0, bubble_sizes: Dict[int, int] = None,
+                 bubble_depths: Dict[int, int] = None, cells: Dict[AlignmentMethod, float] = None):
+        self.kind = kind
+        self.sequences = sequences
+        self.nodes = nodes
+        self.edges = edges
+        self.unitigs = unitigs
+        self.anchors = anchors
+        self.cycles = cycles # back edges of a partial order graph, edges holding cycle text of a de Bruijn graph
+        self.coverage = coverage
+        self.bubbles = bubbles
+        self.bubble_sizes = bubble_sizes or {}
+        self.bubble_depths = bubble_depths or {}
+        self.cells = cells or {}
+
+    def cheapest(self) -> AlignmentMethod:
+        """Returns the runnable method with the fewest estimated cells."""
+        runnable = {method: cells for method, cells in self.cells.items() if method != AlignmentMethod.EXACT}
+        return min(runnable, key=runnable.get)
+
+    def to_dict(self) -> dict:
+        values = dict(vars(self))
+        values["cells"] = {method.name: cells for method, cells in self.cells.items()}
+        return values
+
+    def __str__(self):
+        lines = [
+            f"{self.kind}: {self.sequences} sequences, {self.nodes} nodes, {self.edges} edges, {self.unitigs} unitigs, "
+            f"{self.anchors} anchors, {self.cycles} cycles",
+        ]
+        if self.coverage:
+            values = list(self.coverage.values())
+            lines.append(f"anchor coverage: min {min(values):.3f}, mean {sum(values) / len(values):.3f}, max {max(values):.3f}")
+        if self.bubbles:
+            lines.append(f"bubbles: {self.bubbles}")
+            lines.append("  nodes  " + " ".join(f"<={size}:{count}" for size, count in self.bubble_sizes.items()))
+            lines.append("  depth  " + " ".join(f"{depth}:{count}" for depth, count in self.bubble_depths.items()))
+        for method, cells in self.cells.items():
+            lines.append(f"{method.name:<20} {cells:>12.4g} cells")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"GraphStats({self.kind}, sequences={self.sequences}, nodes={self.nodes}, bubbles={self.bubbles})"
+
+
+def graph_stats(graph: Union["DeBruijnGraph", "PartialOrderGraph", "SharedGraph"]) -> GraphStats:
+    """Computes the statistics of a de Bruijn graph, a partial order graph or a shared graph of either."""
+    from .shared_graph import SharedGraph, flatten
+    if isinstance(graph, SharedGraph):
+        meta, arrays, names = graph.meta, graph.arrays, graph.sequence_names
+    else:
+        (meta, arrays), names = flatten(graph), graph.sequence_names
+    if meta["kind"] == "pog":
+        return _pog_stats(arrays, names)
+    return _dbg_stats(arrays, names)
+
+
+def _length_cells(names: Dict[str, tuple]) -> Dict[AlignmentMethod, float]:
+    lengths = np.sort(np.array([length for _, length in names.values()], dtype=np.float64))
+    # the product of all lengths is summed in log space, as in AlignmentPlanner
+    log_cells = math.fsum(math.log(max(length, 1)) for length in lengths.tolist())
+    return {
+        AlignmentMethod.EXACT: math.exp(log_cells) if log_cells < 700 else math.inf,
+        AlignmentMethod.PROGRESSIVE: float(np.sum(lengths[1:] * lengths[:-1])),
+    }
+
+
+def _chain_cells(groups: np.ndarray, lengths: np.ndarray) -> float:
+    """Cells of aligning the items of each group sorted by length, each to the next."""
+    order = np.lexsort((lengths, groups))
+    groups, lengths = groups[order], lengths[order].astype(np.float64)
+    same = groups[1:] == groups[:-1]
+    return float(np.sum(lengths[1:] * lengths[:-1] * same))
+
+
+def _row_totals(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """The running total of values within each CSR row, counting the entry itself."""
+    totals = np.cumsum(values)
+    before = np.concatenate([[0], totals])[offsets[:-1]]
+    return totals - np.repeat(before, np.diff(offsets))
+
+
+def _log2_histogram(values: np.ndarray) -> Dict[int, int]:
+    if not len(values):
+        return {}
+    bins = np.ceil(np.log2(np.maximum(values, 1))).astype(np.int64)
+    counts = np.bincount(bins)
+    return {1 << int(power): int(count) for power, count in enumerate(counts) if count}
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    from .kmer_hash import _mix
+    return _mix(values.astype(np.uint64))
+
+
+def _pog_stats(arrays: Dict[str, np.ndarray], names: Dict[str, tuple]) -> GraphStats:
+    sequences = len(names)
+    text_lengths = np.diff(arrays["text_offsets"])
+    set_sizes = np.diff(arrays["set_offsets"])
+    count = len(text_lengths)
+    out_degree = np.diff(arrays["next_offsets"])
+    sources, targets = np.repeat(np.arange(count), out_degree), arrays["next"]
+    in_degree = np.bincount(targets, minlength=count)
+    has_text = text_lengths > 0
+    # a node continues a unitig when it is the only successor of its only predecessor
+    continuing = (in_degree[targets] == 1) & (out_degree[sources] == 1) & has_text[sources] & has_text[targets]
+    anchor = has_text & (set_sizes == sequences)
+
+    paths, path_offsets = arrays["paths"], arrays["path_offsets"]
+    rows = len(path_offsets) - 1
+    row = np.repeat(np.arange(rows), np.diff(path_offsets))
+    lengths = text_lengths[paths]
+    on_anchor = anchor[paths]
+    anchored = np.bincount(row, weights=lengths * on_anchor, minlength=rows)
+    total = np.bincount(row, weights=lengths, minlength=rows)
+    coverage = {name: float(anchored[index] / total[index]) if total[index] else 0.0 for name, (index, _) in names.items()}
+
+    # entries off anchors, each in the bubble numbered by the anchors its sequence passed before it
+    bubble = _row_totals(on_anchor.astype(np.int64), path_offsets)[~on_anchor]
+    row, nodes, lengths = row[~on_anchor], paths[~on_anchor], lengths[~on_anchor]
+    branch_keys, branch = np.unique(bubble * rows + row, return_inverse=True)
+    branch_bubble = branch_keys // rows
+    branch_lengths = np.bincount(branch, weights=lengths, minlength=len(branch_keys))
+    # a branch's text is identified by the wrapping sum of hashes of its characters and their positions,
+    # entries of a branch are consecutive in path order so positions run on from entry to entry
+    within = _row_totals(lengths, np.flatnonzero(np.diff(branch, prepend=-1, append=-1))) - lengths
+    characters = np.repeat(np.arange(len(nodes)), lengths)
+    step = np.arange(len(characters)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    codes = arrays["text"][arrays["text_offsets"][nodes][characters] + step].astype(np.uint64)
+    signatures = np.zeros(len(branch_keys), dtype=np.uint64)
+    np.add.at(signatures, branch[characters], _mix(((within[characters] + step).astype(np.uint64) << np.uint64(8)) | codes))
+    _, first = np.unique(np.stack([branch_bubble.astype(np.uint64), signatures]), axis=1, return_index=True)
+    bubbles, bubble_index = np.unique(branch_bubble, return_inverse=True)
+    members = np.unique(bubble * count + nodes) // count
+    sizes = np.bincount(np.searchsorted(bubbles, members), minlength=len(bubbles))
+    # a node's sequence set is identified by the wrapping sum of hashes of its members
+    set_totals = np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(_mix(arrays["sets"]), dtype=np.uint64)])
+    set_signatures = set_totals[arrays["set_offsets"][1:]] - set_totals[arrays["set_offsets"][:-1]]
+    distinct_sets = np.unique(np.stack([branch.astype(np.uint64), set_signatures[nodes]]), axis=1)
+    branch_depths = np.bincount(distinct_sets[0].astype(np.int64), minlength=len(branch_keys))
+    depths = np.zeros(len(bubbles), dtype=np.int64)
+    np.maximum.at(depths, bubble_index, branch_depths)
+
+    cells = _length_cells(names)
+    cells[AlignmentMethod.DEBRUIJNGRAPH] = _chain_cells(branch_bubble, branch_lengths)
+    cells[AlignmentMethod.BRAIDEDDEBRUIJGRAPH] = _chain_cells(branch_bubble[first], branch_lengths[first])
+    return GraphStats(
+        "pog", sequences, int(np.count_nonzero(has_text)), len(targets), int(np.count_nonzero(has_text) - np.count_nonzero(continuing)),
+        int(np.count_nonzero(anchor)), int(np.count_nonzero(targets <= sources)), coverage, len(bubbles), _log2_histogram(sizes),
+        {int(depth): int(n) for depth, n in enumerate(np.bincount(depths)) if n}, cells,
+    )
+
+
+def _dbg_stats(arrays: Dict[str, np.ndarray], names: Dict[str, tuple]) -> GraphStats:
+    sequences = len(names)
+    count = len(arrays["kmers"])
+    out_edges = np.diff(arrays["edge_offsets"])
+    sources, targets = np.repeat(np.arange(count), out_edges), arrays["edge_targets"].astype(np.int64)
+    visits = targets >= 0
+    links = np.unique(sources[visits] * count + targets[visits])
+    link_sources, link_targets = links // count, links % count
+    out_degree = np.bincount(link_sources, minlength=count)
+    in_degree = np.bincount(link_targets, minlength=count)
+    continuing = (in_degree[link_targets] == 1) & (out_degree[link_sources] == 1) & (link_sources != 0)
+    # kmers every sequence passes through
+    seen = np.unique(targets[visits] * (sequences + 1) + arrays["edge_sequences"][visits])
+    anchor = np.bincount(seen // (sequences + 1), minlength=count) == sequences
+    anchor[0] = False
+    visitors = arrays["edge_sequences"][visits]
+    rows = int(max((index for index, _ in names.values()), default=0)) + 1
+    anchored = np.bincount(visitors, weights=anchor[targets[visits]], minlength=rows)
+    total = np.bincount(visitors, minlength=rows)
+    coverage = {name: float(anchored[index] / total[index]) if total[index] else 0.0 for name, (index, _) in names.items()}
+    return GraphStats(
+        "dbg", sequences, count - 1, len(targets), int(count - 1 - np.count_nonzero(continuing)), int(np.count_nonzero(anchor)),
+        int(np.count_nonzero(np.diff(arrays["cycle_offsets"]))), coverage, cells=_length_cells(names),
+    )
@@ -0,0 +1,144 @@
+"""Timers and counters for the phases of building and aligning graphs.
+
+Instrumentation is off by default. While it is off `timer` hands back a shared
+no-op context manager and `count` returns at once, so the hooks left in the
+pipeline cost a global lookup and a call. Turn it on with a sink:
+
+    with instrumented() as recorder:
+        dbg.add_sequence(sequences)
+        pog = dbg.to_pog()
+    print(recorder)
+
+A sink is any object with `time(name, seconds)` and `count(name, value)` methods,
+`CallbackSink` forwards both to a single callback.
+"""
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+
+class Sink:
+    """Receives measurements, subclasses decide what to do with them."""
+    def time(self, name: str, seconds: float):
+        pass
+
+    def count(self, name: str, value: int):
+        pass
+
+
+class Recorder(Sink):
+    """Accumulates the number of calls and total time of every timer and the total of every counter."""
+    def __init__(self):
+        self.timers: Dict[str, list] = {}
+        self.counters: Dict[str, int] = {}
+
+    def time(self, name: str, seconds: float):
+        entry = self.timers.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def count(self, name: str, value: int):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def seconds(self, name: str) -> float:
+        return self.timers.get(name, (0, 0.0))[1]
+
+    def calls(self, name: str) -> int:
+        return self.timers.get(name, (0, 0.0))[0]
+
+    def report(self) -> dict:
+        return {
+            "timers": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in sorted(self.timers.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def clear(self):
+        self.timers.clear()
+        self.counters.clear()
+
+    def __str__(self):
+        lines = [f"{name:<40} {calls:>8} calls {seconds * 1000:12.3f} ms" for name, (calls, seconds) in sorted(self.timers.items())]
+        lines += [f"{name:<40} {value:>8}" for name, value in sorted(self.counters.items())]
+        return "\n".join(lines)
+
+
+class CallbackSink(Sink):
+    """Forwards every measurement to `callback(kind, name, value)`, kind is "time" or "count"."""
+    def __init__(self, callback: Callable[[str, str, float], None]):
+        self.callback = callback
+
+    def time(self, name: str, seconds: float):
+        self.callback("time", name, seconds)
+
+    def count(self, name: str, value: int):
+        self.callback("count", name, value)
+
+
+_sink: Optional[Sink] = None
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("sink", "name", "start")
+
+    def __init__(self, sink: Sink, name: str):
+        self.sink = sink
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.sink.time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def enabled() -> bool:
+    return _sink is not None
+
+
+def enable(sink: Sink = None) -> Sink:
+    """Sends measurements to a sink (a new Recorder by default) until `disable` is called."""
+    global _sink
+    _sink = sink if sink is not None else Recorder()
+    return _sink
+
+
+def disable():
+    global _sink
+    _sink = None
+
+
+@contextmanager
+def instrumented(sink: Sink = None) -> Iterator[Sink]:
+    """Enables instrumentation for the duration of a with block, restoring the previous sink afterwards."""
+    global _sink
+    previous = _sink
+    current = enable(sink)
+    try:
+        yield current
+    finally:
+        _sink = previous
+
+
+def timer(name: str):
+    """Returns a context manager that times its block under `name`."""
+    if _sink is None:
+        return _NULL_TIMER
+    return _Timer(_sink, name)
+
+
+def count(name: str, value: int = 1):
+    if _sink is not None:
+        _sink.count(name, value)
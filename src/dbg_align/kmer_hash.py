@@ -0,0 +1,67 @@
+import numpy as np
+
+# multiplier of the polynomial rolling hash, arithmetic wraps modulo 2**64
+_BASE = np.uint64(0x100000001B3)
+
+
+def encode(sequence: str) -> np.ndarray:
+    """Returns the upper cased ASCII codes of a sequence."""
+    return np.frombuffer(sequence.upper().encode("ascii"), dtype=np.uint8)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finaliser, spreads polynomial hashes so their order looks random."""
+    values = values.copy()
+    values ^= values >> np.uint64(30)
+    values *= np.uint64(0xBF58476D1CE4E5B9)
+    values ^= values >> np.uint64(27)
+    values *= np.uint64(0x94D049BB133111EB)
+    values ^= values >> np.uint64(31)
+    return values
+
+
+def kmer_hashes(codes: np.ndarray, k: int) -> np.ndarray:
+    """Returns a 64 bit hash of every k-mer, `hashes[i]` is the hash of `codes[i:i + k]`.
+
+    The polynomial is built with one vector operation per k-mer position, so the cost
+    is O(n k) numpy work rather than O(n k) Python work.
+    """
+    n = len(codes) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64)
+    values = codes.astype(np.uint64)
+    hashes = np.zeros(n, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(k):
+            hashes = hashes * _BASE + values[offset:offset + n]
+        return _mix(hashes)
+
+
+def _window_minima(hashes: np.ndarray, window: int) -> np.ndarray:
+    """Returns the offset of the smallest hash in every window, the leftmost on ties."""
+    windows = np.lib.stride_tricks.sliding_window_view(hashes, window)
+    return windows.argmin(axis=1)
+
+
+def minimizer_positions(codes: np.ndarray, k: int, window: int) -> np.ndarray:
+    """Returns the sorted start positions of the (window, k) minimizers of a sequence."""
+    hashes = kmer_hashes(codes, k)
+    if len(hashes) == 0:
+        return np.empty(0, dtype=np.int64)
+    window = min(window, len(hashes))
+    positions = _window_minima(hashes, window) + np.arange(len(hashes) - window + 1)
+    return np.unique(positions)
+
+
+def syncmer_positions(codes: np.ndarray, k: int, s: int) -> np.ndarray:
+    """Returns the sorted start positions of the closed syncmers of a sequence.
+
+    A k-mer is a closed syncmer when its smallest s-mer is its first or its last one.
+    """
+    if not 0 < s <= k:
+        raise ValueError("The s-mer length must be between 1 and the k-mer length")
+    hashes = kmer_hashes(codes, s)
+    if len(hashes) < k - s + 1:
+        return np.empty(0, dtype=np.int64)
+    minima = _window_minima(hashes, k - s + 1)
+    return np.flatnonzero((minima == 0) | (minima == k - s))
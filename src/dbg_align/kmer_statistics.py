@@ -0,0 +1,129 @@
+import random
+from typing import Dict, Iterable, List, Sequence, Union
+
+import numpy as np
+
+
+class KmerStatistics:
+    """Cheap statistics of the k-mers of a set of sequences for one k-mer length.
+
+    - `repeat_fraction`: fraction of k-mer occurrences repeated within their own
+      sequence, each one becomes a cycle edge in the graph.
+    - `shared_fraction`: fraction of sequence characters covered by a k-mer found in
+      every sequence, these are the anchors the graph aligns between.
+    - `bubbles`: mean number of unanchored stretches per sequence, each one is a bubble.
+    - `work`: predicted DP cells, every bubble is aligned progressively over the
+      unanchored characters and every repeat falls back to aligning a whole sequence.
+    """
+    def __init__(self, kmer_length: int, n_sequences: int, mean_length: float, repeat_fraction: float, shared_fraction: float, bubbles: float, repeats: float):
+        self.kmer_length = kmer_length
+        self.n_sequences = n_sequences
+        self.mean_length = mean_length
+        self.repeat_fraction = repeat_fraction
+        self.shared_fraction = shared_fraction
+        self.bubbles = bubbles
+        self.repeats = repeats
+
+    @property
+    def work(self) -> float:
+        unanchored = (1.0 - self.shared_fraction) * self.mean_length
+        bubble_work = self.n_sequences * unanchored ** 2 / max(self.bubbles, 1.0)
+        return bubble_work + self.repeats * self.n_sequences * self.mean_length
+
+    def __repr__(self):
+        return (f"KmerStatistics(k={self.kmer_length}, repeat={self.repeat_fraction:.3f}, "
+                f"shared={self.shared_fraction:.3f}, bubbles={self.bubbles:.1f}, work={self.work:.3g})")
+
+
+def as_strings(sequences: Union[str, Sequence, Dict[str, str], "SequenceCollection"]) -> List[str]:
+    """Returns the sequences of any input accepted by DeBruijnGraph.add_sequence as plain strings."""
+    if isinstance(sequences, str):
+        return [sequences]
+    if isinstance(sequences, dict):
+        return [str(sequence) for sequence in sequences.values()]
+    if hasattr(sequences, "seqs"):
+        return [str(sequence) for sequence in sequences.seqs]
+    return [str(sequence) for sequence in sequences]
+
+
+def sample(sequences: List[str], max_sequences: int = 20, max_length: int = 2000, seed: int = 0) -> List[str]:
+    """Picks up to `max_sequences` sequences and cuts each to a window of `max_length` characters.
+
+    Windows start at the same relative position in every sequence so that, for related
+    sequences, they cover roughly homologous regions.
+    """
+    rng = random.Random(seed)
+    if len(sequences) > max_sequences:
+        sequences = rng.sample(sequences, max_sequences)
+    position = rng.random()
+    windows = []
+    for sequence in sequences:
+        if len(sequence) > max_length:
+            start = int(position * (len(sequence) - max_length))
+            sequence = sequence[start:start + max_length]
+        windows.append(sequence)
+    return windows
+
+
+def kmer_keys(sequence: str, k: int) -> np.ndarray:
+    """Returns the k-mers of a sequence as a vector of fixed width byte strings."""
+    codes = np.frombuffer(sequence.upper().encode("ascii"), dtype=np.uint8)
+    if len(codes) < k:
+        return np.empty(0, dtype=f"V{k}")
+    windows = np.lib.stride_tricks.sliding_window_view(codes, k)
+    return np.ascontiguousarray(windows).view(f"V{k}").ravel()
+
+
+def kmer_statistics(sequences: List[str], k: int) -> KmerStatistics:
+    keys = [kmer_keys(sequence, k) for sequence in sequences]
+    shared = None
+    repeats = 0
+    occurrences = 0
+    for key in keys:
+        distinct, counts = np.unique(key, return_counts=True)
+        repeats += int((counts - 1).sum())
+        occurrences += len(key)
+        shared = distinct if shared is None else np.intersect1d(shared, distinct, assume_unique=True)
+
+    covered = 0
+    stretches = 0
+    for sequence, key in zip(sequences, keys):
+        anchors = np.isin(key, shared)
+        # a character is anchored when any k-mer overlapping it is shared by every sequence
+        depth = np.zeros(len(sequence) + 1, dtype=np.int64)
+        starts = np.flatnonzero(anchors)
+        np.add.at(depth, starts, 1)
+        np.add.at(depth, starts + k, -1)
+        anchored = np.cumsum(depth[:-1]) > 0
+        covered += int(anchored.sum())
+        # count the stretches of unanchored characters
+        free = ~anchored
+        stretches += int(free[0]) + int((free[1:] & ~free[:-1]).sum()) if len(free) else 0
+
+    n = len(sequences)
+    total = sum(len(sequence) for sequence in sequences)
+    return KmerStatistics(
+        kmer_length=k,
+        n_sequences=n,
+        mean_length=total / n,
+        repeat_fraction=repeats / occurrences if occurrences else 0.0,
+        shared_fraction=covered / total if total else 0.0,
+        bubbles=stretches / n,
+        repeats=repeats / n,
+    )
+
+
+def suggest_kmer_length(sequences: List[str], k_values: Iterable[int] = None, max_sequences: int = 20, max_length: int = 2000, seed: int = 0) -> List[KmerStatistics]:
+    """Returns the statistics of every usable k-mer length, cheapest predicted work first."""
+    if not sequences:
+        raise ValueError("No sequences to sample")
+    sampled = sample(sequences, max_sequences, max_length, seed)
+    shortest = min(len(sequence) for sequence in sequences)
+    if k_values is None:
+        k_values = range(3, 64)
+    k_values = [k for k in k_values if 1 < k <= min(shortest, max_length)]
+    if not k_values:
+        raise ValueError("No k-mer length fits the shortest sequence")
+    statistics = [kmer_statistics(sampled, k) for k in k_values]
+    # ties go to the shorter k-mer, which keeps more anchors
+    return sorted(statistics, key=lambda s: (s.work, s.kmer_length))
@@ -0,0 +1,51 @@
+import sys
+from typing import Dict
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """Raised before an operation that would take a graph past its memory budget."""
+    def __init__(self, required: int, used: int, budget: int, operation: str):
+        self.required = required
+        self.used = used
+        self.budget = budget
+        super().__init__(f"{operation} needs about {required:,} bytes, the graph uses about {used:,} of a {budget:,} byte budget")
+
+
+class MemoryUsage:
+    """A breakdown of the bytes held by a graph, by category."""
+    def __init__(self, breakdown: Dict[str, int]):
+        self.breakdown = breakdown
+
+    @property
+    def total(self) -> int:
+        return sum(self.breakdown.values())
+
+    def __getitem__(self, category: str) -> int:
+        return self.breakdown[category]
+
+    def __repr__(self):
+        return f"MemoryUsage(total={self.total}, {', '.join(f'{k}={v}' for k, v in self.breakdown.items())})"
+
+    def __str__(self):
+        lines = [f"{category:<16} {size:>14,}" for category, size in self.breakdown.items()]
+        lines.append(f"{'total':<16} {self.total:>14,}")
+        return "\n".join(lines)
+
+
+def object_size(obj) -> int:
+    """Size of an object and its attribute dictionary, not of what the attributes refer to."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def dict_entry_size() -> int:
+    """Average bytes a dictionary grows by per entry."""
+    entries = 1024
+    return sys.getsizeof(dict.fromkeys(range(entries))) // entries
+
+
+def check_budget(budget: int, used: int, required: int, operation: str):
+    if budget is not None and used + required > budget:
+        raise MemoryBudgetExceeded(required, used, budget, operation)
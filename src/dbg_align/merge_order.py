@@ -0,0 +1,196 @@
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .alignment_cost_plugin import PluginCostAlignment, ProfileCostAlignment
+from .allignment_buffer import AlignmentBuffer
+from .pog_node import POG_Node
+
+# a merge joins two items, items 0..n-1 are the texts and item n + k is the result of merge k
+Merge = Tuple[int, int]
+
+
+class MergePlan:
+    """An order in which the texts of one step are merged into a single profile.
+
+    `merges` lists the pairs of items joined, item `i < n` is text `i` and item
+    `n + k` is the profile made by the `k`th merge. `cost` is the estimated DP cost
+    of the plan and `naive_cost` that of adding the texts one after another.
+    """
+    def __init__(self, strategy: str, n_items: int, merges: List[Merge], cost: Tuple[int, int], naive_cost: Tuple[int, int]):
+        self.strategy = strategy
+        self.n_items = n_items
+        self.merges = merges
+        self.cost = cost
+        self.naive_cost = naive_cost
+
+    @property
+    def savings(self) -> int:
+        """Estimated DP cells saved (upper bound of the cost) compared with the naive order."""
+        return self.naive_cost[1] - self.cost[1]
+
+    def run(self, buffer: AlignmentBuffer, texts: Sequence[str], labels: Sequence[List[int]]) -> Tuple[Optional[int], List[List[int]]]:
+        """Runs the merges through a buffer, returns the final result index and the sequences each row stands for."""
+        if len(texts) != self.n_items:
+            raise ValueError(f"Plan merges {self.n_items} texts, got {len(texts)}")
+        items: List[Union[str, int]] = list(texts)
+        rows: List[List[List[int]]] = [[list(group)] for group in labels]
+        index = None
+        for a, b in self.merges:
+            index = buffer.add_alignment(items[a], items[b])
+            # plugins put a lone sequence before the profile it is added to
+            if isinstance(items[b], str) and not isinstance(items[a], str):
+                rows.append(rows[b] + rows[a])
+            else:
+                rows.append(rows[a] + rows[b])
+            items.append(index)
+        return index, (rows[-1] if self.merges else [])
+
+    def __repr__(self):
+        return f"MergePlan({self.strategy}, merges={len(self.merges)}, cost={self.cost}, savings={self.savings})"
+
+
+class MergeReport:
+    """Estimated cost of a set of merge plans against merging every step in the naive order."""
+    def __init__(self, plans: List[MergePlan]):
+        self.plans = plans
+        self.naive_cost = (sum(p.naive_cost[0] for p in plans), sum(p.naive_cost[1] for p in plans))
+        self.cost = (sum(p.cost[0] for p in plans), sum(p.cost[1] for p in plans))
+
+    @property
+    def savings(self) -> int:
+        return self.naive_cost[1] - self.cost[1]
+
+    def __repr__(self):
+        return f"MergeReport(plans={len(self.plans)}, naive={self.naive_cost}, cost={self.cost}, savings={self.savings})"
+
+
+class MergeOrderOptimizer:
+    """Chooses the order in which the branches of a bubble are merged through an AlignmentBuffer.
+
+    Costs are estimated with PluginCostAlignment, where adding a sequence to a profile
+    multiplies the cost built up so far, so merging in the naive order grows quickly.
+
+    Strategies:
+    - "naive": add the texts one after another, as the planner does by default.
+    - "huffman": repeatedly merge the two items with the shortest estimated length.
+    - "guide_tree": UPGMA guide tree over distances from the graph nodes the branches
+      share, similar branches are merged first. Needs the nodes of each branch.
+    - "auto": the cheapest of the above.
+    """
+    STRATEGIES = ("naive", "huffman", "guide_tree", "auto")
+
+    def __init__(self, strategy: str = "auto"):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown merge strategy '{strategy}'")
+        self.strategy = strategy
+
+    def plan(self, texts: Sequence[str], nodes: Sequence[Sequence[POG_Node]] = None) -> MergePlan:
+        """Returns the merge plan for a list of texts, `nodes` are the graph nodes behind each text."""
+        n = len(texts)
+        naive = self._naive(n)
+        naive_cost = self.estimate(texts, naive)
+        if self.strategy == "naive":
+            return MergePlan("naive", n, naive, naive_cost, naive_cost)
+        if self.strategy == "huffman":
+            candidates = {"huffman": self._huffman(texts)}
+        elif self.strategy == "guide_tree":
+            if nodes is None:
+                raise ValueError("The guide tree strategy needs the graph nodes of each text")
+            candidates = {"guide_tree": self._guide_tree(nodes)}
+        else:
+            candidates = {"naive": naive, "huffman": self._huffman(texts)}
+            if nodes is not None:
+                candidates["guide_tree"] = self._guide_tree(nodes)
+        costs = {strategy: self.estimate(texts, merges) for strategy, merges in candidates.items()}
+        strategy = min(costs, key=lambda s: (costs[s][1], costs[s][0]))
+        return MergePlan(strategy, n, candidates[strategy], costs[strategy], naive_cost)
+
+    def plan_bubble(self, bubble: "POG_Bubble", braided: bool = False) -> MergePlan:
+        """Returns the merge plan for the branches of a bubble, `braided` merges each distinct branch once."""
+        texts, _, nodes = self.bubble_items(bubble, braided)
+        return self.plan(texts, nodes)
+
+    def plan_graph(self, pog: "PartialOrderGraph", braided: bool = False) -> Dict["POG_Bubble", MergePlan]:
+        """Returns a merge plan for every top level bubble of a graph."""
+        from .pog_bubble import POG_Bubble
+        return {segment: self.plan_bubble(segment, braided) for segment in pog.segments() if isinstance(segment, POG_Bubble)}
+
+    def report(self, pog: "PartialOrderGraph", braided: bool = False) -> MergeReport:
+        return MergeReport(list(self.plan_graph(pog, braided).values()))
+
+    @staticmethod
+    def bubble_items(bubble: "POG_Bubble", braided: bool = False) -> Tuple[List[str], List[List[int]], List[List[POG_Node]]]:
+        """Returns the non empty branch texts of a bubble with the sequences and nodes behind each."""
+        paths = bubble.branch_nodes()
+        groups: Dict[str, List[int]] = {}
+        nodes: Dict[str, List[POG_Node]] = {}
+        for index, path in paths.items():
+            text = "".join(node.fragment or "" for node in path)
+            key = text if braided else str(index)
+            groups.setdefault(key, []).append(index)
+            nodes.setdefault(key, path)
+        keys = [key for key in groups if any(node.fragment for node in nodes[key])]
+        texts = ["".join(node.fragment or "" for node in nodes[key]) for key in keys]
+        return texts, [groups[key] for key in keys], [nodes[key] for key in keys]
+
+    @staticmethod
+    def estimate(texts: Sequence[str], merges: List[Merge]) -> Tuple[int, int]:
+        """Returns the (min, max) PluginCostAlignment cost of running the merges."""
+        plugin = PluginCostAlignment()
+        buffer = AlignmentBuffer(plugin)
+        items: List[Union[str, int]] = list(texts)
+        total = (0, 0)
+        for a, b in merges:
+            index = buffer.add_alignment(items[a], items[b])
+            cost = buffer.results[index].cost
+            total = (total[0] + cost[0], total[1] + cost[1])
+            items.append(index)
+        return total
+
+    @staticmethod
+    def _naive(n: int) -> List[Merge]:
+        if n < 2:
+            return []
+        merges = [(0, 1)]
+        for k in range(2, n):
+            merges.append((k, n + len(merges) - 1))
+        return merges
+
+    @staticmethod
+    def _huffman(texts: Sequence[str]) -> List[Merge]:
+        n = len(texts)
+        heap = [(len(text), item) for item, text in enumerate(texts)]
+        heapq.heapify(heap)
+        merges = []
+        while len(heap) > 1:
+            (length_a, a), (length_b, b) = heapq.heappop(heap), heapq.heappop(heap)
+            merges.append((a, b))
+            # the longest row of the merged profile is at most the two lengths added together
+            heapq.heappush(heap, (length_a + length_b, n + len(merges) - 1))
+        return merges
+
+    @staticmethod
+    def _guide_tree(nodes: Sequence[Sequence[POG_Node]]) -> List[Merge]:
+        """UPGMA over 1 - (shared characters / all characters) of the nodes two branches pass through."""
+        n = len(nodes)
+        weights = [{node: len(node.fragment or "") for node in path} for path in nodes]
+        def distance(a, b):
+            shared = sum(weight for node, weight in a.items() if node in b)
+            union = sum(a.values()) + sum(b.values()) - shared
+            return 1.0 - shared / union if union else 0.0
+
+        clusters = {item: 1 for item in range(n)}
+        distances = {(a, b): distance(weights[a], weights[b]) for a in range(n) for b in range(a + 1, n)}
+        merges = []
+        while len(clusters) > 1:
+            a, b = min(distances, key=lambda pair: (distances[pair], pair))
+            merges.append((a, b))
+            merged = n + len(merges) - 1
+            size_a, size_b = clusters.pop(a), clusters.pop(b)
+            for other in clusters:
+                d_a = distances.pop((min(a, other), max(a, other)))
+                d_b = distances.pop((min(b, other), max(b, other)))
+                distances[(other, merged)] = (d_a * size_a + d_b * size_b) / (size_a + size_b)
+            del distances[(a, b)]
+            clusters[merged] = size_a + size_b
+        return merges
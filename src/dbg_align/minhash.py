@@ -0,0 +1,190 @@
+"""Partitioning sequences by MinHash similarity before building de Bruijn graphs.
+
+Sequences that share few k-mers give a graph with few anchors and long bubbles, where
+the graph methods lose their advantage over progressive alignment. A bottom-s sketch
+(the `size` smallest k-mer hashes) of each sequence estimates the Jaccard similarity
+of any two k-mer sets in O(size), sequences are clustered by single linkage over
+those estimates and each cluster gets its own graph:
+
+    clusterer = SequenceClusterer(sequences, threshold=0.2)
+    print(clusterer.report())
+    profile = clusterer.align(BandedAlignmentPlugin())
+
+Each cluster is aligned on its own and the cluster profiles are merged into one
+through an AlignmentBuffer, largest cluster first.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .kmer_hash import encode, kmer_hashes
+
+
+def sketch(sequence: str, k: int, size: int = 128) -> np.ndarray:
+    """Returns the `size` smallest distinct k-mer hashes of a sequence, sorted."""
+    return np.unique(kmer_hashes(encode(sequence), k))[:size]
+
+
+def jaccard(a: np.ndarray, b: np.ndarray, size: int = None) -> float:
+    """Estimates the Jaccard similarity of two k-mer sets from their sketches.
+
+    The estimate is the fraction of the bottom `size` hashes of the union that are in
+    both sketches.
+    """
+    size = size or max(len(a), len(b))
+    union = np.union1d(a, b)[:size]
+    if not len(union):
+        return 0.0
+    shared = np.intersect1d(a, b, assume_unique=True)
+    return int(np.count_nonzero(shared <= union[-1])) / len(union)
+
+
+def similarity_matrix(sketches: Sequence[np.ndarray], size: int = None) -> np.ndarray:
+    """Returns the estimated Jaccard similarity of every pair of sketches."""
+    n = len(sketches)
+    similarity = np.eye(n)
+    for i in range(n):
+        for j in range(i + 1, n):
+            similarity[i, j] = similarity[j, i] = jaccard(sketches[i], sketches[j], size)
+    return similarity
+
+
+def single_linkage(similarity: np.ndarray, threshold: float) -> List[List[int]]:
+    """Groups items joined by a chain of pairs at least `threshold` similar, in order of first member."""
+    parent = list(range(len(similarity)))
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    for i, j in zip(*np.nonzero(np.triu(similarity >= threshold, 1))):
+        parent[find(int(i))] = find(int(j))
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(similarity)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+class Cluster:
+    """Sequences that are aligned together in one graph."""
+    def __init__(self, sequences: Dict[str, str], kmer_length: int):
+        self.sequences = sequences
+        self.kmer_length = kmer_length
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.sequences)
+
+    def graph(self) -> "DeBruijnGraph":
+        from .debruijngraph import DeBruijnGraph
+        dbg = DeBruijnGraph(self.kmer_length)
+        dbg.add_sequence(self.sequences)
+        return dbg
+
+    def planner(self) -> "AlignmentPlanner":
+        from .planner import AlignmentPlanner
+        return AlignmentPlanner(self.graph().to_pog())
+
+    @property
+    def width(self) -> int:
+        """Approximate width of the cluster's alignment, the length of its longest sequence."""
+        return max(len(sequence) for sequence in self.sequences.values())
+
+    def __len__(self):
+        return len(self.sequences)
+
+    def __repr__(self):
+        return f"Cluster({len(self)} sequences)"
+
+
+class ClusterReport:
+    """Predicted DP cells of aligning each cluster, of merging the cluster profiles and of one progressive alignment of everything.
+
+    `clusters` holds one `(names, method, cost)` row per cluster, `cost` being the
+    (min, max) cells of the cheapest method for its graph.
+    """
+    def __init__(self, clusters: List[Tuple[List[str], "AlignmentMethod", Tuple[float, float]]], merge_cost: float, progressive_cost: float):
+        self.clusters = clusters
+        self.merge_cost = merge_cost
+        self.progressive_cost = progressive_cost
+
+    @property
+    def cost(self) -> Tuple[float, float]:
+        return (sum(c[0] for _, _, c in self.clusters) + self.merge_cost, sum(c[1] for _, _, c in self.clusters) + self.merge_cost)
+
+    def __str__(self):
+        lines = [f"{'cluster':>7} {'sequences':>9} {'method':<20} {'cells':>12}"]
+        for number, (names, method, cost) in enumerate(self.clusters):
+            lines.append(f"{number:>7} {len(names):>9} {method.name:<20} {cost[1]:>12.4g}")
+        lines.append(f"{'merge':>7} {'':>9} {'PROFILE_PROFILE':<20} {self.merge_cost:>12.4g}")
+        lines.append(f"{'total':>7} {'':>9} {'':<20} {self.cost[1]:>12.4g}  (progressive {self.progressive_cost:.4g})")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"ClusterReport(clusters={len(self.clusters)}, cost={self.cost}, progressive={self.progressive_cost})"
+
+
+class SequenceClusterer:
+    """Sketches a set of sequences, clusters them and aligns each cluster in its own graph.
+
+    `sketch_k` is the k-mer length of the sketches, `kmer_length` that of the cluster
+    graphs and `threshold` the estimated Jaccard similarity that puts two sequences
+    in the same cluster.
+    """
+    def __init__(self, sequences: Dict[str, str], kmer_length: int = 11, threshold: float = 0.2, sketch_k: int = 15, sketch_size: int = 128):
+        if not sequences:
+            raise ValueError("No sequences to cluster")
+        self.sequences = {name: str(sequence) for name, sequence in sequences.items()}
+        self.kmer_length = kmer_length
+        self.threshold = threshold
+        self.sketch_size = sketch_size
+        names = list(self.sequences)
+        self.sketches = {name: sketch(self.sequences[name], sketch_k, sketch_size) for name in names}
+        self.similarity = similarity_matrix([self.sketches[name] for name in names], sketch_size)
+        groups = single_linkage(self.similarity, threshold)
+        # largest first, the order the cluster profiles are merged in
+        groups.sort(key=lambda group: (-len(group), group[0]))
+        self.clusters = [Cluster({names[i]: self.sequences[names[i]] for i in group}, kmer_length) for group in groups]
+
+    def report(self) -> "ClusterReport":
+        """Predicts the work of aligning each cluster with its cheapest method and of merging the results."""
+        rows = []
+        for cluster in self.clusters:
+            estimate = cluster.planner().select()
+            rows.append((cluster.names, estimate.method, estimate.cost))
+        merge_cost, width = 0, 0
+        for cluster in self.clusters: # each merge aligns the profile so far against the next cluster
+            merge_cost += width * cluster.width
+            width = max(width, cluster.width)
+        lengths = sorted(len(sequence) for sequence in self.sequences.values())
+        progressive = sum(a * b for a, b in zip(lengths, lengths[1:]))
+        return ClusterReport(rows, merge_cost, progressive)
+
+    def align(self, plugin: "AlignmentPlugin", method: "AlignmentMethod" = None) -> "Profile":
+        """Aligns every cluster on its own then merges the cluster profiles, returns the alignment with rows in input order.
+
+        Clusters are built and aligned one at a time. The plugin must return Profile objects.
+        """
+        from .allignment_buffer import AlignmentBuffer
+        from .profile import Profile
+
+        buffer = AlignmentBuffer(plugin)
+        merged, rows = None, []
+        for cluster in self.clusters:
+            if len(cluster) == 1:
+                item, names = next(iter(cluster.sequences.values())), cluster.names
+            else:
+                result = cluster.planner().execute(plugin, method).profile()
+                item, names = buffer.concatenate([result]), list(result.names)
+            if merged is None:
+                merged, rows = item, names
+            elif isinstance(item, str): # plugins put a lone sequence before the profile it is added to
+                merged, rows = buffer.add_alignment(item, merged), names + rows
+            else:
+                merged, rows = buffer.add_alignment(merged, item), rows + names
+        if isinstance(merged, str):
+            return Profile([merged], names=rows)
+        profile = buffer.results[merged]
+        position = {name: row for row, name in enumerate(rows)}
+        order = [position[name] for name in self.sequences]
+        return Profile.from_codes(profile.codes[order], names=list(self.sequences), alphabet=profile.alphabet)
@@ -1,24 +1,44 @@
+import sys
 from functools import singledispatchmethod
-from typing import List, Set, Union
+from typing import Iterator, List, Set, Union
 
+from . import instrumentation
 from .allignment_buffer import AlignmentBuffer
 from .debruijngraph import DeBruijnGraph
 from .dbg_node import DBGNode
 from .pog_node import POG_Node
 from .pog_bubble import POG_Bubble
 from .constants import AlignmentMethod
+from .memory import MemoryUsage, check_budget, object_size
 
 class PartialOrderGraph:
-    def __init__(self, debruijn_graph : DeBruijnGraph = None):
+    """A partial order graph of sequences built from a de Bruijn graph.
+
+    With a `memory_budget` (in bytes) the size of the graph is estimated from the de
+    Bruijn graph before it is transformed, and MemoryBudgetExceeded is raised instead
+    of building a graph that would not fit.
+    """
+    def __init__(self, debruijn_graph : DeBruijnGraph = None, memory_budget: int = None):
+        self.memory_budget = memory_budget
+        self._coordinates = None
+        self.origin = None # the Region of another graph this one was cut from
         if debruijn_graph is None:
             self.root = None
             self.sequence_names = {}  # dict keyed on sequence names, returns tuple containing index and lengths of the sequence
         else:
             self.sequence_names = debruijn_graph.sequence_names # dict keyed on sequence names, returns tuple containing index and lengths of the sequence
-            self.transform_dbg_to_pog(debruijn_graph.root)
+            if memory_budget is not None:
+                check_budget(memory_budget, 0, self.estimate_memory(debruijn_graph), "Building the partial order graph")
+            with instrumentation.timer("pog.transform"):
+                self.transform_dbg_to_pog(debruijn_graph.root)
+            if instrumentation.enabled():
+                instrumentation.count("pog.nodes", len(self.topological_order()))
 
     def transform_dbg_to_pog(self, node : DBGNode):
         sequence_set = {value[0] for value in self.sequence_names.values()}
+        self._coordinates = None
+        # successors come in topological order, so get_next finds each sequence's immediate successor
+        # before nodes the sequence only reaches further on
         self.root = POG_Node.from_dbg_node(node, sequence_set, read_full_kmer=True)
 
         # add a synthetic end node with no fragment to all final nodes
@@ -26,10 +46,42 @@ class PartialOrderGraph:
         for sequence in sequence_set:
             node = self.root
             last_node = node
-            while node:
+            visited = set()
+            while node is not None: # nodes without successors have a length of 0
+                if node in visited:
+                    raise ValueError(f"Sequence {sequence} loops back on itself in the partial order graph")
+                visited.add(node)
                 last_node = node
                 node = node.get_next(sequence)
-            end_node.add_node(last_node)
+            if last_node is not end_node and end_node not in last_node.next:
+                last_node.add_node(end_node)
+        for name, (index, length) in self.sequence_names.items():
+            rebuilt = self.coordinates().length(index) if index in self.coordinates() else 0
+            if rebuilt != length:
+                raise ValueError(f"Sequence {name} reads back as {rebuilt} characters from the partial order graph, not {length}")
+
+    def estimate_memory(self, debruijn_graph: DeBruijnGraph) -> int:
+        """Upper estimate of the bytes the partial order graph of a de Bruijn graph takes."""
+        n = len(debruijn_graph.sequence_names)
+        node = object_size(POG_Node("", set())) + sys.getsizeof([None]) + sys.getsizeof(set(range(n))) + sys.getsizeof("")
+        characters = sum(length for _, length in debruijn_graph.sequence_names.values())
+        return debruijn_graph.pog_node_bound() * node + characters * (sys.getsizeof("AA") - sys.getsizeof("A"))
+
+    def memory_usage(self) -> MemoryUsage:
+        """Walks the graph and returns the bytes held by nodes, sequence sets, fragments and the name index."""
+        nodes = sequence_sets = fragments = 0
+        stack, seen = [self.root] if self.root is not None else [], set()
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            nodes += object_size(node) + sys.getsizeof(node.next)
+            sequence_sets += sys.getsizeof(node.sequence_set) if node.sequence_set is not None else 0
+            fragments += sys.getsizeof(node.fragment) if node.fragment else 0
+            stack.extend(node.next)
+        index = sys.getsizeof(self.sequence_names) + sum(sys.getsizeof(name) + sys.getsizeof(value) for name, value in self.sequence_names.items())
+        return MemoryUsage({"nodes": nodes, "sequence_sets": sequence_sets, "fragments": fragments, "index": index})
 
     def work(self, alignment_type: AlignmentMethod):
         """Returns the order complexity of aligninging the sequences."""
@@ -50,6 +102,22 @@ class PartialOrderGraph:
         else:
             raise ValueError("Unsupported alignment type")
 
+    def coordinates(self) -> "CoordinateIndex":
+        """Returns the index of node offsets along each sequence, built on first use and kept until the graph changes.
+
+        Replacing the root or the sequence names rebuilds it, changes made to nodes in
+        place must be followed by `invalidate_coordinates`.
+        """
+        cached = self._coordinates
+        if cached is None or cached[0] is not self.root or cached[1] is not self.sequence_names:
+            from .coordinate_index import CoordinateIndex
+            cached = self._coordinates = (self.root, self.sequence_names, CoordinateIndex(self))
+        return cached[2]
+
+    def invalidate_coordinates(self):
+        """Drops the coordinate index, code that changes the graph's nodes or paths calls this."""
+        self._coordinates = None
+
     def __len__(self):
         return len(self.sequence_names)
     
@@ -61,9 +129,8 @@ class PartialOrderGraph:
     def _(self, index: int):
         if index < 1 or index > len(self):
             raise IndexError("Sequence index out of range")
-        # Start the sequence reconstruction from the root node
-        sequence = self.root.sequence(index)
-        return sequence
+        coordinates = self.coordinates()
+        return coordinates.sequence(index) if index in coordinates else ''
 
     def index_for_name(self, name: str)->int:
         """Returns the index for a sequence name."""
@@ -83,20 +150,133 @@ class PartialOrderGraph:
     def _(self, name: str):
         if name not in self.sequence_names:
             raise KeyError(f"Sequence name '{name}' not found")
-        sequence_index = self.index_for_name(name)
-        # Start the sequence reconstruction from the root node
-        sequence = self.root.sequence(sequence_index)
-        return sequence
+        return self.coordinates().sequence(name)
     
     def bubbles(self)->List[POG_Bubble]:
         # if root.edges is empty then there are no bubbles - return an empty list
         if not self.root:
             return []
         else:
-            bubbles = self.root.bubbles()
+            with instrumentation.timer("pog.bubbles"):
+                bubbles = self.root.bubbles()
+            if instrumentation.enabled():
+                pending = list(bubbles)
+                while pending:
+                    bubble = pending.pop()
+                    instrumentation.count(f"pog.bubbles.depth_{bubble.depth}")
+                    pending.extend(bubble.inner_bubbles or [])
             # remove all leaf bubbles where the edge lengths are equal
             return bubbles
         
+    def topological_order(self) -> List[POG_Node]:
+        """Returns the nodes reachable from the root so that every node comes before its successors.
+
+        Raises ValueError when the graph has a cycle.
+        """
+        if not self.root:
+            return []
+        indegree = {}
+        stack = [self.root]
+        seen = {self.root}
+        while stack:
+            node = stack.pop()
+            for successor in dict.fromkeys(node.next):
+                indegree[successor] = indegree.get(successor, 0) + 1
+                if successor not in seen:
+                    seen.add(successor)
+                    stack.append(successor)
+        order = []
+        ready = [self.root]
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            for successor in dict.fromkeys(node.next):
+                indegree[successor] -= 1
+                if indegree[successor] == 0:
+                    ready.append(successor)
+        if len(order) < len(seen):
+            raise ValueError(f"The partial order graph has a cycle, {len(seen) - len(order)} of its {len(seen)} nodes cannot be ordered")
+        return order
+
+    def align_sequence(self, sequence: str, mode: str = "global", aligner: "PartialOrderAligner" = None) -> "GraphAlignment":
+        """Aligns a sequence (or a read with mode="semiglobal") directly against the graph."""
+        from .poa import PartialOrderAligner
+        aligner = aligner or PartialOrderAligner()
+        return aligner.align(self, sequence, mode)
+
+    def add_sequence(self, sequence: str, name: str = None, aligner: "PartialOrderAligner" = None) -> int:
+        """Aligns a sequence against the graph and adds it as a new path, returns its index."""
+        from .poa import PartialOrderAligner
+        aligner = aligner or PartialOrderAligner()
+        return aligner.add_sequence(self, str(sequence), name)
+
+    def segments(self) -> Iterator[Union[POG_Node, POG_Bubble]]:
+        """Yields, in graph order, the conserved nodes shared by every sequence and the top level bubbles between them."""
+        node = self.root
+        while node is not None:
+            if node.fragment:
+                yield node
+            successors = list(dict.fromkeys(node.next))
+            if not successors:
+                return
+            if len(successors) == 1:
+                node = successors[0]
+                continue
+            # the bubble closes on the first node that every sequence of its start passes through
+            end = node.get_next(min(node.sequence_set))
+            while end is not None and not node.sequence_set.issubset(end.sequence_set):
+                end = end.get_next(min(node.sequence_set))
+            yield POG_Bubble(node, end, [], 0)
+            node = end
+
+    def subgraph(self, start: Union[POG_Node, POG_Bubble], end: POG_Node = None) -> "PartialOrderGraph":
+        """Returns a standalone copy of the region between two nodes (both excluded) or inside a bubble.
+
+        Every sequence through `start` must reach `end` and no other sequence may enter
+        between them, ValueError otherwise. The copy's `origin` records the region so it
+        can be spliced back. Only the nodes of the region are read.
+        """
+        from .subgraph import extract
+        return extract(self, start, end)
+
+    def region(self, sequence: Union[int, str], start: int, end: int) -> "PartialOrderGraph":
+        """Returns a standalone copy of the region holding positions start:end of a sequence.
+
+        The region is widened to the closest nodes on either side that every sequence
+        passes through, `origin.offset(name)` gives where it starts in each sequence.
+        """
+        before, after = self.coordinates().enclosing(sequence, start, end)
+        return self.subgraph(before, after)
+
+    def splice(self, sub: "PartialOrderGraph", region: "Region" = None):
+        """Replaces a region, by default the one `sub` was cut from, with the nodes of `sub`.
+
+        `sub` must hold the region's sequences under the same names, for example after
+        it was rebuilt with another kmer length or had its nodes edited.
+        """
+        from .subgraph import splice
+        splice(self, sub, region)
+
+    def stats(self) -> "GraphStats":
+        """Returns node, bubble, anchor coverage and DP cell statistics computed over flat arrays, see `graph_stats`."""
+        from .graph_stats import graph_stats
+        return graph_stats(self)
+
+    def write_mermaid(self, target: Union[str, "TextIO"], **options) -> int:
+        """Streams a mermaid description of the graph to a path or text stream.
+
+        Options are those of `export.pog_elements`: seeds (nodes or bubbles) and radius
+        for a region, unitigs, min_coverage, collapse_bubbles and max_label. Returns
+        the number of vertices and edges written.
+        """
+        from .export import pog_elements, write_mermaid
+        return write_mermaid(pog_elements(self, **options), target)
+
+    def write_graphviz(self, target: Union[str, "TextIO"], **options) -> int:
+        """Streams a graphviz dot description of the graph, see `write_mermaid`."""
+        from .export import pog_elements, write_graphviz
+        return write_graphviz(pog_elements(self, **options), target)
+
     def align(self, buffer : AlignmentBuffer):
         self.root.align(buffer)
 
@@ -0,0 +1,288 @@
+import math
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from .alignment import AlignmentPlugin
+from .alignment_cost_plugin import PluginCostAlignment, ProfileCostAlignment
+from .allignment_buffer import AlignmentBuffer
+from .banded_alignment import BandedAlignmentPlugin
+from .constants import AlignmentMethod
+from .merge_order import MergeOrderOptimizer
+from .pog_bubble import POG_Bubble
+
+
+class PlanStep:
+    """One group of texts that are aligned together.
+
+    `labels[i]` holds the sequence indices that `texts[i]` stands for, a braided step
+    aligns each distinct branch once on behalf of every sequence that shares it.
+    `nodes[i]` holds the graph nodes behind `texts[i]` and `bubble` the bubble itself
+    when the step comes from a bubble.
+    """
+    def __init__(self, texts: List[str], labels: List[List[int]], nodes: List[List["POG_Node"]] = None, bubble: POG_Bubble = None):
+        self.texts = texts
+        self.labels = labels
+        self.nodes = nodes
+        self.bubble = bubble
+
+    @property
+    def sequences(self) -> List[int]:
+        return sorted(index for group in self.labels for index in group)
+
+    def __repr__(self):
+        return f"PlanStep(texts={len(self.texts)}, sequences={len(self.sequences)})"
+
+
+class CostEstimate:
+    """Predicted cost of running an alignment method, as DP cells with derived time and memory."""
+    def __init__(self, method: AlignmentMethod, cost: Tuple[float, float], peak_cells: float, operations: int, seconds: float, memory: float):
+        self.method = method
+        self.cost = cost
+        self.peak_cells = peak_cells
+        self.operations = operations
+        self.seconds = seconds
+        self.memory = memory
+
+    def fits(self, budget: "PlanBudget") -> bool:
+        if budget is None:
+            return True
+        if budget.seconds is not None and self.seconds > budget.seconds:
+            return False
+        if budget.memory is not None and self.memory > budget.memory:
+            return False
+        return True
+
+    def __repr__(self):
+        return f"CostEstimate({self.method.name}, cost={self.cost}, seconds={self.seconds:.3g}, memory={self.memory:.3g})"
+
+
+class PlanBudget:
+    """Limits on the predicted run time (seconds) and peak memory (bytes) of a plan."""
+    def __init__(self, seconds: float = None, memory: float = None):
+        self.seconds = seconds
+        self.memory = memory
+
+    def __repr__(self):
+        return f"PlanBudget(seconds={self.seconds}, memory={self.memory})"
+
+
+class PlanRecord:
+    """Predicted against measured cost for one executed plan."""
+    def __init__(self, estimate: CostEstimate, seconds: float, memory: Optional[int]):
+        self.estimate = estimate
+        self.seconds = seconds
+        self.memory = memory
+
+    @property
+    def method(self) -> AlignmentMethod:
+        return self.estimate.method
+
+    def __repr__(self):
+        return f"PlanRecord({self.method.name}, predicted={self.estimate.seconds:.3g}s, actual={self.seconds:.3g}s)"
+
+
+class PlanResult:
+    """The outcome of executing a plan: one plugin result per step, in graph order."""
+    def __init__(self, pog: "PartialOrderGraph", steps: List[PlanStep], results: List[Tuple[Any, List[List[int]]]], record: PlanRecord):
+        self.pog = pog
+        self.steps = steps
+        self.results = results
+        self.record = record
+
+    def profile(self) -> "Profile":
+        """Assembles the step results into a single Profile with one row per sequence."""
+        from .profile import Profile
+        names = {index: name for name, (index, _) in self.pog.sequence_names.items()}
+        order = sorted(names)
+        blocks = [self._block(step, result, rows, order) for step, (result, rows) in zip(self.steps, self.results)]
+        return Profile.concatenate(blocks, names=[names[index] for index in order])
+
+    @staticmethod
+    def _block(step: PlanStep, result, rows: List[List[int]], order: List[int]) -> "Profile":
+        import numpy as np
+        from .profile import Profile
+
+        if result is None: # nothing needed aligning, at most one distinct non empty text
+            text = next((t for t in step.texts if t), "")
+            row_for = {index: text for group, t in zip(step.labels, step.texts) if t for index in group}
+            return Profile([row_for.get(index, "-" * len(text)) for index in order])
+        if not isinstance(result, Profile):
+            raise TypeError("Assembling an alignment needs a plugin that returns Profile objects")
+        codes = np.full((len(order), result.width), result.gap_code, dtype=np.uint8)
+        position = {index: row for row, index in enumerate(order)}
+        for row, group in enumerate(rows):
+            for index in group:
+                codes[position[index]] = result.codes[row]
+        return Profile.from_codes(codes, alphabet=result.alphabet)
+
+
+class AlignmentBlock:
+    """A finished stretch of an alignment, one step of a plan in graph order.
+
+    `profile` has a row for every sequence of the graph, in `names` order, rows of
+    sequences that do not pass through the stretch are all gaps. `starts` gives the
+    position in each ungapped sequence at which its row starts and `sizes` the number
+    of residues in the row.
+    """
+    def __init__(self, number: int, names: List[str], profile: "Profile", starts: List[int], sizes: List[int]):
+        self.number = number
+        self.names = names
+        self.profile = profile
+        self.starts = starts
+        self.sizes = sizes
+
+    @property
+    def width(self) -> int:
+        return self.profile.width
+
+    def rows(self) -> List[str]:
+        return self.profile.rows()
+
+    def __repr__(self):
+        return f"AlignmentBlock({self.number}, rows={len(self.names)}, width={self.width})"
+
+
+class AlignmentPlanner:
+    """Estimates, selects and runs the cheapest AlignmentMethod for a PartialOrderGraph.
+
+    Costs are predicted by replaying each method's plan through an AlignmentBuffer with
+    the PluginCostAlignment plugin, which gives a (min, max) range of DP cells. Cells
+    are converted to seconds and bytes with `seconds_per_cell` and `bytes_per_cell`,
+    `calibrate` refits `seconds_per_cell` from the plans that have been executed.
+    The texts of each step are merged in the order chosen by `merge_order`.
+    """
+    METHODS = (AlignmentMethod.PROGRESSIVE, AlignmentMethod.DEBRUIJNGRAPH, AlignmentMethod.BRAIDEDDEBRUIJGRAPH)
+
+    def __init__(self, pog: "PartialOrderGraph", seconds_per_cell: float = 1e-6, bytes_per_cell: int = 8, merge_order: MergeOrderOptimizer = None):
+        self.pog = pog
+        self.seconds_per_cell = seconds_per_cell
+        self.bytes_per_cell = bytes_per_cell
+        self.merge_order = merge_order or MergeOrderOptimizer("naive")
+        self.history: List[PlanRecord] = []
+
+    def steps(self, method: AlignmentMethod) -> List[PlanStep]:
+        """Returns the groups of texts the method aligns, in graph order."""
+        return list(self.iter_steps(method))
+
+    def iter_steps(self, method: AlignmentMethod) -> Iterator[PlanStep]:
+        """Yields the steps of a method one at a time, walking the graph as they are asked for."""
+        if method == AlignmentMethod.PROGRESSIVE:
+            indices = sorted(index for index, _ in self.pog.sequence_names.values())
+            yield PlanStep([self.pog[index] for index in indices], [[index] for index in indices])
+            return
+        if method not in (AlignmentMethod.DEBRUIJNGRAPH, AlignmentMethod.BRAIDEDDEBRUIJGRAPH):
+            raise ValueError(f"No plan for alignment method {method}")
+        for segment in self.pog.segments():
+            if not isinstance(segment, POG_Bubble):
+                yield PlanStep([segment.fragment], [sorted(segment.sequence_set)])
+                continue
+            braided = method == AlignmentMethod.BRAIDEDDEBRUIJGRAPH
+            yield PlanStep(*MergeOrderOptimizer.bubble_items(segment, braided), bubble=segment)
+
+    def estimate(self, method: AlignmentMethod) -> CostEstimate:
+        if method == AlignmentMethod.EXACT:
+            return self._estimate_exact()
+        plugin = PluginCostAlignment()
+        buffer = AlignmentBuffer(plugin)
+        for step in self.steps(method):
+            self._run_step(buffer, step)
+        results = [r for r in buffer.results.values() if isinstance(r, ProfileCostAlignment)]
+        cost = (sum(r.cost[0] for r in results), sum(r.cost[1] for r in results))
+        peak = max((r.cost[1] for r in results), default=0)
+        return self._estimate(method, cost, peak, len(buffer.operations))
+
+    def _estimate(self, method: AlignmentMethod, cost, peak, operations: int) -> CostEstimate:
+        return CostEstimate(method, cost, peak, operations, cost[1] * self.seconds_per_cell, peak * self.bytes_per_cell)
+
+    def _estimate_exact(self) -> CostEstimate:
+        # the product of all lengths is summed in log space, it overflows to inf rather than into a bignum
+        log_cells = math.fsum(math.log(max(length, 1)) for _, length in self.pog.sequence_names.values())
+        cells = math.exp(log_cells) if log_cells < 700 else math.inf
+        return self._estimate(AlignmentMethod.EXACT, (cells, cells), cells, 1)
+
+    def estimates(self) -> Dict[AlignmentMethod, CostEstimate]:
+        """Returns the cost estimate of every method, including the (unrunnable) exact alignment."""
+        estimates = {method: self.estimate(method) for method in self.METHODS}
+        estimates[AlignmentMethod.EXACT] = self._estimate_exact()
+        return estimates
+
+    def select(self, budget: PlanBudget = None) -> CostEstimate:
+        """Returns the estimate of the cheapest runnable method that fits the budget."""
+        candidates = [self.estimate(method) for method in self.METHODS]
+        affordable = [estimate for estimate in candidates if estimate.fits(budget)]
+        if not affordable:
+            cheapest = min(candidates, key=lambda estimate: estimate.cost[1])
+            raise ValueError(f"No alignment method fits {budget}, the cheapest is {cheapest}")
+        return min(affordable, key=lambda estimate: (estimate.cost[1], estimate.cost[0]))
+
+    def execute(self, plugin: AlignmentPlugin, method: AlignmentMethod = None, budget: PlanBudget = None, measure_memory: bool = False,
+                checkpoint: Union[str, Path] = None) -> PlanResult:
+        """Runs a method (the selected one by default) with a plugin and records predicted against actual cost.
+
+        With a `checkpoint` directory completed alignments are saved as they finish and
+        a rerun after an interruption reuses them, see AlignmentBuffer.
+        """
+        estimate = self.estimate(method) if method is not None else self.select(budget)
+        steps = self.steps(estimate.method)
+        buffer = AlignmentBuffer(plugin, checkpoint)
+        if measure_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            results = []
+            for step in steps:
+                index, rows = self._run_step(buffer, step)
+                results.append((buffer.results[index] if index is not None else None, rows))
+            seconds = time.perf_counter() - start
+            memory = tracemalloc.get_traced_memory()[1] if measure_memory else None
+        finally:
+            buffer.close()
+            if measure_memory:
+                tracemalloc.stop()
+        record = PlanRecord(estimate, seconds, memory)
+        self.history.append(record)
+        return PlanResult(self.pog, steps, results, record)
+
+    def blocks(self, plugin: AlignmentPlugin, method: AlignmentMethod = None, budget: PlanBudget = None,
+               checkpoint: Union[str, Path] = None) -> Iterator[AlignmentBlock]:
+        """Runs a method step by step and yields each finished block in graph order.
+
+        Conserved fragments come out verbatim and bubbles as soon as they are aligned.
+        Only the step being aligned is held, so output can be written while the rest
+        of the graph is still to be aligned. The plugin must return Profile objects.
+        A `checkpoint` directory is used as in `execute`.
+        """
+        method = method if method is not None else self.select(budget).method
+        names = {index: name for name, (index, _) in self.pog.sequence_names.items()}
+        order = sorted(names)
+        starts = [0] * len(order)
+        with AlignmentBuffer(plugin, checkpoint) as buffer:
+            for number, step in enumerate(self.iter_steps(method)):
+                index, rows = self._run_step(buffer, step)
+                profile = PlanResult._block(step, buffer.results[index] if index is not None else None, rows, order)
+                buffer.clear() # steps are independent, drop the intermediate profiles
+                sizes = [int(size) for size in (profile.codes != profile.gap_code).sum(axis=1)]
+                yield AlignmentBlock(number, [names[index] for index in order], profile, list(starts), sizes)
+                starts = [start + size for start, size in zip(starts, sizes)]
+
+    def calibrate(self) -> float:
+        """Refits seconds_per_cell as the median measured time per predicted cell."""
+        ratios = sorted(record.seconds / record.estimate.cost[1] for record in self.history if record.estimate.cost[1])
+        if ratios:
+            middle = len(ratios) // 2
+            self.seconds_per_cell = ratios[middle] if len(ratios) % 2 else (ratios[middle - 1] + ratios[middle]) / 2
+        return self.seconds_per_cell
+
+    def _run_step(self, buffer: AlignmentBuffer, step: PlanStep) -> Tuple[Optional[int], List[List[int]]]:
+        """Aligns a step's texts through the buffer, returns the result index and the sequences each row stands for."""
+        keep = [position for position, text in enumerate(step.texts) if text]
+        if len(keep) < 2:
+            return None, []
+        texts = [step.texts[position] for position in keep]
+        labels = [step.labels[position] for position in keep]
+        nodes = [step.nodes[position] for position in keep] if step.nodes is not None else None
+        if isinstance(buffer.alignment_plugin, BandedAlignmentPlugin):
+            buffer.alignment_plugin.band_from_bubble(step.bubble)
+        return self.merge_order.plan(texts, nodes).run(buffer, texts, labels)
@@ -0,0 +1,297 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .pog_node import POG_Node
+
+
+class GraphAlignment:
+    """The result of aligning a sequence to a partial order graph.
+
+    `path` holds one `(node, offset, position)` step per alignment column: a graph
+    column (`node`, `offset` into its fragment) against a sequence `position`. Graph
+    columns skipped by the sequence have a position of None, sequence residues
+    inserted relative to the graph have a node and offset of None.
+    """
+    def __init__(self, sequence: str, score: float, path: List[Tuple[Optional[POG_Node], Optional[int], Optional[int]]], cells: int):
+        self.sequence = sequence
+        self.score = score
+        self.path = path
+        self.cells = cells
+
+    def aligned_columns(self) -> List[Tuple[POG_Node, int, int]]:
+        """Returns the steps where a sequence residue sits in a graph column."""
+        return [step for step in self.path if step[0] is not None and step[2] is not None]
+
+    def matches(self) -> int:
+        return sum(1 for node, offset, position in self.aligned_columns() if node.fragment[offset] == self.sequence[position])
+
+    @property
+    def start(self) -> Optional[Tuple[POG_Node, int]]:
+        """The first graph column holding a residue of the sequence."""
+        columns = self.aligned_columns()
+        return (columns[0][0], columns[0][1]) if columns else None
+
+    @property
+    def end(self) -> Optional[Tuple[POG_Node, int]]:
+        """The last graph column holding a residue of the sequence."""
+        columns = self.aligned_columns()
+        return (columns[-1][0], columns[-1][1]) if columns else None
+
+    def __repr__(self):
+        return f"GraphAlignment(score={self.score}, columns={len(self.path)})"
+
+
+class PartialOrderAligner:
+    """Aligns sequences directly against a PartialOrderGraph (partial order alignment).
+
+    Nodes are visited in topological order and every character of a node's fragment is
+    a column of the DP matrix, so conserved fragments are handled as multi-column nodes.
+    Each column's row is computed with vector operations over the sequence positions
+    inside the node's band.
+
+    In "global" mode the sequence is aligned end to end from the root to the sinks of
+    the graph, the band keeps each node to the sequence positions within `band` of its
+    offsets from the root. In "semiglobal" mode (for reads) the whole sequence must be
+    aligned but it may start and end anywhere in the graph, so no band is applied.
+    """
+    def __init__(self, match: float = 1.0, mismatch: float = -1.0, gap: float = -2.0, band: int = None):
+        self.match = match
+        self.mismatch = mismatch
+        self.gap = gap
+        self.band = band
+
+    def align(self, pog: "PartialOrderGraph", sequence: str, mode: str = "global") -> GraphAlignment:
+        if mode not in ("global", "semiglobal"):
+            raise ValueError(f"Unsupported alignment mode '{mode}'")
+        order = pog.topological_order()
+        predecessors = self._predecessors(order)
+        codes = np.frombuffer(sequence.encode("ascii"), dtype=np.uint8)
+        m = len(codes)
+        windows = self._windows(order, predecessors, m, mode)
+        init = np.arange(m + 1) * self.gap
+
+        entries: Dict[POG_Node, Tuple[int, np.ndarray]] = {}
+        columns: Dict[POG_Node, List[Tuple[int, np.ndarray]]] = {}
+        cells = 0
+        for node in order:
+            lo, hi = windows[node]
+            js = np.arange(lo, hi + 1)
+            entry = np.full(len(js), -np.inf)
+            for predecessor in predecessors[node]:
+                entry = np.maximum(entry, self._values(self._exit(predecessor, entries, columns), js))
+            if not predecessors[node] or mode == "semiglobal":
+                entry = np.maximum(entry, init[js])
+            entries[node] = (lo, entry)
+            rows = []
+            previous = (lo, entry)
+            for char in (node.fragment or ""):
+                previous = self._column(previous, ord(char), codes, js)
+                rows.append(previous)
+                cells += len(js)
+            columns[node] = rows
+
+        score, state = self._best_end(order, entries, columns, m, mode)
+        path = self._traceback(state, m, predecessors, entries, columns, codes)
+        return GraphAlignment(sequence, float(score), path, cells)
+
+    def add_sequence(self, pog: "PartialOrderGraph", sequence: str, name: str = None) -> int:
+        """Aligns a sequence to the graph and threads it through, returns its sequence index."""
+        alignment = self.align(pog, sequence, "global")
+        index = max((value[0] for value in pog.sequence_names.values()), default=0) + 1
+        name = name or f"Sequence_{index}"
+        if name in pog.sequence_names:
+            raise ValueError(f"Sequence name '{name}' already exists")
+
+        # group used graph columns into runs within a node, everything else becomes new residues
+        elements: List[Tuple[str, object]] = []
+        for node, offset, position in alignment.path:
+            if node is not None and position is not None and node.fragment[offset] == sequence[position]:
+                last = elements[-1] if elements else None
+                if last and last[0] == "run" and last[1][0] is node and last[1][2] == offset:
+                    last[1][2] = offset + 1
+                else:
+                    elements.append(("run", [node, offset, offset + 1]))
+            elif position is not None:
+                if elements and elements[-1][0] == "new":
+                    elements[-1][1].append(sequence[position])
+                else:
+                    elements.append(("new", [sequence[position]]))
+
+        root = pog.root
+        first_run = elements[0][1] if elements and elements[0][0] == "run" else None
+        if root.fragment and not (first_run and first_run[0] is root and first_run[1] == 0):
+            # the sequence does not start with the root's fragment, keep the root as an empty start node
+            body = POG_Node(root.fragment, set(root.sequence_set))
+            body.next, root.next = root.next, [body]
+            root.fragment = None
+            for kind, value in elements:
+                if kind == "run" and value[0] is root:
+                    value[0] = body
+
+        cuts: Dict[POG_Node, set] = {}
+        for kind, value in elements:
+            if kind == "run":
+                node, start, end = value
+                cuts.setdefault(node, set()).update({start, end})
+        pieces = {node: self._split(node, offsets) for node, offsets in cuts.items()}
+
+        path = [root]
+        for kind, value in elements:
+            if kind == "run":
+                node, start, _ = value
+                piece = pieces[node][start]
+            else:
+                piece = POG_Node("".join(value), set())
+            if piece is not path[-1]:
+                path.append(piece)
+        sinks = [node for node in pog.topological_order() if not node.next and not node.fragment]
+        if len(sinks) == 1 and sinks[0] is not path[-1]:
+            path.append(sinks[0])
+
+        for node in path:
+            node.sequence_set.add(index)
+        for node, successor in zip(path, path[1:]):
+            if successor not in node.next:
+                node.add_node(successor)
+        # successors are kept in topological order so get_next finds the immediate successor first
+        rank = {node: position for position, node in enumerate(pog.topological_order())}
+        for node in path:
+            node.next.sort(key=lambda successor: rank[successor])
+        pog.sequence_names = {**pog.sequence_names, name: (index, len(sequence))}
+        pog.invalidate_coordinates()
+        return index
+
+    @staticmethod
+    def _split(node: POG_Node, offsets: set) -> Dict[int, POG_Node]:
+        """Splits a node's fragment at the given offsets, returns the piece starting at each offset.
+
+        The node itself keeps the first piece so existing references to it stay valid.
+        """
+        fragment = node.fragment or ""
+        cuts = sorted(offset for offset in offsets if 0 < offset < len(fragment))
+        pieces = {0: node}
+        if not cuts:
+            return pieces
+        bounds = cuts + [len(fragment)]
+        successors = node.next
+        node.fragment = fragment[:cuts[0]]
+        node.next = []
+        current = node
+        for start, end in zip(bounds, bounds[1:]):
+            piece = POG_Node(fragment[start:end], set(node.sequence_set))
+            current.next = [piece]
+            pieces[start] = piece
+            current = piece
+        current.next = successors
+        return pieces
+
+    @staticmethod
+    def _predecessors(order: List[POG_Node]) -> Dict[POG_Node, List[POG_Node]]:
+        predecessors = {node: [] for node in order}
+        for node in order:
+            for successor in dict.fromkeys(node.next):
+                predecessors[successor].append(node)
+        return predecessors
+
+    def _windows(self, order, predecessors, m: int, mode: str) -> Dict[POG_Node, Tuple[int, int]]:
+        """Returns the band of sequence positions (inclusive) each node is aligned against."""
+        if self.band is None or mode == "semiglobal":
+            return {node: (0, m) for node in order}
+        shortest, longest = {}, {}
+        for node in order:
+            starts = [(shortest[p] + len(p.fragment or ""), longest[p] + len(p.fragment or "")) for p in predecessors[node]]
+            shortest[node] = min((s for s, _ in starts), default=0)
+            longest[node] = max((l for _, l in starts), default=0)
+        sinks = [node for node in order if not node.next]
+        band = self.band
+        for sink in sinks: # the end of the sequence has to be inside the band of every sink
+            end_short = shortest[sink] + len(sink.fragment or "")
+            end_long = longest[sink] + len(sink.fragment or "")
+            band = max(band, m - end_long, end_short - m)
+        return {node: (max(0, min(m, shortest[node] - band)), min(m, longest[node] + len(node.fragment or "") + band)) for node in order}
+
+    @staticmethod
+    def _values(row: Tuple[int, np.ndarray], js: np.ndarray) -> np.ndarray:
+        lo, values = row
+        index = js - lo
+        inside = (index >= 0) & (index < len(values))
+        result = np.full(len(js), -np.inf)
+        result[inside] = values[index[inside]]
+        return result
+
+    @staticmethod
+    def _exit(node: POG_Node, entries, columns) -> Tuple[int, np.ndarray]:
+        rows = columns[node]
+        return rows[-1] if rows else entries[node]
+
+    def _column(self, previous: Tuple[int, np.ndarray], char: int, codes: np.ndarray, js: np.ndarray) -> Tuple[int, np.ndarray]:
+        gap = self.gap
+        pre = self._values(previous, js) + gap
+        diagonal = js >= 1
+        if diagonal.any():
+            jd = js[diagonal]
+            substitution = np.where(codes[jd - 1] == char, self.match, self.mismatch)
+            pre[diagonal] = np.maximum(pre[diagonal], self._values(previous, jd - 1) + substitution)
+        # insertions of sequence residues: H[j] = max_k(pre[k] + (j - k) * gap)
+        offset = js * gap
+        return (int(js[0]), np.maximum.accumulate(pre - offset) + offset)
+
+    def _best_end(self, order, entries, columns, m: int, mode: str):
+        best, state = -np.inf, None
+        at_end = np.array([m])
+        if mode == "global":
+            for node in order:
+                if not node.next:
+                    rows = columns[node]
+                    candidate = ("column", node, len(rows) - 1) if rows else ("entry", node, None)
+                    value = self._values(self._exit(node, entries, columns), at_end)[0]
+                    if value > best:
+                        best, state = value, candidate
+        else:
+            for node in order:
+                for offset, row in enumerate(columns[node]):
+                    value = self._values(row, at_end)[0]
+                    if value > best:
+                        best, state = value, ("column", node, offset)
+            if state is None:
+                best, state = m * self.gap, ("entry", order[0], None)
+        return best, state
+
+    def _traceback(self, state, j: int, predecessors, entries, columns, codes):
+        path = []
+        close = lambda a, b: np.isclose(a, b)
+        while True:
+            kind, node, offset = state
+            if kind == "column":
+                row = columns[node][offset]
+                previous = columns[node][offset - 1] if offset > 0 else entries[node]
+                previous_state = ("column", node, offset - 1) if offset > 0 else ("entry", node, None)
+                value = self._values(row, np.array([j]))[0]
+                char = ord(node.fragment[offset])
+                if j > 0:
+                    substitution = self.match if codes[j - 1] == char else self.mismatch
+                    if close(value, self._values(previous, np.array([j - 1]))[0] + substitution):
+                        path.append((node, offset, j - 1))
+                        state, j = previous_state, j - 1
+                        continue
+                if close(value, self._values(previous, np.array([j]))[0] + self.gap):
+                    path.append((node, offset, None))
+                    state = previous_state
+                    continue
+                path.append((None, None, j - 1))
+                j -= 1
+            else:
+                value = self._values(entries[node], np.array([j]))[0]
+                source = None
+                for predecessor in predecessors[node]:
+                    if close(value, self._values(self._exit(predecessor, entries, columns), np.array([j]))[0]):
+                        source = predecessor
+                        break
+                if source is None: # started here, what is left of the sequence is inserted
+                    path.extend((None, None, position) for position in range(j - 1, -1, -1))
+                    break
+                rows = columns[source]
+                state = ("column", source, len(rows) - 1) if rows else ("entry", source, None)
+        path.reverse()
+        return path
@@ -1,5 +1,5 @@
 from __future__ import annotations # this is needed for forward references in type hints
-from typing import List
+from typing import Dict, List
 from dbg_align.pog_node import POG_Node
 
 
@@ -8,4 +8,34 @@ class POG_Bubble:
         self.start = start
         self.end = end
         self.depth = depth
-        self.inner_bubbles = inner_bubbles
\ No newline at end of file
+        self.inner_bubbles = inner_bubbles
+
+    def branch_nodes(self) -> Dict[int, List[POG_Node]]:
+        """Returns the nodes each sequence passes through between the start and end of the bubble (both excluded)."""
+        paths = {}
+        for index in sorted(self.start.sequence_set):
+            path = []
+            node = self.start.get_next(index)
+            while node is not None and node is not self.end:
+                path.append(node)
+                node = node.get_next(index)
+            paths[index] = path
+        return paths
+
+    def branches(self) -> Dict[int, str]:
+        """Returns the text each sequence takes between the start and end of the bubble (both excluded)."""
+        return {index: "".join(node.fragment or '' for node in path) for index, path in self.branch_nodes().items()}
+
+    def branch_lengths(self) -> Dict[int, int]:
+        """Returns the length of each sequence's branch through the bubble."""
+        return {index: len(branch) for index, branch in self.branches().items()}
+
+    def length_spread(self) -> int:
+        """Returns the difference between the longest and shortest branch of the bubble."""
+        lengths = self.branch_lengths().values()
+        if not lengths:
+            return 0
+        return max(lengths) - min(lengths)
+
+    def __repr__(self):
+        return f"Bubble({self.start.fragment}->{self.end.fragment}, depth:{self.depth})"
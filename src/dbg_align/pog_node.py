@@ -1,6 +1,7 @@
 from __future__ import annotations # this is needed for forward references in type hints
+from bisect import bisect_left
 from functools import singledispatchmethod
-from typing import List, Set, Union
+from typing import Dict, List, Set, Tuple, Union
 
 class POG_Node:
     def __init__(self, fragment : str = None, sequence_set: Set[int] = None):
@@ -26,38 +27,157 @@ class POG_Node:
 
     @classmethod
     def from_dbg_node(cls, dbg_node : 'DBGNode', sequence_set: Set[int], read_full_kmer : bool = True):
-        from .dbg_node import DBGNode
-        if dbg_node.kmer == None: # is special case of root node
-            instance = cls(None, sequence_set)
-
-            unique_edges = {edge.target_node for edge in dbg_node.edges}
-            for unique_edge in unique_edges:
-                sequences = set()
-                for edge in dbg_node.edges:
-                    if edge.target_node == unique_edge:
-                        sequences.add(edge.sequence) 
-                instance.add_node(cls.from_dbg_node(unique_edge, sequences, True))  
-
-            for target, sequences in dbg_node.get_braids().items():
-                child = cls.from_dbg_node(target, sequences, True)
-                instance.add_node(child)
-        else:
-            node = dbg_node
-            kmer = node.kmer if read_full_kmer else node.kmer[-1]
-            instance = cls(kmer, sequence_set)  
-
-            while node and node.edges and node.edges_form_single_braid():# extend POG node until we reach a branch
-                node = node.edges[0].target_node # in a single braid any edge will get you to the next node
-                instance.fragment += node.kmer[-1] # add the last base of the kmer to the fragment
-                if node.edges: # except if we are the terminal node
-                    instance.fragment += node.edges[0].cycle #add any cycles to the fragment
-            if not node:
-                return instance
-            
-            for target, sequences in node.get_braids().items():
-                child = cls.from_dbg_node(target, sequences, False)
-                instance.add_node(child)
-        return instance
+        """Builds the partial order graph of the sequences that leave a de Bruijn graph node.
+
+        Each sequence is read from the de Bruijn graph as a path of pieces: the text of
+        each edge it follows (cycle text, or text a sparse graph skips) and the text each
+        kmer adds. Sequences share the piece of a kmer or edge through one node as long
+        as the graph stays acyclic: pieces are ranked, every edge goes from a lower to a
+        higher rank, and a sequence reuses the longest chain of existing pieces whose ranks
+        increase along it. Its other pieces are new, ranked between their neighbours, so
+        a kmer that sequences reach in different orders is split into one piece per order.
+        Runs of pieces that sequences pass through in the same way are joined into one
+        POG node.
+        """
+        # pieces are held in parallel lists, piece 0 is the node the sequences leave
+        texts = [dbg_node.kmer if read_full_kmer else dbg_node.entry_text()] if dbg_node.kmer is not None else [""]
+        ranks, counts, successors = [0.0], [0], [set()]
+        copies: Dict[tuple, List[int]] = {} # piece key -> the pieces made for it
+        paths = {}
+        for index in sorted(sequence_set):
+            pieces = cls._pieces(dbg_node, index)
+            chosen = cls._reused(pieces, copies, ranks)
+            for position, rank in cls._new_ranks(chosen, ranks):
+                key, text = pieces[position]
+                chosen[position] = len(texts)
+                copies.setdefault(key, []).append(len(texts))
+                texts.append(text)
+                ranks.append(rank)
+                counts.append(0)
+                successors.append(set())
+            path = [0, *chosen]
+            for a, b in zip(path, chosen):
+                successors[a].add(b)
+            for piece in path:
+                counts[piece] += 1
+            paths[index] = path
+
+        predecessors = [0] * len(texts)
+        only_predecessor = [-1] * len(texts)
+        for piece, targets in enumerate(successors):
+            for target in targets:
+                predecessors[target] += 1
+                only_predecessor[target] = piece
+        # a piece joins the node of its predecessor when each is the other's only neighbour and no sequence starts or ends between them
+        head = list(range(len(texts)))
+        tail = {}
+        parts: Dict[int, List[str]] = {}
+        for piece in sorted(range(len(texts)), key=ranks.__getitem__):
+            before = only_predecessor[piece]
+            if before > 0 and predecessors[piece] == 1 and len(successors[before]) == 1 and counts[before] == counts[piece]:
+                head[piece] = head[before]
+                parts[head[piece]].append(texts[piece])
+            else:
+                parts[piece] = [texts[piece]]
+            tail[head[piece]] = piece
+        nodes = {piece: cls("".join(text), set()) for piece, text in parts.items()}
+        for index, path in paths.items():
+            for piece in path:
+                if head[piece] == piece:
+                    nodes[piece].sequence_set.add(index)
+        for piece, node in nodes.items():
+            node.next = [nodes[target] for target in sorted(successors[tail[piece]], key=ranks.__getitem__)]
+        root = nodes[0]
+        if dbg_node.kmer is None:
+            root.fragment = None
+        root.sequence_set = set(sequence_set)
+        return root
+
+    @staticmethod
+    def _pieces(dbg_node: 'DBGNode', index: int) -> List[tuple]:
+        """Returns the (key, text) pieces of a sequence from a de Bruijn graph node on, pieces with the same key have the same text."""
+        pieces = []
+        node, first, visited = dbg_node, dbg_node.kmer is None, set()
+        while True:
+            edge = node.get_edge(index)
+            if edge is None:
+                break
+            target = edge.target_node
+            text = edge.text
+            if text:
+                pieces.append((("edge", node.kmer, target.kmer if target is not None else None, text), text))
+            if target is None:
+                break
+            if target.kmer in visited:
+                raise ValueError(f"Sequence {index} loops back on itself in the de Bruijn graph")
+            visited.add(target.kmer)
+            entry = target.entry_text()
+            if first: # the first kmer is read in full
+                prefix = target.kmer[:len(target.kmer) - len(entry)]
+                if prefix:
+                    pieces.append((("prefix", target.kmer), prefix))
+                first = False
+            pieces.append((target.kmer, entry)) # a kmer piece is keyed on the kmer itself
+            node = target
+        return pieces
+
+    @staticmethod
+    def _reused(pieces: List[tuple], copies: Dict[tuple, List[int]], ranks: List[float]) -> List[int]:
+        """Returns, for each piece of a sequence, the existing piece it reuses or None.
+
+        The reused pieces are a longest chain of strictly increasing rank (patience
+        sorting, the copies of one key tried highest rank first so at most one is taken).
+        """
+        tail_ranks, tail_items = [], []
+        items = [] # (position, piece, previous item)
+        for position, (key, _) in enumerate(pieces):
+            candidates = copies.get(key)
+            if not candidates:
+                continue
+            if len(candidates) > 1:
+                candidates = sorted(candidates, key=ranks.__getitem__, reverse=True)
+            for piece in candidates:
+                rank = ranks[piece]
+                slot = bisect_left(tail_ranks, rank)
+                items.append((position, piece, tail_items[slot - 1] if slot else -1))
+                if slot == len(tail_ranks):
+                    tail_ranks.append(rank)
+                    tail_items.append(len(items) - 1)
+                else:
+                    tail_ranks[slot] = rank
+                    tail_items[slot] = len(items) - 1
+        chosen = [None] * len(pieces)
+        item = tail_items[-1] if tail_items else -1
+        while item >= 0:
+            position, piece, item = items[item]
+            chosen[position] = piece
+        return chosen
+
+    @staticmethod
+    def _new_ranks(chosen: List[int], ranks: List[float]) -> List[Tuple[int, float]]:
+        """Returns a rank for each new piece of a sequence, evenly spaced between the reused pieces around it.
+
+        When the ranks of neighbouring pieces are too close to fit the new ones between
+        them, all ranks are renumbered 0, 1, 2... in their order first.
+        """
+        for _ in range(2):
+            placed, lower, start = [], 0.0, 0
+            for position, piece in enumerate(chosen):
+                if piece is None:
+                    continue
+                upper = ranks[piece]
+                if position > start:
+                    step = (upper - lower) / (position - start + 1)
+                    if step <= abs(upper) * 1e-9:
+                        break
+                    placed.extend((new, lower + step * (number + 1)) for number, new in enumerate(range(start, position)))
+                lower, start = upper, position + 1
+            else:
+                placed.extend((new, lower + number + 1) for number, new in enumerate(range(start, len(chosen))))
+                return placed
+            for rank, piece in enumerate(sorted(range(len(ranks)), key=ranks.__getitem__)):
+                ranks[piece] = float(rank)
+        raise ValueError("Could not rank the pieces of the partial order graph")
 
     def __getitem__(self, index: int):
         return self.next[index]
@@ -75,13 +195,13 @@ class POG_Node:
     def sequence(self, index: int) -> str:
         if index not in self.sequence_set:
             return ''
-        sequence = ''
+        fragments = []
         node = self
         while node is not None:
-            fragment = node.fragment if node.fragment is not None else ''
-            sequence += fragment
+            if node.fragment:
+                fragments.append(node.fragment)
             node = node.get_next(index)
-        return sequence
+        return ''.join(fragments)
 
     def __repr__(self):
         return f"{self.sequence_set}:{self.fragment}:{len(self.next)}"
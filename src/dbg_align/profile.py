@@ -0,0 +1,192 @@
+from typing import Iterable, List, Union
+
+import numpy as np
+
+# order of cogent3.DNA.alphabets.degen_gapped, so codes can be handed to cogent3 without decoding
+DNA_ALPHABET = "TCAG-NRYWSKMBDHV?"
+GAP = "-"
+
+
+class Profile:
+    """A gapped alignment stored as a matrix of uint8 codes with per column residue counts.
+
+    Columns are kept in chunks so that concatenation only appends to a list, the
+    chunks are merged into a single matrix the first time the whole matrix is needed.
+    Per column frequency counts are cached per chunk.
+
+    Rows are ordered the way plugins build profiles: `[seq1, seq2]` for two sequences,
+    `[seq, *profile]` when a sequence is added to a profile and `[*profile1, *profile2]`
+    when two profiles are aligned.
+    """
+    def __init__(self, rows: Iterable[str] = (), names: List[str] = None, alphabet: str = DNA_ALPHABET):
+        self.alphabet = alphabet
+        self._lookup = self._build_lookup(alphabet)
+        rows = list(rows)
+        self.names = list(names) if names is not None else None
+        self.n_rows = len(rows)
+        self.width = len(rows[0]) if rows else 0
+        self._chunks: List[np.ndarray] = []
+        self._counts: List[np.ndarray] = []
+        if rows:
+            if any(len(row) != self.width for row in rows):
+                raise ValueError("All rows of a profile must have the same length")
+            self._append_chunk(self._encode(rows))
+
+    @staticmethod
+    def _build_lookup(alphabet: str) -> np.ndarray:
+        lookup = np.full(256, 255, dtype=np.uint8)
+        for code, char in enumerate(alphabet):
+            lookup[ord(char)] = code
+            lookup[ord(char.lower())] = code
+        return lookup
+
+    def _encode(self, rows: List[str]) -> np.ndarray:
+        raw = np.frombuffer("".join(rows).encode("ascii"), dtype=np.uint8)
+        codes = self._lookup[raw]
+        if (codes == 255).any():
+            bad = {chr(c) for c in raw[codes == 255]}
+            raise ValueError(f"Characters {sorted(bad)} are not in the profile alphabet")
+        return codes.reshape(len(rows), -1)
+
+    def _append_chunk(self, chunk: np.ndarray):
+        if chunk.shape[1]:
+            self._chunks.append(chunk)
+            self._counts.append(None)
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, names: List[str] = None, alphabet: str = DNA_ALPHABET) -> "Profile":
+        """Wraps an existing (rows x columns) uint8 code matrix without copying it."""
+        profile = cls(names=names, alphabet=alphabet)
+        profile.n_rows, profile.width = codes.shape
+        profile._append_chunk(codes)
+        return profile
+
+    @classmethod
+    def from_moltype(cls, rows: Iterable[str], moltype: "MolType", names: List[str] = None) -> "Profile":
+        """Creates a profile using the degenerate gapped alphabet of a cogent3 moltype."""
+        return cls(rows, names, alphabet="".join(moltype.alphabets.degen_gapped))
+
+    @classmethod
+    def gaps(cls, n_rows: int, width: int, names: List[str] = None, alphabet: str = DNA_ALPHABET) -> "Profile":
+        """Creates a profile made only of gaps."""
+        codes = np.full((n_rows, width), alphabet.index(GAP), dtype=np.uint8)
+        profile = cls.from_codes(codes, names, alphabet)
+        profile.n_rows = n_rows
+        return profile
+
+    @property
+    def gap_code(self) -> int:
+        return self.alphabet.index(GAP)
+
+    @property
+    def codes(self) -> np.ndarray:
+        """The (rows x columns) code matrix, merging column chunks on first use."""
+        if not self._chunks:
+            return np.zeros((self.n_rows, 0), dtype=np.uint8)
+        if len(self._chunks) > 1:
+            counts = self.counts if all(c is not None for c in self._counts) else None
+            self._chunks = [np.concatenate(self._chunks, axis=1)]
+            self._counts = [counts]
+        return self._chunks[0]
+
+    @property
+    def counts(self) -> np.ndarray:
+        """A (columns x alphabet) matrix holding how many rows have each code in each column."""
+        size = len(self.alphabet)
+        for position, chunk in enumerate(self._chunks):
+            if self._counts[position] is None:
+                counts = np.zeros((chunk.shape[1], size), dtype=np.uint32)
+                columns = np.broadcast_to(np.arange(chunk.shape[1]), chunk.shape)
+                np.add.at(counts, (columns, chunk), 1)
+                self._counts[position] = counts
+        if not self._counts:
+            return np.zeros((0, size), dtype=np.uint32)
+        if len(self._counts) == 1:
+            return self._counts[0]
+        return np.concatenate(self._counts, axis=0)
+
+    @property
+    def frequencies(self) -> np.ndarray:
+        """Per column code frequencies, each row of the result sums to one."""
+        if not self.n_rows:
+            return np.zeros((self.width, len(self.alphabet)))
+        return self.counts / self.n_rows
+
+    def rows(self) -> List[str]:
+        """Decodes the profile back into gapped strings."""
+        table = np.frombuffer(self.alphabet.encode("ascii"), dtype=np.uint8)
+        return [table[row].tobytes().decode("ascii") for row in self.codes]
+
+    def extend(self, other: Union[str, "Profile"]) -> "Profile":
+        """Appends the columns of another profile (or a fragment shared by every row) in place."""
+        if isinstance(other, str):
+            if other:
+                self._append_chunk(np.tile(self._encode([other]), (self.n_rows, 1)))
+                self.width += len(other)
+            return self
+        if other.alphabet != self.alphabet:
+            raise ValueError("Profiles must share an alphabet to be concatenated")
+        if other.n_rows != self.n_rows:
+            raise ValueError("Profiles being concatenated must have the same number of rows")
+        for chunk, counts in zip(other._chunks, other._counts):
+            self._chunks.append(chunk)
+            self._counts.append(counts)
+        self.width += other.width
+        return self
+
+    @classmethod
+    def concatenate(cls, elements: List[Union[str, "Profile"]], names: List[str] = None) -> "Profile":
+        """Concatenates profiles and fragments, fragments are shared by every row."""
+        profiles = [e for e in elements if isinstance(e, Profile)]
+        alphabet = profiles[0].alphabet if profiles else DNA_ALPHABET
+        n_rows = profiles[0].n_rows if profiles else 1
+        if names is None and profiles:
+            names = profiles[0].names
+        result = cls(names=names, alphabet=alphabet)
+        result.n_rows = n_rows
+        for element in elements:
+            result.extend(element)
+        return result
+
+    def substitution_matrix(self, match: float = 1.0, mismatch: float = -1.0, gap: float = -2.0) -> np.ndarray:
+        """Returns a simple match/mismatch/gap scoring matrix over the profile alphabet."""
+        size = len(self.alphabet)
+        gap_code = self.gap_code
+        scores = np.full((size, size), mismatch)
+        np.fill_diagonal(scores, match)
+        scores[gap_code, :] = gap
+        scores[:, gap_code] = gap
+        scores[gap_code, gap_code] = 0.0
+        return scores
+
+    def score(self, other: "Profile", substitution: np.ndarray = None) -> np.ndarray:
+        """Returns the (self columns x other columns) matrix of expected sum of pairs scores."""
+        if substitution is None:
+            substitution = self.substitution_matrix()
+        return self.frequencies @ substitution @ other.frequencies.T
+
+    def to_alignment(self, moltype: "MolType" = None):
+        """Exports the profile to a cogent3 ArrayAlignment.
+
+        When the profile uses the moltype's degenerate gapped alphabet the code matrix
+        is handed to cogent3 as is, with no decoding to strings.
+        """
+        import cogent3
+        from cogent3.core.alignment import ArrayAlignment
+
+        moltype = moltype or cogent3.DNA
+        names = self.names or [f"Sequence_{i+1}" for i in range(self.n_rows)]
+        if "".join(moltype.alphabets.degen_gapped) == self.alphabet:
+            return ArrayAlignment(self.codes, names=names, moltype=moltype)
+        return cogent3.make_aligned_seqs(dict(zip(names, self.rows())), moltype=moltype, array_align=True)
+
+    def __len__(self):
+        return self.width
+
+    def __eq__(self, other):
+        if not isinstance(other, Profile):
+            return NotImplemented
+        return self.alphabet == other.alphabet and np.array_equal(self.codes, other.codes)
+
+    def __repr__(self):
+        return f"Profile(rows={self.n_rows}, columns={self.width})"
@@ -0,0 +1,375 @@
+"""Publishing a finished graph to shared memory so worker processes read it in place.
+
+Sending a graph to a worker pickles its whole web of node objects, for large graphs
+that costs more than the work the worker does with it. `SharedGraph.publish` flattens
+a DeBruijnGraph or PartialOrderGraph once into numpy arrays in a single
+`multiprocessing.shared_memory` segment, and workers attach to it by name:
+
+    with SharedGraph.publish(pog) as shared:
+        with ProcessPoolExecutor() as pool:
+            sequences = list(pool.map(read_sequence, repeat(shared.name), pog.names()))
+
+    def read_sequence(segment: str, name: str) -> str:
+        return attach(segment).sequence(name)
+
+The segment starts with the length of a JSON header that describes the graph and where
+each array lies, the arrays follow it. Attaching maps the segment and wraps each array
+as a read-only numpy view, nothing is copied or rebuilt. `attach` keeps one view per
+segment per process, so a worker pays for it once however many tasks it runs.
+
+Arrays hold nodes in compressed sparse row form, `X_offsets[i]:X_offsets[i + 1]` is
+the slice of `X` that belongs to node i (or, for paths, to sequence index i). Node 0
+is the root. A partial order graph keeps its nodes in topological order with their
+fragments, successors and sequence sets, and the path of every sequence with the
+offset at which each node on it starts. A de Bruijn graph keeps its kmers and, per
+edge, the target (-1 for none), the sequence index and the cycle and fragment text.
+
+The publishing process owns the segment and unlinks it on `close` (or leaving the
+with block). Owners that are never closed are unlinked when they are garbage collected
+or at interpreter exit, so segments do not outlive the run. Attached views only unmap
+the segment. Arrays taken from a view keep its mapping alive until they are dropped,
+but an unlinked segment can no longer be attached.
+"""
+import json
+import secrets
+import struct
+import sys
+import weakref
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+_HEADER = struct.Struct("<Q")
+_ALIGN = 64
+
+# views attached by this process, keyed on segment name, see `attach`
+_attached: Dict[str, "SharedGraph"] = {}
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _csr(rows: List[List[int]], dtype=np.int32) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the offsets and values of a list of rows."""
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(row) for row in rows])
+    values = np.fromiter((value for row in rows for value in row), dtype=dtype, count=int(offsets[-1]))
+    return offsets, values
+
+
+def _text(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the offsets and concatenated ascii bytes of a list of texts."""
+    encoded = [text.encode("ascii") for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(text) for text in encoded])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _flatten_pog(pog: "PartialOrderGraph") -> Tuple[dict, Dict[str, np.ndarray]]:
+    order = pog.topological_order()
+    ids = {node: number for number, node in enumerate(order)}
+    arrays = {}
+    arrays["text_offsets"], arrays["text"] = _text([node.fragment or "" for node in order])
+    arrays["next_offsets"], arrays["next"] = _csr([[ids[successor] for successor in node.next] for node in order])
+    arrays["set_offsets"], arrays["sets"] = _csr([sorted(node.sequence_set or ()) for node in order])
+    coordinates = pog.coordinates()
+    paths = [[] for _ in range(max((index for index, _ in pog.sequence_names.values()), default=0) + 1)]
+    for index in range(len(paths)):
+        if index in coordinates:
+            paths[index] = [ids[node] for node in coordinates.path(index)]
+    arrays["path_offsets"], arrays["paths"] = _csr(paths)
+    # offset of each path node in its sequence: the running total of the lengths less that at the start of the path
+    totals = np.concatenate([[0], np.cumsum(np.diff(arrays["text_offsets"])[arrays["paths"]])])
+    arrays["path_starts"] = totals[:-1] - np.repeat(totals[arrays["path_offsets"][:-1]], np.diff(arrays["path_offsets"]))
+    return {"kind": "pog", "root_fragment": pog.root.fragment if pog.root is not None else None}, arrays
+
+
+def _flatten_dbg(dbg: "DeBruijnGraph") -> Tuple[dict, Dict[str, np.ndarray]]:
+    from .dbg_node import DBGNode
+    nodes = [dbg.root, *dbg.graph.values()]
+    ids = {node.kmer: number for number, node in enumerate(nodes)}
+    k = dbg.kmer_length
+    kmers = np.zeros((len(nodes), k), dtype=np.uint8)
+    if len(nodes) > 1:
+        kmers[1:] = np.frombuffer("".join(node.kmer for node in nodes[1:]).encode("ascii"), dtype=np.uint8).reshape(-1, k)
+    targets, sequences, cycles, fragments = [], [], [], []
+    for node in nodes:
+        edges = list(node.edges)
+        targets.append([ids[edge.target_node.kmer] if edge.target_node is not None else -1 for edge in edges])
+        sequences.append([edge.sequence for edge in edges])
+        cycles += [edge.cycle for edge in edges]
+        fragments += [edge.fragment for edge in edges]
+    arrays = {"kmers": kmers}
+    arrays["edge_offsets"], arrays["edge_targets"] = _csr(targets)
+    arrays["edge_sequences"] = _csr(sequences)[1]
+    arrays["cycle_offsets"], arrays["cycles"] = _text(cycles)
+    arrays["fragment_offsets"], arrays["fragments"] = _text(fragments)
+    # sparse graph nodes add their whole kmer to a sequence, dense ones their last character
+    whole = len(nodes) > 1 and type(nodes[1]).entry_text is not DBGNode.entry_text
+    moltype = dbg._moltype if isinstance(dbg._moltype, str) else dbg._moltype.label
+    return {"kind": "dbg", "kmer_length": k, "whole_kmers": whole, "moltype": moltype}, arrays
+
+
+def flatten(graph: Union["DeBruijnGraph", "PartialOrderGraph"]) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Returns the description and arrays of a graph laid out as in a shared segment, see the module docstring."""
+    from .partialordergraph import PartialOrderGraph
+    if isinstance(graph, PartialOrderGraph):
+        if graph.root is None:
+            raise ValueError("Cannot flatten an empty partial order graph")
+        return _flatten_pog(graph)
+    if hasattr(graph, "kmer_length"):
+        return _flatten_dbg(graph)
+    raise ValueError(f"Cannot flatten a {type(graph).__name__}, expected a de Bruijn or partial order graph")
+
+
+class SharedGraph:
+    """A flattened graph in a shared memory segment, made by `publish` and opened by `attach`.
+
+    Arrays are read-only numpy views of the segment, see the module docstring for
+    their layout. `owner` is True in the process that published the segment.
+    """
+    def __init__(self, memory: SharedMemory, owner: bool):
+        self.memory = memory
+        self.owner = owner
+        self.name = memory.name
+        size, = _HEADER.unpack_from(memory.buf, 0)
+        header = json.loads(bytes(memory.buf[_HEADER.size:_HEADER.size + size]))
+        self.meta = header["meta"]
+        self.kind = self.meta["kind"]
+        self.sequence_names = {name: tuple(value) for name, value in header["sequence_names"].items()}
+        start = _aligned(_HEADER.size + size)
+        self.arrays: Dict[str, np.ndarray] = {}
+        for key, (offset, dtype, shape) in header["arrays"].items():
+            array = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=memory.buf, offset=start + offset)
+            array.flags.writeable = False
+            self.arrays[key] = array
+        self._finalizer = weakref.finalize(self, _release, memory, owner)
+
+    @classmethod
+    def publish(cls, graph: Union["DeBruijnGraph", "PartialOrderGraph"], name: str = None) -> "SharedGraph":
+        """Copies a finished graph into a new shared memory segment and returns the owning view.
+
+        The segment is a snapshot, later changes to the graph are not seen through it.
+        """
+        meta, arrays = flatten(graph)
+        names = {name: list(value) for name, value in graph.sequence_names.items()}
+        layout, size = {}, 0 # array offsets from the end of the header
+        for key, array in arrays.items():
+            layout[key] = [size, array.dtype.str, list(array.shape)]
+            size = _aligned(size + array.nbytes)
+        header = json.dumps({"meta": meta, "sequence_names": names, "arrays": layout}).encode()
+        start = _aligned(_HEADER.size + len(header))
+        memory = SharedMemory(name=name or f"dbg_align_{secrets.token_hex(8)}", create=True, size=max(1, start + size))
+        try:
+            _HEADER.pack_into(memory.buf, 0, len(header))
+            memory.buf[_HEADER.size:_HEADER.size + len(header)] = header
+            for key, array in arrays.items():
+                position = start + layout[key][0]
+                memory.buf[position:position + array.nbytes] = np.ascontiguousarray(array).tobytes()
+        except BaseException:
+            memory.close()
+            memory.unlink()
+            raise
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedGraph":
+        """Opens a segment published by another process, read-only and without copying."""
+        if sys.version_info >= (3, 13):
+            return cls(SharedMemory(name=name, track=False), owner=False)
+        # before 3.13 attaching registers the segment with the resource tracker, which
+        # would unlink it when this process exits and take it from the owner
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return cls(SharedMemory(name=name), owner=False)
+        finally:
+            resource_tracker.register = register
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def close(self):
+        """Unmaps the segment, and unlinks it when this is the owning view."""
+        if self.closed:
+            return
+        self.arrays = {}
+        self._finalizer()
+        if _attached.get(self.name) is self:
+            del _attached[self.name]
+
+    def __enter__(self) -> "SharedGraph":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def nbytes(self) -> int:
+        return self.memory.size
+
+    def __len__(self):
+        return len(self.sequence_names)
+
+    def names(self) -> List[str]:
+        return list(self.sequence_names)
+
+    def index_for_name(self, name: str) -> int:
+        if name not in self.sequence_names:
+            raise KeyError(f"Sequence name '{name}' not found")
+        return self.sequence_names[name][0]
+
+    def _index(self, sequence: Union[int, str]) -> int:
+        return self.index_for_name(sequence) if isinstance(sequence, str) else sequence
+
+    @property
+    def node_count(self) -> int:
+        """Number of nodes, the root included."""
+        return len(self.arrays["text_offsets"]) - 1 if self.kind == "pog" else len(self.arrays["kmers"])
+
+    def text(self, node: int) -> str:
+        """Returns a node's fragment, or its kmer in a de Bruijn graph."""
+        if self.kind == "dbg":
+            return self.arrays["kmers"][node].tobytes().decode("ascii") if node else ""
+        offsets = self.arrays["text_offsets"]
+        return self.arrays["text"][offsets[node]:offsets[node + 1]].tobytes().decode("ascii")
+
+    def successors(self, node: int) -> np.ndarray:
+        """Returns the ids of a node's successors, -1 stands for the end of a sequence in a de Bruijn graph."""
+        offsets, targets = (self.arrays["next_offsets"], self.arrays["next"]) if self.kind == "pog" else (self.arrays["edge_offsets"], self.arrays["edge_targets"])
+        return targets[offsets[node]:offsets[node + 1]]
+
+    def sequence_set(self, node: int) -> np.ndarray:
+        """Returns the sorted indices of the sequences through a node of a partial order graph."""
+        self._require("pog")
+        offsets = self.arrays["set_offsets"]
+        return self.arrays["sets"][offsets[node]:offsets[node + 1]]
+
+    def path(self, sequence: Union[int, str]) -> np.ndarray:
+        """Returns the ids of the nodes with text that a sequence of a partial order graph passes through."""
+        self._require("pog")
+        index = self._index(sequence)
+        offsets = self.arrays["path_offsets"]
+        if not 0 <= index < len(offsets) - 1:
+            raise IndexError("Sequence index out of range")
+        return self.arrays["paths"][offsets[index]:offsets[index + 1]]
+
+    def sequence(self, sequence: Union[int, str]) -> str:
+        """Returns the text of a sequence given by index or name."""
+        index = self._index(sequence)
+        if self.kind == "dbg":
+            return self._dbg_sequence(index)
+        return self._gather(self.path(index))
+
+    def slice(self, sequence: Union[int, str], start: int = 0, end: int = None) -> str:
+        """Returns positions start:end of a sequence of a partial order graph, reading only the nodes that cover them."""
+        index = self._index(sequence)
+        path = self.path(index)
+        offsets = self.arrays["path_offsets"]
+        starts = self.arrays["path_starts"][offsets[index]:offsets[index + 1]]
+        lengths = np.diff(self.arrays["text_offsets"])
+        length = int(starts[-1] + lengths[path[-1]]) if len(path) else 0
+        start, end, _ = slice(start, end).indices(length)
+        if start >= end:
+            return ""
+        first, last = np.searchsorted(starts, [start, end], side="right") - 1
+        text = self._gather(path[first:last + 1])
+        return text[start - int(starts[first]):end - int(starts[first])]
+
+    def _gather(self, nodes: np.ndarray) -> str:
+        offsets, text = self.arrays["text_offsets"], self.arrays["text"]
+        return b"".join(text[offsets[node]:offsets[node + 1]].tobytes() for node in nodes.tolist()).decode("ascii")
+
+    def _dbg_sequence(self, index: int) -> str:
+        arrays = self.arrays
+        offsets, targets, sequences = arrays["edge_offsets"], arrays["edge_targets"], arrays["edge_sequences"]
+        kmers, whole = arrays["kmers"], self.meta["whole_kmers"]
+        parts, node, first = [], 0, True
+        for _ in range(len(sequences) + 1): # a sequence takes each of its edges once
+            begin = offsets[node]
+            found = np.flatnonzero(sequences[begin:offsets[node + 1]] == index)
+            if not len(found):
+                break
+            edge = int(begin + found[0])
+            parts.append(arrays["cycles"][arrays["cycle_offsets"][edge]:arrays["cycle_offsets"][edge + 1]].tobytes())
+            parts.append(arrays["fragments"][arrays["fragment_offsets"][edge]:arrays["fragment_offsets"][edge + 1]].tobytes())
+            node = int(targets[edge])
+            if node < 0:
+                break
+            parts.append(kmers[node].tobytes() if first or whole else kmers[node, -1:].tobytes())
+            first = False
+        else:
+            raise ValueError(f"Sequence {index} loops back on itself")
+        return b"".join(parts).decode("ascii")
+
+    def _require(self, kind: str):
+        if self.kind != kind:
+            raise ValueError(f"Only a shared {'partial order' if kind == 'pog' else 'de Bruijn'} graph has this")
+
+    def to_graph(self) -> Union["DeBruijnGraph", "PartialOrderGraph"]:
+        """Rebuilds the node objects of the graph in this process, for code that needs them."""
+        return self._to_pog() if self.kind == "pog" else self._to_dbg()
+
+    def _to_pog(self) -> "PartialOrderGraph":
+        from .partialordergraph import PartialOrderGraph
+        from .pog_node import POG_Node
+        arrays = self.arrays
+        count = len(arrays["text_offsets"]) - 1
+        nodes = [POG_Node(self.text(node), set(self.sequence_set(node).tolist())) for node in range(count)]
+        nodes[0].fragment = self.meta["root_fragment"]
+        for node, instance in enumerate(nodes):
+            instance.next = [nodes[successor] for successor in self.successors(node).tolist()]
+        pog = PartialOrderGraph()
+        pog.sequence_names = dict(self.sequence_names)
+        pog.root = nodes[0]
+        return pog
+
+    def _to_dbg(self) -> "DeBruijnGraph":
+        from .dbg_edge import DBGEdge
+        from .debruijngraph import DeBruijnGraph
+        from .sparse_debruijngraph import SparseDBGNode
+        dbg = DeBruijnGraph(self.meta["kmer_length"], self.meta["moltype"])
+        node_type = SparseDBGNode if self.meta["whole_kmers"] else type(dbg.root)
+        arrays = self.arrays
+        nodes = [dbg.root] + [node_type(self.text(node)) for node in range(1, len(arrays["kmers"]))]
+        cycles, fragments = arrays["cycle_offsets"], arrays["fragment_offsets"]
+        for node, instance in enumerate(nodes):
+            for edge in range(arrays["edge_offsets"][node], arrays["edge_offsets"][node + 1]):
+                target = int(arrays["edge_targets"][edge])
+                cycle = arrays["cycles"][cycles[edge]:cycles[edge + 1]].tobytes().decode("ascii")
+                fragment = arrays["fragments"][fragments[edge]:fragments[edge + 1]].tobytes().decode("ascii")
+                instance.edges.append(DBGEdge(nodes[target] if target >= 0 else None, int(arrays["edge_sequences"][edge]), cycle, fragment))
+                dbg.edge_count += 1
+                dbg.cycle_edge_count += bool(cycle)
+        dbg.graph = {node.kmer: node for node in nodes[1:]}
+        dbg.sequence_names = dict(self.sequence_names)
+        return dbg
+
+    def __repr__(self):
+        role = "owner" if self.owner else "attached"
+        state = "closed" if self.closed else f"{self.nbytes} bytes"
+        return f"SharedGraph({self.name!r}, {self.kind}, {len(self)} sequences, {role}, {state})"
+
+
+def _release(memory: SharedMemory, owner: bool):
+    try:
+        memory.close()
+    except BufferError: # arrays taken from the view are still alive, the mapping goes with them
+        pass
+    if owner:
+        try:
+            memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def attach(name: str) -> SharedGraph:
+    """Returns this process's view of a published segment, attaching on first use."""
+    view = _attached.get(name)
+    if view is None or view.closed:
+        view = _attached[name] = SharedGraph.attach(name)
+    return view
@@ -0,0 +1,169 @@
+from bisect import bisect_left
+from fractions import Fraction
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
+
+from .dbg_edge import DBGEdge
+from .dbg_node import DBGNode
+from .debruijngraph import DeBruijnGraph
+from .kmer_hash import encode, minimizer_positions, syncmer_positions
+
+if TYPE_CHECKING:
+    from cogent3.core.moltype import MolType
+
+
+class SparseDBGNode(DBGNode):
+    """A node of a sparse de Bruijn graph, neighbouring kmers do not overlap so a node adds its whole kmer.
+
+    `rank` orders the nodes of the graph, every edge goes from a lower to a higher rank.
+    """
+    def __init__(self, kmer: str, rank: Fraction = Fraction(0)) -> None:
+        super().__init__(kmer)
+        self.rank = rank
+
+    def entry_text(self) -> str:
+        return self.kmer
+
+    def get_sequence(self, sequence_index: int) -> Optional[str]:
+        sequence = self.kmer or ""
+        node = self
+        visited = set()
+        while node is not None:
+            if node in visited:
+                raise ValueError(f"Sequence {sequence_index} loops back on itself")
+            visited.add(node)
+            edge = node.get_edge(sequence_index)
+            if edge is None:
+                break
+            sequence += edge.text
+            node = edge.target_node
+            if node is not None:
+                sequence += node.entry_text()
+        return sequence
+
+
+class SparseDeBruijnGraph(DeBruijnGraph):
+    """A de Bruijn graph that only keeps anchor kmers chosen by minimizers or syncmers.
+
+    Anchors are picked from a sequence's minimizers (`mode="minimizer"`, one per
+    `window` consecutive kmers) or closed syncmers (`mode="syncmer"` with s-mers of
+    length `s`). They are content defined, so related sequences pick the same anchors
+    around shared sequence. Anchors of a sequence never overlap and never repeat, and
+    each edge carries the sequence skipped between its two anchors in `fragment`, so
+    sequences are reconstructed exactly. Nodes are ranked and a sequence only reuses
+    existing anchors whose ranks increase along it (the longest such chain), so the
+    graph has no cycles even when sequences are rearranged.
+
+    Node count drops from one per position to at most one per `kmer_length`
+    characters, at the price of anchors that can only be placed at minimizers.
+    """
+    MODES = ("minimizer", "syncmer")
+
+    def __init__(self, kmer_length: int, moltype: Union["MolType", str] = "dna", mode: str = "minimizer", window: int = None, s: int = None, memory_budget: int = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown sparse mode '{mode}'")
+        super().__init__(kmer_length, moltype, memory_budget)
+        self.mode = mode
+        self.window = window or kmer_length
+        self.s = s or max(1, kmer_length // 3)
+
+    def merge(self, other: "SparseDeBruijnGraph") -> "SparseDeBruijnGraph":
+        """Not supported, anchor ranks are only consistent within the graph that chose them."""
+        raise ValueError("Sparse graphs cannot be merged, build them from all the sequences instead")
+
+    def _new_node(self, kmer: str) -> SparseDBGNode:
+        return SparseDBGNode(kmer)
+
+    def anchor_positions(self, sequence: str) -> List[int]:
+        """Returns the start of each anchor kmer of a sequence, non overlapping, without repeated kmers and colinear with the graph."""
+        k = self.kmer_length
+        codes = encode(sequence)
+        if self.mode == "minimizer":
+            candidates = minimizer_positions(codes, k, self.window)
+        else:
+            candidates = syncmer_positions(codes, k, self.s)
+        anchors = []
+        used = set()
+        end = 0
+        for position in candidates.tolist():
+            if position < end:
+                continue
+            kmer = sequence[position:position + k]
+            if kmer in used: # a repeated anchor would loop the sequence back on itself
+                continue
+            used.add(kmer)
+            anchors.append(position)
+            end = position + k
+        # existing nodes are only reused along the longest chain of increasing rank
+        existing = [(position, self.graph[sequence[position:position + k]].rank) for position in anchors if sequence[position:position + k] in self.graph]
+        chain = set(self._longest_increasing_chain(existing))
+        return [position for position in anchors if position in chain or sequence[position:position + k] not in self.graph]
+
+    @staticmethod
+    def _longest_increasing_chain(items: List[tuple]) -> List[int]:
+        """Returns the positions of the longest subsequence of (position, rank) items with strictly increasing rank."""
+        tails, tail_items, parents = [], [], []
+        for item_index, (_, rank) in enumerate(items):
+            length = bisect_left(tails, rank)
+            if length == len(tails):
+                tails.append(rank)
+                tail_items.append(item_index)
+            else:
+                tails[length] = rank
+                tail_items[length] = item_index
+            parents.append(tail_items[length - 1] if length else None)
+        chain = []
+        item_index = tail_items[-1] if tail_items else None
+        while item_index is not None:
+            chain.append(items[item_index][0])
+            item_index = parents[item_index]
+        return chain[::-1]
+
+    def pog_node_bound(self) -> int:
+        # the text skipped by every edge can need a node of its own
+        return super().pog_node_bound() + self.edge_count
+
+    def _predict_growth(self, sequence: str) -> Tuple[int, int]:
+        # anchors never overlap, so there is at most one per kmer length of sequence
+        anchors = len(sequence) // self.kmer_length
+        return anchors, anchors + 1
+
+    def _add_kmers(self, sequence: str, sequence_index: int):
+        k = self.kmer_length
+        anchors = self.anchor_positions(sequence)
+        kmers = [sequence[position:position + k] for position in anchors]
+        ranks = self._new_ranks(kmers)
+        current_node = self.root
+        previous_end = 0
+        for position, kmer, rank in zip(anchors, kmers, ranks):
+            next_node = self.graph.get(kmer)
+            if next_node is None:
+                next_node = self._new_node(kmer)
+                next_node.rank = rank
+                self.graph[kmer] = next_node
+            current_node.add_edge(DBGEdge(target_node=next_node, sequence_index=sequence_index, fragment=sequence[previous_end:position]))
+            self.edge_count += 1
+            current_node = next_node
+            previous_end = position + k
+        if previous_end < len(sequence): # the tail after the last anchor ends the sequence
+            current_node.add_edge(DBGEdge(target_node=None, sequence_index=sequence_index, fragment=sequence[previous_end:]))
+            self.edge_count += 1
+
+    def _new_ranks(self, kmers: List[str]) -> List[Optional[Fraction]]:
+        """Returns evenly spaced ranks for the new kmers between the existing kmers around them."""
+        ranks: List[Optional[Fraction]] = [self.graph[kmer].rank if kmer in self.graph else None for kmer in kmers]
+        previous, start = self.root.rank, 0
+        for position in range(len(kmers) + 1):
+            if position < len(kmers) and ranks[position] is None:
+                continue
+            gap = position - start
+            if gap:
+                following = ranks[position] if position < len(kmers) else previous + gap + 1
+                step = (following - previous) / (gap + 1)
+                for offset in range(gap):
+                    ranks[start + offset] = previous + step * (offset + 1)
+            if position < len(kmers):
+                previous, start = ranks[position], position + 1
+        return ranks
+
+    def __repr__(self):
+        return f"sparse dbg k:{self.kmer_length}, mode:{self.mode}, mol:{self.moltype}, seq's:{len(self)})"
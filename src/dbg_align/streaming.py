@@ -0,0 +1,89 @@
+"""Writing alignment blocks as they are produced, see `AlignmentPlanner.blocks`.
+
+    blocks = planner.blocks(BandedAlignmentPlugin())
+    write_maf(blocks, "aligned.maf", pog)
+
+MAF holds one alignment block per paragraph, so each block is written out as soon
+as it arrives. A FASTA row spans the whole alignment, `write_fasta` therefore spools
+the blocks to a temporary file and copies each row out of it at the end, memory use
+stays at one block either way.
+"""
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, TextIO, Union
+
+from .export import _open
+
+
+def write_maf(blocks: Iterable["AlignmentBlock"], target: Union[str, Path, TextIO], pog: "PartialOrderGraph" = None) -> int:
+    """Writes blocks as MAF paragraphs, returns the number of blocks written.
+
+    Rows without residues are left out of their block. The source sizes of the
+    sequence lines come from the graph's sequence lengths when `pog` is given.
+    """
+    sizes: Dict[str, int] = {name: length for name, (_, length) in pog.sequence_names.items()} if pog is not None else {}
+    stream, owned = _open(target)
+    written = 0
+    try:
+        stream.write("##maf version=1\n\n")
+        for block in blocks:
+            if not block.width:
+                continue
+            lines = [
+                (name, start, size, row)
+                for name, start, size, row in zip(block.names, block.starts, block.sizes, block.rows())
+                if size
+            ]
+            if not lines:
+                continue
+            stream.write("a\n")
+            name_width = max(len(name) for name, *_ in lines)
+            for name, start, size, row in lines:
+                stream.write(f"s {name:<{name_width}} {start} {size} + {sizes.get(name, start + size)} {row}\n")
+            stream.write("\n")
+            written += 1
+    finally:
+        if owned:
+            stream.close()
+    return written
+
+
+def write_fasta(blocks: Iterable["AlignmentBlock"], target: Union[str, Path, TextIO], width: int = 60) -> int:
+    """Writes the rows of all blocks as a gapped FASTA alignment, returns the number of blocks written.
+
+    Each block is appended to a temporary spool file as it arrives (rows one after
+    the other) and the rows are assembled from the spool once the last block is in.
+    """
+    layout = [] # (spool offset, block width) of each block
+    names = None
+    with tempfile.TemporaryFile() as spool:
+        for block in blocks:
+            names = names if names is not None else block.names
+            if block.width:
+                layout.append((spool.tell(), block.width))
+                spool.write(block.profile.codes.tobytes())
+                alphabet = block.profile.alphabet
+        stream, owned = _open(target)
+        try:
+            table = bytes.maketrans(bytes(range(len(alphabet))), alphabet.encode("ascii")) if layout else None
+            for row, name in enumerate(names or []):
+                stream.write(f">{name}\n")
+                filled = 0 # characters on the current, unfinished line
+                for offset, block_width in layout:
+                    spool.seek(offset + row * block_width)
+                    text = spool.read(block_width).translate(table).decode("ascii")
+                    position = 0
+                    while position < len(text):
+                        take = len(text) - position if not width else min(width - filled, len(text) - position)
+                        stream.write(text[position:position + take])
+                        position += take
+                        filled += take
+                        if width and filled == width:
+                            stream.write("\n")
+                            filled = 0
+                if filled or not width or not layout:
+                    stream.write("\n")
+        finally:
+            if owned:
+                stream.close()
+    return len(layout)
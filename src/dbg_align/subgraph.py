@@ -0,0 +1,122 @@
+"""Cutting a region out of a partial order graph and splicing a graph back in its place.
+
+A region is the part of the graph between two boundary nodes, both excluded, that
+every sequence passing through the first also passes through the second and that no
+other sequence enters. Bubbles and the stretch between two nodes shared by every
+sequence are regions. `extract` copies a region into a standalone PartialOrderGraph
+whose sequences are numbered from 1, it reads only the nodes of the region.
+
+    sub = pog.region("human", 10_000, 12_000)
+    realigned = DeBruijnGraph(7).add_sequence({name: sub[name] for name in sub.names()}).to_pog()
+    pog.splice(realigned, sub.origin)
+"""
+from typing import Dict, List, Union
+
+from .pog_bubble import POG_Bubble
+from .pog_node import POG_Node
+
+
+class Region:
+    """Where a subgraph was cut from: the parent graph, the boundary nodes and the parent index of each sequence."""
+    def __init__(self, parent: "PartialOrderGraph", start: POG_Node, end: POG_Node, indices: Dict[str, int]):
+        self.parent = parent
+        self.start = start
+        self.end = end
+        self.indices = indices # sequence name -> index in the parent
+
+    def offset(self, name: str) -> int:
+        """Returns the position in the parent sequence at which the region starts."""
+        return self.parent.coordinates().offset(self.start, name) + len(self.start.fragment or "")
+
+    def __repr__(self):
+        return f"Region({self.start.fragment}->{self.end.fragment}, {len(self.indices)} sequences)"
+
+
+def _region_nodes(start: POG_Node, end: POG_Node) -> Dict[int, List[POG_Node]]:
+    """Returns the nodes each sequence of start passes through before reaching end, checking they form a region."""
+    if not start.sequence_set.issubset(end.sequence_set):
+        raise ValueError(f"Not a region, some sequences of {start!r} do not reach {end!r}")
+    paths = {}
+    for index in sorted(start.sequence_set):
+        path = []
+        node = start.get_next(index)
+        while node is not end:
+            if node is None:
+                raise ValueError(f"Not a region, sequence {index} does not reach {end!r}")
+            if not node.sequence_set.issubset(start.sequence_set):
+                raise ValueError(f"Not a region, other sequences enter it at {node!r}")
+            path.append(node)
+            node = node.get_next(index)
+        paths[index] = path
+    return paths
+
+
+def extract(pog: "PartialOrderGraph", start: Union[POG_Node, POG_Bubble], end: POG_Node = None) -> "PartialOrderGraph":
+    """Copies the region between two nodes, or inside a bubble, into a new graph.
+
+    The new graph's `origin` records where it was cut from, its sequence lengths are
+    those of the region.
+    """
+    from .partialordergraph import PartialOrderGraph
+    if isinstance(start, POG_Bubble):
+        start, end = start.start, start.end
+    if end is None:
+        raise ValueError("A region needs an end node")
+    paths = _region_nodes(start, end)
+    names = {index: name for name, (index, _) in pog.sequence_names.items() if index in paths}
+    if len(names) != len(paths):
+        raise ValueError("Every sequence of the region needs a name")
+    renumber = {index: number for number, index in enumerate(sorted(paths), 1)}
+
+    sub = PartialOrderGraph(memory_budget=pog.memory_budget)
+    sub.root = POG_Node(None, set(renumber.values()))
+    sub_end = POG_Node("", set(renumber.values()))
+    copies: Dict[POG_Node, POG_Node] = {start: sub.root, end: sub_end}
+    for path in paths.values():
+        for node in path:
+            if node not in copies:
+                copies[node] = POG_Node(node.fragment, {renumber[index] for index in node.sequence_set})
+    for node, copy in copies.items():
+        if copy is not sub_end:
+            copy.next = [copies[successor] for successor in node.next if successor in copies]
+    sub.sequence_names = {
+        names[index]: (renumber[index], sum(len(node.fragment or "") for node in path))
+        for index, path in sorted(paths.items())
+    }
+    sub.origin = Region(pog, start, end, {names[index]: index for index in paths})
+    return sub
+
+
+def splice(pog: "PartialOrderGraph", sub: "PartialOrderGraph", region: Region = None):
+    """Replaces a region of the graph by the nodes of another graph over the same sequences.
+
+    The other graph is matched to the region's sequences by name, it can be the graph
+    `extract` returned, changed or rebuilt. Its nodes are copied in, the region's old
+    nodes are dropped and the sequence lengths updated.
+    """
+    region = region or sub.origin
+    if region is None or region.parent is not pog:
+        raise ValueError("The region was not cut from this graph")
+    if set(sub.sequence_names) != set(region.indices):
+        raise ValueError("The graph spliced in must hold exactly the sequences of the region")
+    old = _region_nodes(region.start, region.end)
+    renumber = {sub.index_for_name(name): index for name, index in region.indices.items()}
+
+    copies: Dict[POG_Node, POG_Node] = {}
+    for node in sub.topological_order():
+        if node is sub.root and node.fragment is None or not node.fragment and not node.next:
+            continue # the empty root and end nodes stand for the region's boundaries
+        copies[node] = POG_Node(node.fragment, {renumber[index] for index in node.sequence_set})
+    def target(node: POG_Node) -> POG_Node:
+        return copies.get(node, region.end)
+    for node, copy in copies.items():
+        copy.next = list(dict.fromkeys(target(successor) for successor in node.next)) or [region.end]
+    entry = [sub.root] if sub.root in copies else sub.root.next
+    region.start.next = list(dict.fromkeys(target(node) for node in entry))
+
+    lengths = {index: sum(len(node.fragment or "") for node in path) for index, path in old.items()}
+    pog.sequence_names = {
+        name: (index, length - lengths[index] + sub.len_for_name(name)) if index in lengths else (index, length)
+        for name, (index, length) in pog.sequence_names.items()
+    }
+    pog.invalidate_coordinates()
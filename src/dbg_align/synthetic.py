@@ -0,0 +1,174 @@
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+# a residue of a synthetic sequence: the alignment column it belongs to and its character
+Residue = Tuple[tuple, str]
+
+ALPHABET = "ACGT"
+
+
+class SyntheticWorkload:
+    """A seeded collection of related sequences with its true alignment and expected graph properties.
+
+    Properties are derived from the generated sequences, so they hold exactly:
+    - `expected_nodes`: distinct kmers, the node count of a dense DeBruijnGraph.
+    - `cycles`: maximal runs of revisited kmers per sequence, each one is a cycle edge.
+    - `expected_bubbles`: top level bubbles of the partial order graph, one for every
+      pair of consecutive kmers shared by all sequences that some sequence does not
+      step straight between. None when the sequences contain repeated kmers.
+    """
+    def __init__(self, sequences: Dict[str, str], columns: Dict[str, List[Residue]], kmer_length: int, seed: int):
+        self.sequences = sequences
+        self.columns = columns
+        self.kmer_length = kmer_length
+        self.seed = seed
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.sequences)
+
+    def as_list(self) -> List[str]:
+        return list(self.sequences.values())
+
+    def as_collection(self, moltype: "MolType" = None) -> "SequenceCollection":
+        """Returns the sequences as a cogent3 SequenceCollection."""
+        import cogent3
+        return cogent3.make_unaligned_seqs(self.sequences, moltype=moltype or cogent3.DNA)
+
+    def alignment(self) -> Dict[str, str]:
+        """Returns the true alignment of the sequences as gapped strings."""
+        order = sorted({column for residues in self.columns.values() for column, _ in residues})
+        rows = {}
+        for name, residues in self.columns.items():
+            chars = dict(residues)
+            rows[name] = "".join(chars.get(column, "-") for column in order)
+        return rows
+
+    def kmers(self, name: str) -> List[str]:
+        sequence, k = self.sequences[name], self.kmer_length
+        return [sequence[i:i + k] for i in range(len(sequence) - k + 1)]
+
+    @property
+    def expected_nodes(self) -> int:
+        return len({kmer for name in self.sequences for kmer in self.kmers(name)})
+
+    @property
+    def cycles(self) -> Dict[str, int]:
+        counts = {}
+        for name in self.sequences:
+            seen, runs, in_run = set(), 0, False
+            for kmer in self.kmers(name):
+                revisit = kmer in seen
+                runs += revisit and not in_run
+                in_run = revisit
+                seen.add(kmer)
+            counts[name] = runs
+        return counts
+
+    @property
+    def cycle_count(self) -> int:
+        return sum(self.cycles.values())
+
+    @property
+    def expected_bubbles(self) -> Optional[int]:
+        if self.cycle_count:
+            return None
+        positions = [{kmer: i for i, kmer in enumerate(self.kmers(name))} for name in self.sequences]
+        # anchors are kmers in every sequence, every sequence passes through their nodes
+        anchors = [kmer for kmer in self.kmers(self.names[0]) if all(kmer in p for p in positions)]
+        # a bubble opens wherever some sequence does not step straight from one anchor to the next
+        starts = {self.kmers(name)[0] for name in self.sequences}
+        bubbles = int(not anchors or len(starts) > 1 or anchors[0] not in starts)
+        for a, b in zip(anchors, anchors[1:]):
+            if any(p[b] != p[a] + 1 for p in positions):
+                bubbles += 1
+        if anchors and any(p[anchors[-1]] != len(p) - 1 for p in positions):
+            bubbles += 1
+        return bubbles
+
+    def __len__(self):
+        return len(self.sequences)
+
+    def __repr__(self):
+        return f"SyntheticWorkload(sequences={len(self)}, k={self.kmer_length}, seed={self.seed})"
+
+
+def generate(n_sequences: int, length: int, kmer_length: int = 11, snp_rate: float = 0.01, indel_rate: float = 0.0,
+             tree: bool = False, tandem_repeats: int = 0, repeat_unit: int = 3, repeat_copies: int = 6,
+             avoid_repeats: bool = None, seed: int = 0) -> SyntheticWorkload:
+    """Generates related sequences from a random ancestor.
+
+    Each sequence differs from the ancestor by substitutions at `snp_rate` and indels
+    of 1 to 3 bases at `indel_rate` per site. With `tree` set the divergence is spread
+    over the edges of a random binary tree, so sequences in the same clade share
+    variants and the graph has nested bubbles, otherwise every sequence descends
+    directly from the ancestor. `tandem_repeats` copies of a `repeat_unit` long unit,
+    each repeated `repeat_copies` times, are planted in the ancestor to exercise cycle
+    edges. Unless repeats are planted, `avoid_repeats` redraws any sequence that
+    repeats a kmer by chance.
+    """
+    rng = random.Random(seed)
+    if avoid_repeats is None:
+        avoid_repeats = tandem_repeats == 0
+    k = kmer_length
+
+    def has_repeat(residues):
+        text = "".join(char for _, char in residues)
+        kmers = [text[i:i + k] for i in range(len(text) - k + 1)]
+        return len(kmers) != len(set(kmers))
+
+    def draw(attempt):
+        for _ in range(1000):
+            residues = attempt()
+            if not (avoid_repeats and has_repeat(residues)):
+                return residues
+        raise ValueError("Could not generate sequences without repeated kmers, use a longer kmer or avoid_repeats=False")
+
+    counter = iter(range(1, 1 << 62))
+    def ancestor():
+        text = [rng.choice(ALPHABET) for _ in range(length)]
+        for _ in range(tandem_repeats):
+            unit = "".join(rng.choice(ALPHABET) for _ in range(repeat_unit))
+            position = rng.randrange(len(text) + 1)
+            text[position:position] = list(unit * repeat_copies)
+        return [((position,), char) for position, char in enumerate(text)]
+
+    def mutate(residues, rate_snp, rate_indel):
+        result = []
+        skip = 0
+        for column, char in residues:
+            if skip:
+                skip -= 1
+                continue
+            roll = rng.random()
+            if roll < rate_snp:
+                result.append((column, rng.choice(ALPHABET.replace(char, ""))))
+            elif roll < rate_snp + rate_indel / 2: # deletion
+                skip = rng.randint(1, 3) - 1
+            elif roll < rate_snp + rate_indel: # insertion after this residue
+                result.append((column, char))
+                inserted = column + (next(counter),)
+                result.extend((inserted + (offset,), rng.choice(ALPHABET)) for offset in range(rng.randint(1, 3)))
+            else:
+                result.append((column, char))
+        return result
+
+    root = draw(ancestor)
+    leaves: List[List[Residue]] = []
+    if tree and n_sequences > 1:
+        levels = math.ceil(math.log2(n_sequences))
+        def evolve(residues, n):
+            if n == 1:
+                leaves.append(residues)
+                return
+            left = rng.randint(1, n - 1)
+            for size in (left, n - left):
+                evolve(draw(lambda: mutate(residues, snp_rate / levels, indel_rate / levels)), size)
+        evolve(root, n_sequences)
+    else:
+        leaves = [draw(lambda: mutate(root, snp_rate, indel_rate)) for _ in range(n_sequences)]
+
+    names = [f"seq{index + 1}" for index in range(n_sequences)]
+    sequences = {name: "".join(char for _, char in residues) for name, residues in zip(names, leaves)}
+    return SyntheticWorkload(sequences, dict(zip(names, leaves)), kmer_length, seed)
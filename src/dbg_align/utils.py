@@ -3,7 +3,6 @@ def display_mermaid_in_jupyter(mermaid_content: str):
 
 # method to display mermaid in ipynb https://gist.github.com/MLKrisJohnson/2d2df47879ee6afd3be9d6788241fe99
 import base64
-from IPython.display import Image, display
 
 def mm_ink(graphbytes):
   """Given a bytes object holding a Mermaid-format graph, return a URL that will generate the image."""
@@ -13,6 +12,7 @@ def mm_ink(graphbytes):
 
 def mm_display(graphbytes):
   """Given a bytes object holding a Mermaid-format graph, display it."""
+  from IPython.display import Image, display
   display(Image(url=mm_ink(graphbytes)))
 
 def mm(graph):
@@ -20,10 +20,9 @@ def mm(graph):
   graphbytes = graph.encode("ascii")
   mm_display(graphbytes)
 
-import graphviz
-
 def display_graphviz(graph):
     """Render and display a Graphviz graph within a Jupyter Notebook."""
+    from IPython.display import Image, display
     # Render the graph to a file (SVG or PNG can be used here)
     # Note: You might need to adjust the directory path or ensure it exists
     filename = graph.render(filename='temp_graph', format='png', cleanup=True)
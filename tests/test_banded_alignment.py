@@ -0,0 +1,42 @@
+from dbg_align import BandedAlignmentPlugin, PartialOrderGraph, POG_Node
+from dbg_align.allignment_buffer import AlignmentBuffer
+
+
+def test_banded_alignment_matches_full_alignment():
+    banded = BandedAlignmentPlugin(band=0, padding=1)
+    full = BandedAlignmentPlugin(band=100, padding=0)
+    result = banded.align_sequences("ACGTTGCAGGTACCA", "ACGTGCAGGTTACCA")
+    expected = full.align_sequences("ACGTTGCAGGTACCA", "ACGTGCAGGTTACCA")
+    assert result.rows() == expected.rows()
+    assert [row.replace("-", "") for row in result.rows()] == ["ACGTTGCAGGTACCA", "ACGTGCAGGTTACCA"]
+    assert banded.cells_saved > 0
+    assert full.cells_saved == 0
+
+def test_banded_alignment_widens_band():
+    plugin = BandedAlignmentPlugin(band=0, padding=1)
+    result = plugin.align_sequences("AAAACCCCGGGGTTTT", "CCCCGGGGTTTTAAAA")
+    assert plugin.widenings > 0
+    assert [row.replace("-", "") for row in result.rows()] == ["AAAACCCCGGGGTTTT", "CCCCGGGGTTTTAAAA"]
+
+def test_banded_alignment_profiles():
+    plugin = BandedAlignmentPlugin()
+    buffer = AlignmentBuffer(plugin)
+    index1 = buffer.add_alignment("ACGTTGCA", "ACGTGCA")
+    index2 = buffer.add_alignment("ACGTTTGCA", index1)
+    index3 = buffer.add_alignment(index1, index2)
+    rows = buffer.results[index3].rows()
+    assert len(rows) == 5
+    assert len({len(row) for row in rows}) == 1
+    assert rows[2].replace("-", "") == "ACGTTTGCA"
+    joined = buffer.concatenate(["AA", index1, "TT"])
+    assert buffer.results[joined].rows() == ["AAACGTTGCATT", "AAACG-TGCATT"]
+
+def test_band_from_bubble():
+    pog = PartialOrderGraph()
+    pog.sequence_names = {'Sequence 1':(1,10),'Sequence 2':(2,12)}
+    end = POG_Node("GCAT", {1,2})
+    pog.root = POG_Node("AGT", {1, 2}) + [POG_Node("GCG", {1})+end, POG_Node("GTGAC",{2})+end]
+    bubble = pog.bubbles()[0]
+    assert bubble.branches() == {1: "GCG", 2: "GTGAC"}
+    plugin = BandedAlignmentPlugin()
+    assert plugin.band_from_bubble(bubble) == 2
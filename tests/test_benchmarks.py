@@ -0,0 +1,40 @@
+import importlib.util
+from pathlib import Path
+
+
+def load_bench():
+    path = Path(__file__).parent.parent / "benchmarks" / "bench.py"
+    spec = importlib.util.spec_from_file_location("bench", path)
+    bench = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bench)
+    return bench
+
+def test_benchmark_sequences_have_no_repeats():
+    bench = load_bench()
+    sequences = bench.make_sequences(4, 300, 0.05, 11, seed=3)
+    assert len(sequences) == 4
+    for sequence in sequences.values():
+        kmers = [sequence[i:i + 11] for i in range(len(sequence) - 10)]
+        assert len(kmers) == len(set(kmers))
+    assert bench.make_sequences(4, 300, 0.05, 11, seed=3) == sequences
+
+def test_benchmark_sequences_with_repeats():
+    bench = load_bench()
+    sequences = bench.make_sequences(4, 300, 0.05, 11, repeats=2, seed=3)
+    for sequence in sequences.values():
+        kmers = [sequence[i:i + 11] for i in range(len(sequence) - 10)]
+        assert len(kmers) > len(set(kmers))
+    dbg = bench._graph({"n_sequences": 4, "length": 300, "divergence": 0.05, "k": 11, "repeats": 2, "seed": 3})
+    assert dbg.cycle_edge_count and [dbg.to_pog()[name] for name in sequences] == list(sequences.values())
+
+def test_benchmark_run_and_compare():
+    bench = load_bench()
+    grid = {"n_sequences": [2], "length": [60], "divergence": [0.05], "k": [11]}
+    results = bench.run(grid, repeats=1)
+    assert set(results) == {bench.case_key(name, {key: values[0] for key, values in grid.items()}) for name in bench.CASES}
+    assert all(result["seconds"] > 0 for result in results.values())
+    assert bench.compare(results, results) == []
+    key = next(iter(results))
+    slower = {key: {"seconds": results[key]["seconds"] / 10, "memory": results[key]["memory"]}}
+    assert bench.compare(results, slower) == []
+    assert bench.compare(results, slower, noise={"seconds": 0, "memory": 0}) == [f"{key} seconds: {results[key]['seconds']:.4g} against {slower[key]['seconds']:.4g}"]
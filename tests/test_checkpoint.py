@@ -0,0 +1,63 @@
+import pytest
+import dbg_align
+from dbg_align import AlignmentBuffer, AlignmentMethod, AlignmentPlanner, BandedAlignmentPlugin
+from dbg_align.synthetic import generate
+
+
+def _planner():
+    workload = generate(4, 300, snp_rate=0.03, indel_rate=0.01, seed=5)
+    dbg = dbg_align.DeBruijnGraph(11)
+    dbg.add_sequence(workload.sequences)
+    return AlignmentPlanner(dbg.to_pog())
+
+
+def test_interrupted_run_resumes(tmp_path):
+    planner = _planner()
+    expected = planner.execute(BandedAlignmentPlugin(), AlignmentMethod.DEBRUIJNGRAPH).profile()
+
+    blocks = planner.blocks(BandedAlignmentPlugin(), AlignmentMethod.DEBRUIJNGRAPH, checkpoint=tmp_path)
+    for _ in range(5):
+        next(blocks)
+    blocks.close() # stands in for the worker being stopped
+    done = (tmp_path / "log.jsonl").read_text().count("\n") - 1
+    assert done > 0
+
+    plugin = BandedAlignmentPlugin()
+    resumed = planner.execute(plugin, AlignmentMethod.DEBRUIJNGRAPH, checkpoint=tmp_path)
+    assert resumed.profile() == expected
+    total = (tmp_path / "log.jsonl").read_text().count("\n") - 1
+    assert len(plugin.records) == total - done
+
+    plugin = BandedAlignmentPlugin()
+    assert planner.execute(plugin, AlignmentMethod.DEBRUIJNGRAPH, checkpoint=tmp_path).profile() == expected
+    assert plugin.records == []
+
+
+def test_torn_writes_are_dropped(tmp_path):
+    plugin = BandedAlignmentPlugin()
+    with AlignmentBuffer(plugin, tmp_path) as buffer:
+        first = buffer.add_alignment("ACGTAC", "ACTAC")
+        buffer.add_alignment("GGTACA", first)
+    with open(tmp_path / "frames.pkl", "r+b") as frames: # the last result was only half written
+        frames.truncate(frames.seek(0, 2) - 3)
+    with open(tmp_path / "log.jsonl", "ab") as log:
+        log.write(b'{"position": 2, "dig')
+
+    plugin = BandedAlignmentPlugin()
+    with AlignmentBuffer(plugin, tmp_path) as buffer:
+        assert len(buffer.checkpoint) == 1
+        first = buffer.add_alignment("ACGTAC", "ACTAC")
+        buffer.add_alignment("GGTACA", first)
+        assert buffer.resumed == 1 and len(plugin.records) == 1
+    with AlignmentBuffer(BandedAlignmentPlugin(), tmp_path) as buffer:
+        assert len(buffer.checkpoint) == 2
+
+
+def test_checkpoint_must_match_the_run(tmp_path):
+    with AlignmentBuffer(BandedAlignmentPlugin(), tmp_path) as buffer:
+        buffer.add_alignment("ACGTAC", "ACTAC")
+    with pytest.raises(ValueError, match="plugin"):
+        AlignmentBuffer(BandedAlignmentPlugin(gap=-3.0), tmp_path)
+    with AlignmentBuffer(BandedAlignmentPlugin(), tmp_path) as buffer:
+        with pytest.raises(ValueError, match="differs"):
+            buffer.add_alignment("ACGTAC", "ACTTC")
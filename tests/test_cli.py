@@ -0,0 +1,77 @@
+import json
+import pytest
+from dbg_align.cli import main, output_names, read_fasta, write_fasta
+from dbg_align.synthetic import generate
+
+
+def _inputs(tmp_path, count: int):
+    paths = []
+    for seed in range(count):
+        workload = generate(3, 200, snp_rate=0.02, indel_rate=0.005, seed=seed)
+        path = tmp_path / f"input{seed}.fasta"
+        with open(path, "w") as stream:
+            write_fasta(workload.sequences.items(), stream)
+        paths.append(path)
+    return paths
+
+def test_fasta_round_trip(tmp_path):
+    workload = generate(3, 150, seed=1)
+    path = tmp_path / "seqs.fasta"
+    with open(path, "w") as stream:
+        write_fasta(workload.sequences.items(), stream, width=50)
+    assert read_fasta(path) == workload.sequences
+
+def test_align_writes_alignment_and_summary(tmp_path):
+    path, = _inputs(tmp_path, 1)
+    summary = tmp_path / "summary.json"
+    status = main([str(path), "-k", "11", "--method", "debruijn", "-o", str(tmp_path / "out"), "--summary", str(summary), "--instrument", "-q"])
+    assert status == 0
+    record, = json.loads(summary.read_text())["files"]
+    assert record["status"] == "ok" and record["method"] == "DEBRUIJNGRAPH"
+    assert {"read", "graph", "pog", "align", "write", "total"} <= set(record["seconds"])
+    assert "dbg.add_sequence" in record["instrumentation"]["timers"]
+    aligned = read_fasta(record["output"])
+    assert list(aligned) == list(read_fasta(path))
+    assert len({len(row) for row in aligned.values()}) == 1
+    assert {name: row.replace("-", "") for name, row in aligned.items()} == read_fasta(path)
+
+def test_batch_in_a_pool_resumes_and_reports_failures(tmp_path):
+    paths = _inputs(tmp_path, 2)
+    bad = tmp_path / "bad.fasta"
+    bad.write_text(">only\nACGTACGTACGTACGT\n")
+    progress, summary = tmp_path / "progress.jsonl", tmp_path / "summary.json"
+    arguments = [*map(str, paths), str(bad), "--plugin", "cost", "--jobs", "2", "--progress", str(progress), "--summary", str(summary), "-q"]
+    assert main(arguments) == 1
+    totals = json.loads(summary.read_text())["totals"]
+    assert (totals["ok"], totals["failed"], totals["skipped"]) == (2, 1, 0)
+    # a second run only retries the failed file
+    assert main(arguments) == 1
+    files = json.loads(summary.read_text())["files"]
+    assert [record.get("skipped", False) for record in files] == [True, True, False]
+    assert len(progress.read_text().splitlines()) == 4
+
+def test_align_writes_maf(tmp_path):
+    path, = _inputs(tmp_path, 1)
+    summary = tmp_path / "summary.json"
+    assert main([str(path), "--format", "maf", "-o", str(tmp_path / "out"), "--summary", str(summary), "-q"]) == 0
+    record, = json.loads(summary.read_text())["files"]
+    assert record["output"].endswith(".aligned.maf") and record["columns"] > 0
+    text = open(record["output"]).read()
+    assert text.startswith("##maf version=1") and "\ns " in text
+
+def test_inputs_with_one_stem_write_apart(tmp_path):
+    first, second = _inputs(tmp_path, 2)
+    (tmp_path / "a").mkdir(), (tmp_path / "b").mkdir()
+    first = first.rename(tmp_path / "a" / "x.fa")
+    second = second.rename(tmp_path / "b" / "x.fasta")
+    names = output_names([str(first), str(second), str(tmp_path / "other.fa")])
+    assert len(set(names.values())) == 3 and names[str(tmp_path / "other.fa")] == "other"
+    summary = tmp_path / "summary.json"
+    arguments = [str(first), str(second), "-o", str(tmp_path / "out"), "--checkpoint-dir", str(tmp_path / "checkpoints"), "--summary", str(summary), "-q"]
+    assert main(arguments) == 0
+    files = json.loads(summary.read_text())["files"]
+    assert len({record["output"] for record in files}) == 2
+    for path, record in zip((first, second), files):
+        assert {name: row.replace("-", "") for name, row in read_fasta(record["output"]).items()} == read_fasta(path)
+    with pytest.raises(SystemExit):
+        main([str(first), str(tmp_path / "a" / ".." / "a" / "x.fa"), "-q"])
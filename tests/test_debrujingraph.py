@@ -1,5 +1,8 @@
 import cogent3
+import pytest
 import dbg_align
+from dbg_align.dbg_edge import RepeatText
+from dbg_align.synthetic import generate
 
 
 def test_create_kmers():
@@ -105,3 +108,109 @@ def test_cycle():
     assert not dbg.has_cycles()
     dbg.add_sequence("ACATCATGCA")
     assert dbg.has_cycles()
+
+def related_sequences(n, length, mutations, seed=1):
+    import random
+    rng = random.Random(seed)
+    base = "".join(rng.choice("ACGT") for _ in range(length))
+    sequences = []
+    for _ in range(n):
+        sequence = list(base)
+        for _ in range(mutations):
+            sequence[rng.randrange(length)] = rng.choice("ACGT")
+        sequences.append("".join(sequence))
+    return sequences
+
+def test_suggest_kmer_length():
+    sequences = related_sequences(6, 1000, 20)
+    k, statistics = dbg_align.DeBruijnGraph.suggest_kmer_length(sequences, statistics=True)
+    assert statistics[0].kmer_length == k
+    by_k = {s.kmer_length: s for s in statistics}
+    # short k-mers repeat, long ones lose anchors
+    assert by_k[3].repeat_fraction > by_k[k].repeat_fraction
+    assert by_k[40].shared_fraction < by_k[k].shared_fraction
+    assert 5 < k < 40
+    assert dbg_align.DeBruijnGraph.suggest_kmer_length({f"s{i}": s for i, s in enumerate(sequences)}) == k
+
+def test_suggest_kmer_length_limits():
+    assert dbg_align.DeBruijnGraph.suggest_kmer_length(["ACGTTGCA", "ACGTAGCA"], k_values=range(3, 20)) <= 8
+    with pytest.raises(ValueError):
+        dbg_align.DeBruijnGraph.suggest_kmer_length(["ACG"], k_values=[5, 6])
+
+def test_repeats_are_stored_compactly():
+    sequence = "GATTC" + "CAG" * 400 + "TTGCA" + "A" * 50 + "CGGT"
+    dbg = dbg_align.DeBruijnGraph(5)
+    dbg.add_sequence(sequence)
+    assert dbg.has_cycles() and dbg.cycle_edge_count == 2
+    assert dbg[1] == sequence
+    repeats = [edge.compact_cycle for node in dbg.graph.values() for edge in node.edges if edge.compact_cycle]
+    assert all(isinstance(repeat, RepeatText) for repeat in repeats)
+    assert sorted(len(repeat.unit) for repeat in repeats) == [1, 3]
+    assert dbg.to_pog()[1] == sequence
+
+def test_repeat_text():
+    assert RepeatText.period("ACGACGAC") == 3
+    assert RepeatText.period("ACGT") == 4
+    assert RepeatText.compact("ACGT") == "ACGT"
+    repeat = RepeatText.compact("TATATATAT")
+    assert isinstance(repeat, RepeatText) and repeat.unit == "TA"
+    assert str(repeat) == "TATATATAT" and len(repeat) == 9
+
+def test_tandem_repeats_reconstruct():
+    workload = generate(4, 300, kmer_length=7, snp_rate=0.02, tandem_repeats=3, repeat_unit=3, repeat_copies=8, seed=5)
+    dbg = dbg_align.DeBruijnGraph(7)
+    dbg.add_sequence(workload.sequences)
+    assert dbg.has_cycles()
+    assert [dbg[name] for name in workload.names] == workload.as_list()
+    pog = dbg.to_pog()
+    assert [pog[name] for name in workload.names] == workload.as_list()
+
+def test_cycle_text_round_trips_through_pog():
+    from dbg_align import AlignmentPlanner, BandedAlignmentPlugin
+    sequences = {"a": "AACCAAAA", "b": "CCCACAAC"}
+    dbg = dbg_align.DeBruijnGraph(3)
+    dbg.add_sequence(sequences)
+    assert dbg.has_cycles() and dbg.root.get_sequence(2) == "CCCACAAC"
+    pog = dbg.to_pog()
+    assert {name: pog[name] for name in sequences} == sequences
+    profile = AlignmentPlanner(pog).execute(BandedAlignmentPlugin()).profile()
+    assert {name: row.replace("-", "") for name, row in zip(profile.names, profile.rows())} == sequences
+    for seed in range(5):
+        workload = generate(5, 200, kmer_length=5, snp_rate=0.03, tandem_repeats=4, repeat_unit=2, repeat_copies=10, avoid_repeats=False, seed=seed)
+        dbg = dbg_align.DeBruijnGraph(5)
+        dbg.add_sequence(workload.sequences)
+        pog = dbg.to_pog()
+        assert [pog[name] for name in workload.names] == workload.as_list()
+
+def _edges(dbg):
+    return {node.kmer: [(edge.target_node.kmer if edge.target_node else None, edge.sequence, edge.cycle) for edge in node.edges]
+            for node in [dbg.root, *dbg.graph.values()]}
+
+def test_merge_matches_sequential_insertion():
+    workload = generate(6, 400, kmer_length=5, snp_rate=0.03, avoid_repeats=False, seed=3)
+    names = workload.names
+    sequential = dbg_align.DeBruijnGraph(5)
+    sequential.add_sequence(workload.sequences)
+    parts = []
+    for chunk in (names[:2], names[2:5], names[5:]):
+        part = dbg_align.DeBruijnGraph(5)
+        part.add_sequence({name: workload.sequences[name] for name in chunk})
+        parts.append(part)
+    merged = dbg_align.DeBruijnGraph.union(*parts)
+    assert merged.sequence_names == sequential.sequence_names
+    assert list(merged.graph) == list(sequential.graph)
+    assert _edges(merged) == _edges(sequential)
+    assert (merged.edge_count, merged.cycle_edge_count) == (sequential.edge_count, sequential.cycle_edge_count)
+    assert [merged[name] for name in names] == workload.as_list()
+    # merging leaves the other graph untouched
+    assert [parts[1][name] for name in names[2:5]] == workload.as_list()[2:5]
+
+def test_merge_rejects_incompatible_graphs():
+    first, second = dbg_align.DeBruijnGraph(5), dbg_align.DeBruijnGraph(7)
+    first.add_sequence("ACGTAGGACT", "a")
+    with pytest.raises(ValueError):
+        first.merge(second)
+    third = dbg_align.DeBruijnGraph(5)
+    third.add_sequence("ACGTTGGACT", "a")
+    with pytest.raises(ValueError):
+        first.merge(third)
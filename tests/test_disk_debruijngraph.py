@@ -0,0 +1,63 @@
+from dbg_align import DeBruijnGraph, DiskDeBruijnGraph
+from dbg_align.synthetic import generate
+
+
+def test_disk_graph_matches_dense_graph():
+    workload = generate(4, 2000, snp_rate=0.02, indel_rate=0.005, seed=1)
+    dense = DeBruijnGraph(11)
+    dense.add_sequence(workload.sequences)
+    with DiskDeBruijnGraph(11, cache_size=64) as disk:
+        disk.add_sequence(workload.sequences)
+        assert len(disk.graph) == len(dense.graph)
+        assert disk.edge_count == dense.edge_count
+        assert len(disk.graph.cache) <= 64
+        for name, sequence in workload.sequences.items():
+            assert disk[name] == sequence
+        pog = disk.to_pog()
+        assert [pog[name] for name in workload.names] == workload.as_list()
+        assert len(pog.bubbles()) == len(dense.to_pog().bubbles())
+        # only the cache is resident
+        assert disk.memory_usage().total * 10 < dense.memory_usage().total
+
+def test_disk_graph_reopens(tmp_path):
+    workload = generate(3, 500, snp_rate=0.02, seed=2)
+    disk = DiskDeBruijnGraph(11, path=tmp_path / "graph", cache_size=32)
+    disk.add_sequence(workload.sequences)
+    kmer = workload.kmers("seq2")[100]
+    disk.close()
+    reopened = DiskDeBruijnGraph.open(tmp_path / "graph", cache_size=16)
+    assert kmer in reopened.graph and reopened.graph[kmer].kmer == kmer
+    assert [reopened[name] for name in workload.names] == workload.as_list()
+    reopened.add_sequence(generate(1, 300, seed=9).as_list()[0], "extra")
+    assert reopened["extra"] == generate(1, 300, seed=9).as_list()[0]
+    reopened.close()
+
+def test_memory_budget_spills_the_cache():
+    workload = generate(3, 1500, snp_rate=0.02, seed=3)
+    probe = DiskDeBruijnGraph(11, cache_size=10_000)
+    probe.add_sequence(workload.as_list()[0])
+    budget = probe.estimate_memory() // 2
+    probe.close()
+    with DiskDeBruijnGraph(11, cache_size=10_000, memory_budget=budget) as disk:
+        disk.add_sequence(workload.sequences)
+        assert disk.cache_size < 10_000 and disk.graph.writes > 0
+        assert disk.estimate_memory() <= budget
+        assert [disk[name] for name in workload.names] == workload.as_list()
+
+def test_heap_is_compacted(tmp_path):
+    workload = generate(20, 2000, snp_rate=0.02, indel_rate=0.005, seed=1)
+    disk = DiskDeBruijnGraph(11, path=tmp_path / "graph", cache_size=64)
+    disk.add_sequence(workload.sequences)
+    store = disk.graph
+    store.flush()
+    heap = (tmp_path / "graph" / "edges.heap").stat().st_size
+    # every eviction rewrites a whole edge list, without compaction the heap grows quadratically
+    assert heap == store.heap_size <= max(store.COMPACT_SIZE, 2 * store.live_bytes)
+    assert store.live_bytes == int(store.records["length"].sum())
+    assert [disk[name] for name in workload.names] == workload.as_list()
+    disk.close()
+    reopened = DiskDeBruijnGraph.open(tmp_path / "graph", cache_size=64)
+    reopened.graph.compact()
+    assert reopened.graph.heap_size == reopened.graph.live_bytes
+    assert [reopened[name] for name in workload.names] == workload.as_list()
+    reopened.close()
@@ -0,0 +1,65 @@
+import io
+from dbg_align import DeBruijnGraph, POG_Bubble, SparseDeBruijnGraph
+from dbg_align.export import dbg_elements, pog_elements
+from dbg_align.synthetic import generate
+
+
+def _vertices(elements):
+    return [element for element in elements if element[0] == "node"]
+
+def _edges(elements):
+    return [element for element in elements if element[0] == "edge"]
+
+def test_unitigs_collapse_shared_sequence():
+    sequence = generate(1, 120, seed=1).as_list()[0]
+    dbg = DeBruijnGraph(11)
+    dbg.add_sequence([sequence, sequence])
+    elements = list(dbg_elements(dbg, max_label=0))
+    labels = [label for _, _, label, _ in _vertices(elements)]
+    assert labels == ["start", sequence]
+    assert len(list(_vertices(dbg_elements(dbg, unitigs=False)))) == len(dbg.graph) + 1
+
+def test_min_coverage_drops_private_variants():
+    workload = generate(4, 300, snp_rate=0.02, seed=5)
+    dbg = DeBruijnGraph(11)
+    dbg.add_sequence(workload.sequences)
+    everything = list(dbg_elements(dbg, unitigs=False))
+    shared = list(dbg_elements(dbg, unitigs=False, min_coverage=4))
+    assert len(_vertices(shared)) < len(_vertices(everything))
+    assert all(coverage >= 4 for _, _, _, _, coverage in _edges(shared))
+
+def test_region_around_a_kmer():
+    workload = generate(3, 300, snp_rate=0.0, seed=6)
+    dbg = DeBruijnGraph(11)
+    dbg.add_sequence(workload.sequences)
+    kmer = workload.kmers("seq1")[150]
+    elements = list(dbg_elements(dbg, seeds=[kmer], radius=2, unitigs=False))
+    labels = {label for _, _, label, _ in _vertices(elements)}
+    assert labels == set(workload.kmers("seq1")[148:153])
+    assert len(_edges(elements)) == 4
+    # collapsed, the region is a single unitig
+    assert len(_vertices(dbg_elements(dbg, seeds=[kmer], radius=2))) == 1
+
+def test_pog_collapsed_bubbles():
+    workload = generate(4, 400, snp_rate=0.02, seed=7)
+    dbg = DeBruijnGraph(11)
+    dbg.add_sequence(workload.sequences)
+    pog = dbg.to_pog()
+    bubbles = [edge for edge in _edges(pog_elements(pog, collapse_bubbles=True)) if edge[3].startswith("bubble")]
+    assert len(bubbles) == workload.expected_bubbles
+    bubble = next(segment for segment in pog.segments() if isinstance(segment, POG_Bubble))
+    region = list(pog_elements(pog, seeds=[bubble], radius=1, unitigs=False))
+    assert len(_vertices(region)) < len(list(_vertices(pog_elements(pog, unitigs=False))))
+
+def test_writers_stream_to_files_and_streams(tmp_path):
+    workload = generate(3, 200, snp_rate=0.02, seed=8)
+    for graph in (DeBruijnGraph(11), SparseDeBruijnGraph(11)):
+        graph.add_sequence(workload.sequences)
+        path = tmp_path / "graph.mmd"
+        written = graph.write_mermaid(path)
+        lines = path.read_text().splitlines()
+        assert lines[0] == "graph LR;" and len(lines) == written + 1
+        stream = io.StringIO()
+        graph.to_pog().write_graphviz(stream, min_coverage=2)
+        text = stream.getvalue()
+        assert text.startswith('digraph "G" {') and text.endswith("}\n")
@@ -0,0 +1,75 @@
+import random
+import numpy as np
+import pytest
+from dbg_align import DeBruijnGraph
+from dbg_align.count_min import CountMinSketch
+from dbg_align.filtered_debruijngraph import FilteredDeBruijnGraph
+from dbg_align.kmer_hash import encode, kmer_hashes
+from dbg_align.synthetic import generate
+
+
+def _reads(n: int = 20, length: int = 1500, error_rate: float = 0.01, seed: int = 1):
+    reference = generate(1, length, seed=seed).sequences["seq1"]
+    rng = random.Random(seed)
+    reads = {}
+    for i in range(n):
+        read = [rng.choice("ACGT".replace(base, "")) if rng.random() < error_rate else base for base in reference]
+        reads[f"read{i}"] = "".join(read)
+    return reads
+
+
+def test_count_min_never_undercounts():
+    sketch = CountMinSketch(width=256, depth=3)
+    hashes = kmer_hashes(encode(generate(1, 3000, seed=2).sequences["seq1"]), 11)
+    sketch.add(hashes)
+    sketch.add(hashes[:100])
+    values, truth = np.unique(np.concatenate([hashes, hashes[:100]]), return_counts=True)
+    assert np.all(sketch.counts(values) >= truth)
+    assert sketch.total == len(hashes) + 100
+
+    exact = CountMinSketch.for_error(1e-4, 1e-3)
+    exact.add(hashes)
+    assert np.array_equal(exact.counts(values), np.unique(hashes, return_counts=True)[1])
+    with pytest.raises(ValueError):
+        exact += sketch
+
+
+def test_filtered_graph_drops_rare_kmers():
+    reads = _reads()
+    filtered = FilteredDeBruijnGraph.from_sequences(reads, 15, min_count=3)
+    full = DeBruijnGraph(15)
+    full.add_sequence(reads)
+    assert len(filtered.graph) < len(full.graph) / 2
+    assert filtered.filtered_kmers > 0 and filtered.fragment_edge_count > 0
+    assert all(filtered[name] == read for name, read in reads.items())
+    pog = filtered.to_pog()
+    assert all(pog[name] == read for name, read in reads.items())
+
+
+def test_streaming_and_edge_cases():
+    reads = _reads(n=10, length=400, error_rate=0.02, seed=3)
+    streaming = FilteredDeBruijnGraph(11, min_count=2, sketch=CountMinSketch(1 << 14), streaming=True)
+    streaming.add_sequence(reads)
+    assert all(streaming[name] == read for name, read in reads.items())
+
+    # a sequence without solid kmers, and one that repeats a solid kmer
+    graph = FilteredDeBruijnGraph(5, min_count=2, sketch=CountMinSketch(1 << 14))
+    sequences = {"lone": "ACGTTGCAAC", "repeat": "GGATCCTTGGATCCTTAC", "other": "TTGGATCCTTAA"}
+    graph.count(sequences)
+    graph.add_sequence(sequences)
+    assert all(graph[name] == sequence for name, sequence in sequences.items())
+    assert graph.has_cycles()
+    pog = graph.to_pog()
+    assert all(pog[name] == sequence for name, sequence in sequences.items())
+
+
+def test_merge_filtered_graphs():
+    reads = _reads(n=12, length=600, seed=4)
+    names = list(reads)
+    left = FilteredDeBruijnGraph.from_sequences({name: reads[name] for name in names[:6]}, 13, sketch=CountMinSketch(1 << 14))
+    right = FilteredDeBruijnGraph.from_sequences({name: reads[name] for name in names[6:]}, 13, sketch=CountMinSketch(1 << 14))
+    left.merge(right)
+    assert left.sketch.total == sum(len(read) - 12 for read in reads.values())
+    assert all(left[name] == read for name, read in reads.items())
+    with pytest.raises(ValueError):
+        left.merge(FilteredDeBruijnGraph(13, min_count=5))
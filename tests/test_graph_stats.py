@@ -0,0 +1,89 @@
+from dbg_align import AlignmentMethod, DeBruijnGraph, PartialOrderGraph, POG_Node
+from dbg_align.graph_stats import graph_stats
+from dbg_align.merge_order import MergeOrderOptimizer
+from dbg_align.pog_bubble import POG_Bubble
+from dbg_align.shared_graph import SharedGraph
+from dbg_align.synthetic import generate
+
+
+def _nested_pog() -> PartialOrderGraph:
+    pog = PartialOrderGraph()
+    pog.sequence_names = {"s1": (1, 10), "s2": (2, 10), "s3": (3, 9), "s4": (4, 10)}
+    everyone = {1, 2, 3, 4}
+    close, join = POG_Node("CAT", everyone), POG_Node("GG", {1, 2, 4})
+    inner = POG_Node("T", {1, 2, 4}) + [POG_Node("A", {1, 4}) + join, POG_Node("C", {2}) + join]
+    join.add_node(close)
+    pog.root = POG_Node(None, everyone) + (POG_Node("ACG", everyone) + [inner, POG_Node("TTT", {3}) + close])
+    return pog
+
+
+def test_pog_stats():
+    pog = _nested_pog()
+    assert pog["s1"] == "ACGTAGGCAT" and pog["s3"] == "ACGTTTCAT"
+    stats = pog.stats()
+    assert (stats.nodes, stats.edges, stats.unitigs, stats.anchors, stats.cycles) == (7, 9, 7, 2, 0)
+    assert stats.coverage["s1"] == 0.6 and abs(stats.coverage["s3"] - 6 / 9) < 1e-12
+    assert stats.bubbles == 1 and stats.bubble_sizes == {8: 1} and stats.bubble_depths == {2: 1}
+    assert stats.cells[AlignmentMethod.PROGRESSIVE] == 9 * 10 + 10 * 10 + 10 * 10
+    assert stats.cells[AlignmentMethod.DEBRUIJNGRAPH] == 3 * 4 + 4 * 4 + 4 * 4
+    assert stats.cells[AlignmentMethod.BRAIDEDDEBRUIJGRAPH] == 3 * 4 + 4 * 4
+    assert stats.cheapest() == AlignmentMethod.BRAIDEDDEBRUIJGRAPH
+    assert "bubbles: 1" in str(stats)
+
+
+def test_depth_tells_apart_sets_of_one_size():
+    pog = PartialOrderGraph()
+    pog.sequence_names = {"s1": (1, 8), "s2": (2, 7), "s3": (3, 7), "s4": (4, 9)}
+    everyone = {1, 2, 3, 4}
+    close = POG_Node("CAT", everyone)
+    second = POG_Node("G", {1, 3}) + close
+    first = POG_Node("T", {1, 2}) + [second, close]
+    pog.root = POG_Node(None, everyone) + (POG_Node("ACG", everyone) + [first, second, POG_Node("TTT", {4}) + close])
+    assert [pog[name] for name in ("s1", "s2", "s3")] == ["ACGTGCAT", "ACGTCAT", "ACGGCAT"]
+    # s1 passes {1, 2} then {1, 3}, two sets of the same size
+    assert pog.stats().bubble_depths == {2: 1}
+
+def test_braided_cells_count_branch_text_once():
+    pog = PartialOrderGraph()
+    pog.sequence_names = {"s1": (1, 8), "s2": (2, 8), "s3": (3, 7), "s4": (4, 7)}
+    everyone = {1, 2, 3, 4}
+    close = POG_Node("CAT", everyone)
+    branches = [POG_Node("TA", {1}) + close, POG_Node("TA", {2}) + close, POG_Node("C", {3, 4}) + close]
+    pog.root = POG_Node(None, everyone) + (POG_Node("ACG", everyone) + branches)
+    assert pog["s1"] == pog["s2"] == "ACGTACAT"
+    stats = pog.stats()
+    bubble, = [segment for segment in pog.segments() if isinstance(segment, POG_Bubble)]
+    # s1 and s2 spell the same branch through different nodes, the braided plan aligns it once
+    assert sorted(MergeOrderOptimizer.bubble_items(bubble, braided=True)[0]) == ["C", "TA"]
+    assert stats.cells[AlignmentMethod.DEBRUIJNGRAPH] == 1 * 1 + 1 * 2 + 2 * 2
+    assert stats.cells[AlignmentMethod.BRAIDEDDEBRUIJGRAPH] == 1 * 2
+
+def _walk_cells(bubbles, braided: bool) -> int:
+    cells = 0
+    for bubble in bubbles:
+        lengths = sorted(len(text) for text in MergeOrderOptimizer.bubble_items(bubble, braided=braided)[0])
+        cells += sum(a * b for a, b in zip(lengths, lengths[1:]))
+    return cells
+
+def test_stats_agree_with_graph_walks():
+    # the repetitive workloads have branches that spell one text through different nodes
+    workloads = [(11, generate(6, 1500, snp_rate=0.02, seed=3).sequences)]
+    workloads += [(5, generate(5, 200, kmer_length=5, snp_rate=0.05, indel_rate=0.02, tandem_repeats=2, seed=seed).sequences) for seed in range(5)]
+    for k, sequences in workloads:
+        dbg = DeBruijnGraph(k)
+        dbg.add_sequence(sequences)
+        pog = dbg.to_pog()
+        stats = pog.stats()
+        bubbles = [segment for segment in pog.segments() if isinstance(segment, POG_Bubble)]
+        assert stats.bubbles == len(bubbles) == sum(stats.bubble_sizes.values()) == sum(stats.bubble_depths.values())
+        assert stats.cells[AlignmentMethod.DEBRUIJNGRAPH] == _walk_cells(bubbles, braided=False)
+        assert stats.cells[AlignmentMethod.BRAIDEDDEBRUIJGRAPH] == _walk_cells(bubbles, braided=True)
+        assert stats.cells[AlignmentMethod.PROGRESSIVE] == pog.work(AlignmentMethod.PROGRESSIVE)
+        with SharedGraph.publish(pog) as shared:
+            assert graph_stats(shared).to_dict() == stats.to_dict()
+        dbg_stats = dbg.stats()
+        assert dbg_stats.nodes == len(dbg.graph) and dbg_stats.edges == dbg.edge_count
+        assert dbg_stats.cycles == dbg.cycle_edge_count and (dbg.cycle_edge_count == 0) == (k == 11)
+        assert AlignmentMethod.DEBRUIJNGRAPH not in dbg_stats.cells
+        anchors = {kmer for kmer in dbg.graph if all(kmer in sequence for sequence in sequences.values())}
+        assert dbg_stats.anchors == len(anchors)
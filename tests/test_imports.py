@@ -0,0 +1,48 @@
+import json
+import subprocess
+import sys
+import pytest
+import dbg_align
+
+HEAVY = ("cogent3", "numpy", "graphviz", "IPython")
+
+# generous enough for a loaded CI machine, eager imports took over two seconds
+IMPORT_BUDGET = 0.5
+
+
+def _probe(code: str) -> dict:
+    """Runs code in a fresh interpreter, it reports through a dict named `result`."""
+    script = f"import json, sys, time\nresult = {{}}\n{code}\nprint(json.dumps(result))"
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.splitlines()[-1])
+
+def test_import_is_lazy_and_fast():
+    result = _probe(
+        "start = time.perf_counter()\n"
+        "import dbg_align\n"
+        "result['seconds'] = time.perf_counter() - start\n"
+        "from dbg_align import DeBruijnGraph, PartialOrderGraph, AlignmentBuffer, instrumentation\n"
+        "dbg = DeBruijnGraph(5)\n"
+        f"result['loaded'] = [name for name in {HEAVY!r} if name in sys.modules]\n"
+    )
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_BUDGET
+
+def test_moltype_loads_cogent3_on_first_use():
+    result = _probe(
+        "from dbg_align import DeBruijnGraph\n"
+        "dbg = DeBruijnGraph(5)\n"
+        "result['before'] = 'cogent3' in sys.modules\n"
+        "dbg.add_sequence('ACGTACGTTGCA')\n"
+        "result['after'] = 'cogent3' in sys.modules\n"
+        "result['moltype'] = dbg.moltype.label\n"
+    )
+    assert result == {"before": False, "after": True, "moltype": "dna"}
+
+def test_lazy_exports():
+    assert set(dbg_align.__all__) <= set(dir(dbg_align))
+    for name in dbg_align.__all__:
+        assert getattr(dbg_align, name) is not None
+    assert dbg_align.MockAlignmentPlugin.__module__ == "dbg_align.mock_alignment"
+    with pytest.raises(AttributeError):
+        dbg_align.not_a_name
@@ -0,0 +1,44 @@
+import dbg_align
+from dbg_align import MockAlignmentPlugin, instrumentation
+from dbg_align.synthetic import generate
+
+
+def test_disabled_by_default():
+    assert not instrumentation.enabled()
+    with instrumentation.timer("anything") as timer:
+        pass
+    instrumentation.count("anything")
+    assert timer is instrumentation.timer("other")
+
+def test_pipeline_counters():
+    workload = generate(4, 300, snp_rate=0.02, seed=3)
+    with instrumentation.instrumented() as recorder:
+        dbg = dbg_align.DeBruijnGraph(workload.kmer_length)
+        dbg.add_sequence(workload.sequences)
+        pog = dbg.to_pog()
+        pog.bubbles()
+        buffer = dbg_align.AlignmentBuffer(MockAlignmentPlugin())
+        index = buffer.add_alignment(pog[1], pog[2])
+        for sequence in (pog[3], pog[4]):
+            index = buffer.add_alignment(sequence, index)
+    assert not instrumentation.enabled()
+    counters = recorder.counters
+    assert counters["dbg.kmers"] == sum(len(s) - workload.kmer_length + 1 for s in workload.as_list())
+    assert counters["dbg.nodes"] == workload.expected_nodes == len(dbg.graph)
+    assert counters["dbg.edges"] == dbg.edge_count
+    assert counters["dbg.cycle_edges"] == 0
+    assert counters["pog.nodes"] == len(pog.topological_order())
+    assert counters["pog.bubbles.depth_0"] == 1
+    assert recorder.calls("dbg.add_sequence") == 4
+    assert recorder.calls("pog.transform") == 1
+    assert recorder.calls("plugin.SEQUENCE_SEQUENCE") == 1
+    assert recorder.calls("plugin.SEQUENCE_PROFILE") == 2
+    assert recorder.seconds("plugin.SEQUENCE_PROFILE") > 0
+    assert set(recorder.report()) == {"timers", "counters"}
+
+def test_callback_sink():
+    events = []
+    with instrumentation.instrumented(instrumentation.CallbackSink(lambda *event: events.append(event))):
+        dbg_align.DeBruijnGraph(3).add_sequence("ACGTTGCA")
+    assert ("count", "dbg.kmers", 6) in events
+    assert any(kind == "time" and name == "dbg.add_sequence" for kind, name, _ in events)
@@ -0,0 +1,57 @@
+import pytest
+import dbg_align
+from dbg_align import DeBruijnGraph, MemoryBudgetExceeded, SparseDeBruijnGraph
+from dbg_align.synthetic import generate
+
+
+def test_memory_usage_breakdown():
+    workload = generate(4, 500, snp_rate=0.02, seed=2)
+    dbg = DeBruijnGraph(11)
+    dbg.add_sequence(workload.sequences)
+    usage = dbg.memory_usage()
+    assert set(usage.breakdown) == {"nodes", "edges", "kmers", "cycles", "fragments", "index"}
+    assert usage["nodes"] > 0 and usage["edges"] > 0 and usage["kmers"] > 0
+    assert usage.total == sum(usage.breakdown.values())
+    # the count based estimate is in the same range as walking the graph
+    assert 0.5 < dbg.estimate_memory() / usage.total < 2
+    pog_usage = dbg.to_pog().memory_usage()
+    assert set(pog_usage.breakdown) == {"nodes", "sequence_sets", "fragments", "index"}
+    assert pog_usage.total > 0
+
+def test_sparse_graph_uses_less_memory():
+    workload = generate(4, 1000, snp_rate=0.01, seed=3)
+    dense, sparse = DeBruijnGraph(15), SparseDeBruijnGraph(15)
+    dense.add_sequence(workload.sequences)
+    sparse.add_sequence(workload.sequences)
+    assert sparse.memory_usage()["fragments"] > 0
+    assert sparse.memory_usage().total * 5 < dense.memory_usage().total
+
+def test_memory_budget_raises_before_adding():
+    workload = generate(5, 400, snp_rate=0.02, seed=4)
+    sequences = workload.as_list()
+    probe = DeBruijnGraph(11)
+    probe.add_sequence(sequences[:2])
+    dbg = DeBruijnGraph(11, memory_budget=probe.estimate_memory() + 1000)
+    dbg.add_sequence(sequences[:2])
+    nodes, names = len(dbg.graph), dict(dbg.sequence_names)
+    with pytest.raises(MemoryBudgetExceeded) as error:
+        dbg.add_sequence(sequences[2])
+    assert error.value.budget == dbg.memory_budget
+    assert len(dbg.graph) == nodes and dbg.sequence_names == names
+
+def test_memory_budget_reclaim_hook():
+    class GrowingGraph(DeBruijnGraph):
+        def _reclaim(self, required):
+            self.memory_budget += required
+            return True
+
+    dbg = GrowingGraph(11, memory_budget=1)
+    dbg.add_sequence(generate(3, 200, seed=5).sequences)
+    assert len(dbg) == 3
+
+def test_pog_memory_budget():
+    dbg = DeBruijnGraph(11)
+    dbg.add_sequence(generate(3, 300, snp_rate=0.02, seed=6).sequences)
+    with pytest.raises(MemoryBudgetExceeded):
+        dbg.to_pog(memory_budget=1000)
+    assert dbg.to_pog(memory_budget=10**8)[1] == dbg[1]
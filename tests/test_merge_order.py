@@ -0,0 +1,61 @@
+import cogent3
+import pytest
+import dbg_align
+from dbg_align import AlignmentPlanner, BandedAlignmentPlugin, MergeOrderOptimizer, POG_Bubble
+
+
+def many_branch_pog():
+    dbg = dbg_align.DeBruijnGraph(3, cogent3.DNA)
+    dbg.add_sequence({
+        "seq1": "ACAGTACGGCAT",
+        "seq2": "ACAGTACTGGCAT",
+        "seq3": "ACAGCGCAT",
+        "seq4": "ACAGTTTGCAT",
+        "seq5": "ACAGTACTGGCAT",
+        })
+    return dbg.to_pog()
+
+def test_naive_order_matches_sequential_adds():
+    texts = ["AAAA", "CC", "GGG"]
+    plan = MergeOrderOptimizer("naive").plan(texts)
+    assert plan.merges == [(0, 1), (2, 3)]
+    # 4x2, then 3 against a profile that cost 8
+    assert plan.cost == plan.naive_cost == (8 + 3 * 8, 8 + 3 * 8)
+    assert plan.savings == 0
+
+def test_huffman_merges_shortest_first():
+    texts = ["ACGTACGTAC", "ACG", "ACGT", "ACGTACGTA"]
+    plan = MergeOrderOptimizer("huffman").plan(texts)
+    assert plan.merges[0] == (1, 2)
+    assert plan.cost[1] < plan.naive_cost[1]
+    assert plan.savings == plan.naive_cost[1] - plan.cost[1]
+
+def test_guide_tree_needs_nodes():
+    with pytest.raises(ValueError):
+        MergeOrderOptimizer("guide_tree").plan(["ACG", "ACT"])
+    with pytest.raises(ValueError):
+        MergeOrderOptimizer("fastest")
+
+def test_plan_bubble_and_report():
+    pog = many_branch_pog()
+    bubble = next(s for s in pog.segments() if isinstance(s, POG_Bubble))
+    optimizer = MergeOrderOptimizer()
+    plan = optimizer.plan_bubble(bubble)
+    assert plan.n_items == 5
+    assert plan.cost[1] <= plan.naive_cost[1]
+    tree = MergeOrderOptimizer("guide_tree").plan_bubble(bubble)
+    # seq2 and seq5 take the same path through the graph so they are joined first
+    assert tree.merges[0] == (1, 4)
+    braided = optimizer.plan_bubble(bubble, braided=True)
+    assert braided.n_items == 4
+    report = optimizer.report(pog)
+    assert report.savings == plan.savings
+
+def test_planner_uses_merge_order():
+    pog = many_branch_pog()
+    naive = AlignmentPlanner(pog)
+    ordered = AlignmentPlanner(pog, merge_order=MergeOrderOptimizer("huffman"))
+    method = dbg_align.AlignmentMethod.DEBRUIJNGRAPH
+    assert ordered.estimate(method).cost[1] < naive.estimate(method).cost[1]
+    profile = ordered.execute(BandedAlignmentPlugin(), method).profile()
+    assert [row.replace("-", "") for row in profile.rows()] == [pog[i] for i in range(1, 6)]
@@ -0,0 +1,46 @@
+import numpy as np
+from dbg_align import BandedAlignmentPlugin
+from dbg_align.minhash import SequenceClusterer, jaccard, single_linkage, sketch
+from dbg_align.synthetic import generate
+
+
+def _families():
+    sequences = {}
+    for family, (count, length, seed) in enumerate([(4, 600, 1), (3, 500, 2), (1, 400, 3)]):
+        workload = generate(count, length, snp_rate=0.02, seed=seed)
+        sequences.update({f"f{family}_{name}": sequence for name, sequence in workload.sequences.items()})
+    return sequences
+
+
+def test_sketch_estimates_jaccard():
+    workload = generate(2, 2000, snp_rate=0.01, seed=4)
+    a, b = workload.sequences.values()
+    sa, sb = sketch(a, 15, 256), sketch(b, 15, 256)
+    assert len(sa) == 256 and np.all(np.diff(sa.astype(np.float64)) > 0)
+    ka = {a[i:i + 15] for i in range(len(a) - 14)}
+    kb = {b[i:i + 15] for i in range(len(b) - 14)}
+    exact = len(ka & kb) / len(ka | kb)
+    assert abs(jaccard(sa, sb) - exact) < 0.1
+    assert jaccard(sa, sa) == 1.0
+    assert jaccard(sa, sketch(generate(1, 2000, seed=9).sequences["seq1"], 15, 256)) < 0.05
+
+
+def test_single_linkage():
+    similarity = np.array([[1, 0.5, 0, 0], [0.5, 1, 0.3, 0], [0, 0.3, 1, 0], [0, 0, 0, 1]])
+    assert single_linkage(similarity, 0.25) == [[0, 1, 2], [3]]
+    assert single_linkage(similarity, 0.4) == [[0, 1], [2], [3]]
+
+
+def test_clusters_are_aligned_separately_and_merged():
+    sequences = _families()
+    clusterer = SequenceClusterer(sequences, threshold=0.2)
+    assert [cluster.names for cluster in clusterer.clusters] == [
+        [name for name in sequences if name.startswith(prefix)] for prefix in ("f0", "f1", "f2")]
+    report = clusterer.report()
+    assert len(report.clusters) == 3 and report.merge_cost > 0
+    assert report.cost[1] == sum(cost[1] for _, _, cost in report.clusters) + report.merge_cost
+    assert "merge" in str(report)
+
+    profile = clusterer.align(BandedAlignmentPlugin())
+    assert profile.names == list(sequences)
+    assert [row.replace("-", "") for row in profile.rows()] == list(sequences.values())
@@ -0,0 +1,79 @@
+import cogent3
+import pytest
+import dbg_align
+from dbg_align import AlignmentMethod, AlignmentPlanner, BandedAlignmentPlugin, PlanBudget, POG_Bubble
+
+
+def nested_bubble_pog():
+    dbg = dbg_align.DeBruijnGraph(3, cogent3.DNA)
+    dbg.add_sequence({
+        "seq1": "ACAGTACGGCAT",
+        "seq2": "ACAGTACTGGCAT",
+        "seq3": "ACAGCGCAT"
+        })
+    return dbg.to_pog()
+
+def test_segments():
+    segments = list(nested_bubble_pog().segments())
+    assert [type(segment) for segment in segments] == [dbg_align.POG_Node, POG_Bubble, dbg_align.POG_Node]
+    assert segments[0].fragment == "ACAG"
+    assert segments[1].branches() == {1: "TACGGC", 2: "TACTGGC", 3: "CGC"}
+    assert segments[2].fragment == "AT"
+
+def test_planner_estimates():
+    planner = AlignmentPlanner(nested_bubble_pog())
+    estimates = planner.estimates()
+    # progressive: 12x13, then 9 against that profile
+    assert estimates[AlignmentMethod.PROGRESSIVE].cost == (12 * 13 * 10, 12 * 13 * 10)
+    # dBG: only the bubble branches are aligned
+    assert estimates[AlignmentMethod.DEBRUIJNGRAPH].cost == (6 * 7 * 4, 6 * 7 * 4)
+    assert estimates[AlignmentMethod.EXACT].cost[0] == pytest.approx(12 * 13 * 9)
+    assert planner.select().method == AlignmentMethod.DEBRUIJNGRAPH
+
+def test_planner_budget():
+    planner = AlignmentPlanner(nested_bubble_pog(), seconds_per_cell=1.0)
+    assert planner.select(PlanBudget(seconds=200)).method == AlignmentMethod.DEBRUIJNGRAPH
+    with pytest.raises(ValueError):
+        planner.select(PlanBudget(seconds=10))
+
+def test_planner_exact_does_not_overflow():
+    pog = nested_bubble_pog()
+    pog.sequence_names = {f"s{i}": (i, 10**6) for i in range(1, 200)}
+    estimate = AlignmentPlanner(pog).estimate(AlignmentMethod.EXACT)
+    assert isinstance(estimate.cost[0], float)
+
+def test_planner_execute():
+    planner = AlignmentPlanner(nested_bubble_pog())
+    result = planner.execute(BandedAlignmentPlugin(), measure_memory=True)
+    assert result.record.method == AlignmentMethod.DEBRUIJNGRAPH
+    assert result.record.seconds > 0
+    assert result.record.memory > 0
+    assert planner.history == [result.record]
+    profile = result.profile()
+    assert profile.names == ["seq1", "seq2", "seq3"]
+    assert [row.replace("-", "") for row in profile.rows()] == ["ACAGTACGGCAT", "ACAGTACTGGCAT", "ACAGCGCAT"]
+    planner.calibrate()
+    assert planner.seconds_per_cell == result.record.seconds / result.record.estimate.cost[1]
+
+def test_planner_sets_band_from_bubbles():
+    class RecordingPlugin(BandedAlignmentPlugin):
+        def _align(self, profile_a, profile_b):
+            self.bands.append(self.bubble_band)
+            return super()._align(profile_a, profile_b)
+
+    planner = AlignmentPlanner(nested_bubble_pog())
+    bubble = next(step.bubble for step in planner.steps(AlignmentMethod.DEBRUIJNGRAPH) if step.bubble is not None)
+    assert bubble.length_spread() == 7 - 3
+    plugin = RecordingPlugin()
+    plugin.bands = []
+    profile = planner.execute(plugin, AlignmentMethod.DEBRUIJNGRAPH).profile()
+    assert plugin.bands == [4, 4]
+    # the band covers the spread, so the 6 and 7 base branches align without widening
+    assert [record[3] for record in plugin.records if len(record) == 5][0] == 4 + plugin.padding
+    assert [row.replace("-", "") for row in profile.rows()] == ["ACAGTACGGCAT", "ACAGTACTGGCAT", "ACAGCGCAT"]
+    plugin.bands = []
+    planner.execute(plugin, AlignmentMethod.PROGRESSIVE)
+    assert plugin.bands == [None, None]
+    fixed = BandedAlignmentPlugin(band=1)
+    planner.execute(fixed, AlignmentMethod.DEBRUIJNGRAPH)
+    assert fixed.bubble_band == 4 and fixed.band_from_bubble(bubble) == 1
@@ -0,0 +1,67 @@
+import cogent3
+import dbg_align
+from dbg_align import PartialOrderAligner, PartialOrderGraph, POG_Node
+
+
+def nested_bubble_pog() -> PartialOrderGraph:
+    dbg = dbg_align.DeBruijnGraph(3, cogent3.DNA)
+    dbg.add_sequence({
+        "seq1": "ACAGTACGGCAT",
+        "seq2": "ACAGTACTGGCAT",
+        "seq3": "ACAGCGCAT"
+        })
+    return dbg.to_pog()
+
+def test_pog_shares_nodes_after_bubbles():
+    pog = nested_bubble_pog()
+    order = pog.topological_order()
+    assert len(order) == len(set(order))
+    end = order[-1]
+    assert end.fragment == ""
+    assert end.sequence_set == {1, 2, 3}
+    # branches rejoin on a single node holding the shared suffix
+    joins = [node for node in order if node.fragment == "AT"]
+    assert len(joins) == 1
+    assert joins[0].sequence_set == {1, 2, 3}
+
+def test_align_sequence_to_pog():
+    pog = nested_bubble_pog()
+    alignment = pog.align_sequence("ACAGTACTGGCAT")
+    assert alignment.score == 13
+    assert alignment.matches() == 13
+    assert "".join(node.fragment[offset] for node, offset, _ in alignment.aligned_columns()) == "ACAGTACTGGCAT"
+
+def test_align_read_semiglobal():
+    pog = nested_bubble_pog()
+    alignment = pog.align_sequence("TACTGG", mode="semiglobal")
+    assert alignment.score == 6
+    node, offset = alignment.start
+    assert node.fragment[offset] == "T"
+    assert 2 in node.sequence_set
+
+def test_add_sequence_to_pog():
+    pog = nested_bubble_pog()
+    index = pog.add_sequence("ACAGTACTTGGCAT", "seq4")
+    assert index == 4
+    assert pog.names() == ["seq1", "seq2", "seq3", "seq4"]
+    assert pog["seq4"] == "ACAGTACTTGGCAT"
+    assert pog["seq1"] == "ACAGTACGGCAT"
+    assert pog["seq2"] == "ACAGTACTGGCAT"
+    assert pog["seq3"] == "ACAGCGCAT"
+
+def test_add_sequence_to_constructed_pog():
+    pog = PartialOrderGraph()
+    pog.sequence_names = {'Sequence 1':(1,10),'Sequence 2':(2,10)}
+    end = POG_Node("GCAT", {1,2})
+    pog.root = POG_Node("AGT", {1, 2}) + [POG_Node("GCG", {1})+end, POG_Node("GTG",{2})+end]
+    index = pog.add_sequence("CCAGTGCAT")
+    assert pog[index] == "CCAGTGCAT"
+    assert pog[1] == "AGTGCGGCAT"
+    assert pog[2] == "AGTGTGGCAT"
+
+def test_banded_graph_alignment():
+    pog = nested_bubble_pog()
+    full = PartialOrderAligner().align(pog, "ACAGTACGTGGCAT")
+    banded = PartialOrderAligner(band=1).align(pog, "ACAGTACGTGGCAT")
+    assert banded.score == full.score
+    assert banded.cells < full.cells
@@ -1,3 +1,4 @@
+import pytest
 from dbg_align import PartialOrderGraph, POG_Node
 from dbg_align.alignment_cost_plugin import PluginCostAlignment
 from dbg_align.allignment_buffer import AlignmentBuffer
@@ -93,3 +94,144 @@ def test_construct_pog():
     assert bubbles[0].start.sequence_set == {1,2}
     assert bubbles[0].end.sequence_set == {1,2}
     assert len(bubbles[0].inner_bubbles) == 1
+
+
+def test_coordinate_index():
+    from dbg_align.synthetic import generate
+    workload = generate(5, 400, snp_rate=0.02, indel_rate=0.01, seed=3)
+    dbg = dbg_align.DeBruijnGraph(11)
+    dbg.add_sequence(workload.sequences)
+    pog = dbg.to_pog()
+    index = pog.coordinates()
+    assert pog.coordinates() is index
+    for name, sequence in workload.sequences.items():
+        assert pog[name] == sequence
+        assert index.length(name) == len(sequence)
+        assert index.slice(name, 37, 251) == sequence[37:251]
+        assert index.slice(name, -20) == sequence[-20:]
+        for position in (0, 11, 200, len(sequence) - 1):
+            node, offset = index.node_at(name, position)
+            assert node.fragment[offset] == sequence[position]
+            assert index.offset(node, name) == position - offset
+        path = index.path(name)
+        assert "".join(node.fragment for node in path) == sequence
+        assert index.offset(path[-1], name) + len(path[-1].fragment) == len(sequence)
+    assert index.offset(pog.root, 1) == 0
+    assert index.offsets(pog.root) == {i: 0 for i in range(1, 6)}
+
+
+def test_coordinate_index_follows_graph_changes():
+    dbg = dbg_align.DeBruijnGraph(3)
+    dbg.add_sequence({"seq1": "ACAGTACGGCAT", "seq2": "ACAGTACTGGCAT"})
+    pog = dbg.to_pog()
+    index = pog.coordinates()
+    with pytest.raises(IndexError):
+        index.node_at("seq1", 12)
+    with pytest.raises(KeyError):
+        index.path("seq3")
+    pog.add_sequence("ACAGTACGGCTT", "seq3")
+    assert pog.coordinates() is not index
+    assert pog.coordinates().slice("seq3", 8) == "GCTT"
+    assert pog["seq1"] == "ACAGTACGGCAT"
+
+
+def test_region_extraction_and_splice():
+    from dbg_align.synthetic import generate
+    workload = generate(5, 2000, snp_rate=0.02, indel_rate=0.005, seed=2)
+    dbg = dbg_align.DeBruijnGraph(11)
+    dbg.add_sequence(workload.sequences)
+    pog = dbg.to_pog()
+    sub = pog.region("seq1", 800, 1000)
+    assert sub.names() == pog.names()
+    assert sub.origin.parent is pog
+    for name, sequence in workload.sequences.items():
+        offset = sub.origin.offset(name)
+        assert sub[name] == sequence[offset:offset + sub.len_for_name(name)]
+    assert sub.origin.offset("seq1") <= 800
+    assert sub.origin.offset("seq1") + sub.len_for_name("seq1") >= 1000
+
+    # rebuild the region with a shorter kmer length and put it back
+    rebuilt = dbg_align.DeBruijnGraph(8)
+    rebuilt.add_sequence({name: sub[name] for name in sub.names()})
+    pog.splice(rebuilt.to_pog(), sub.origin)
+    assert all(pog[name] == sequence for name, sequence in workload.sequences.items())
+    pog.splice(sub)
+    assert all(pog[name] == sequence for name, sequence in workload.sequences.items())
+    assert all(pog.len_for_name(name) == len(sequence) for name, sequence in workload.sequences.items())
+
+
+def test_bubble_subgraph():
+    pog = PartialOrderGraph()
+    pog.sequence_names = {'Sequence 1': (1, 10), 'Sequence 2': (2, 10)}
+    end = POG_Node("GCAT", {1, 2})
+    pog.root = POG_Node("AGT", {1, 2}) + [POG_Node("GCG", {1}) + end, POG_Node("GTG", {2}) + end]
+    bubble = pog.bubbles()[0]
+    sub = pog.subgraph(bubble)
+    assert sub["Sequence 1"] == "GCG"
+    assert sub["Sequence 2"] == "GTG"
+    assert sub.len_for_name("Sequence 2") == 3
+    with pytest.raises(ValueError):
+        pog.subgraph(pog.root, pog.root.next[0])
+    replacement = PartialOrderGraph()
+    replacement.sequence_names = {'Sequence 2': (1, 4), 'Sequence 1': (2, 3)}
+    replacement.root = POG_Node("G", {1, 2}) + [POG_Node("CG", {2}), POG_Node("TTG", {1})]
+    pog.splice(replacement, sub.origin)
+    assert pog["Sequence 1"] == "AGTGCGGCAT"
+    assert pog["Sequence 2"] == "AGTGTTGGCAT"
+    assert pog.len_for_name("Sequence 2") == 11
+    with pytest.raises(ValueError):
+        pog.splice(replacement)
+
+
+def _reachable(pog: PartialOrderGraph) -> int:
+    stack, seen = [pog.root], {pog.root}
+    while stack:
+        for successor in stack.pop().next:
+            if successor not in seen:
+                seen.add(successor)
+                stack.append(successor)
+    return len(seen)
+
+
+def test_pog_stays_acyclic_when_sequences_disagree_on_kmer_order():
+    from dbg_align.synthetic import generate
+    for workload in (generate(8, 3000, snp_rate=0.02, indel_rate=0.005, seed=9),
+                     generate(6, 800, snp_rate=0.02, tandem_repeats=3, avoid_repeats=False, seed=2)):
+        dbg = dbg_align.DeBruijnGraph(11)
+        dbg.add_sequence(workload.sequences)
+        pog = dbg.to_pog()
+        assert len(pog.topological_order()) == _reachable(pog)
+        assert all(pog[name] == sequence for name, sequence in workload.sequences.items())
+    # the same kmers in a different order
+    dbg = dbg_align.DeBruijnGraph(3)
+    dbg.add_sequence({"a": "ACGTTGCA", "b": "TTGCAACG"})
+    pog = dbg.to_pog()
+    assert (pog["a"], pog["b"]) == ("ACGTTGCA", "TTGCAACG")
+    assert len(pog.topological_order()) == _reachable(pog)
+
+
+def test_pog_reads_back_repetitive_sequences():
+    import random
+    dbg = dbg_align.DeBruijnGraph(3)
+    dbg.add_sequence({"a": "ACAACAAC"})
+    assert dbg.to_pog()["a"] == "ACAACAAC"
+    for seed in range(20):
+        rng = random.Random(seed)
+        unit = "".join(rng.choice("ACGT") for _ in range(rng.randint(2, 5)))
+        reads = {f"r{i}": "".join(rng.choice([unit, unit[::-1], rng.choice("ACGT")]) for _ in range(rng.randint(4, 30))) for i in range(8)}
+        dbg = dbg_align.DeBruijnGraph(rng.randint(3, 5))
+        dbg.add_sequence(reads)
+        pog = dbg.to_pog()
+        assert {name: pog[name] for name in reads} == reads
+        assert len(pog.topological_order()) == _reachable(pog)
+
+
+def test_topological_order_rejects_cycles():
+    pog = PartialOrderGraph()
+    pog.sequence_names = {"a": (1, 6)}
+    first, second = POG_Node("ACG", {1}), POG_Node("TTT", {1})
+    pog.root = POG_Node(None, {1}) + first
+    first.add_node(second)
+    second.add_node(first)
+    with pytest.raises(ValueError):
+        pog.topological_order()
@@ -0,0 +1,52 @@
+import cogent3
+import numpy as np
+from dbg_align import CompositeAlignment, MockAlignmentPlugin, Profile
+
+
+def test_profile_round_trip():
+    profile = Profile(["AC-T", "ACGT"], names=["a", "b"])
+    assert profile.n_rows == 2
+    assert len(profile) == 4
+    assert profile.codes.dtype == np.uint8
+    assert profile.rows() == ["AC-T", "ACGT"]
+
+def test_profile_counts():
+    profile = Profile(["AC-T", "ACGT", "AGGT"])
+    counts = profile.counts
+    assert counts.shape == (4, len(profile.alphabet))
+    assert counts[0, profile.alphabet.index("A")] == 3
+    assert counts[1, profile.alphabet.index("C")] == 2
+    assert counts[2, profile.gap_code] == 1
+    assert np.allclose(profile.frequencies.sum(axis=1), 1.0)
+
+def test_profile_concatenate():
+    left = Profile(["AC", "A-"])
+    right = Profile(["G", "T"])
+    joined = Profile.concatenate(["TT", left, "C", right])
+    assert len(joined._chunks) == 4
+    assert joined.counts[2, joined.alphabet.index("A")] == 2
+    assert joined.rows() == ["TTACCG", "TTA-CT"]
+    assert len(joined._chunks) == 1
+
+def test_profile_score():
+    profile = Profile(["AC", "AG"])
+    other = Profile(["A", "A", "C"])
+    scores = profile.score(other)
+    assert scores.shape == (2, 1)
+    assert np.isclose(scores[0, 0], 1 / 3)
+    assert np.isclose(scores[1, 0], -2 / 3)
+
+def test_profile_to_alignment():
+    profile = Profile(["AC-T", "ACGT"], names=["a", "b"])
+    alignment = profile.to_alignment(cogent3.DNA)
+    assert alignment.names == ["a", "b"]
+    assert alignment.to_dict() == {"a": "AC-T", "b": "ACGT"}
+
+def test_mock_plugin_concatenate():
+    plugin = MockAlignmentPlugin()
+    profile = plugin.align_sequences("ACG", "AGG")
+    nested = plugin.align_sequence_to_profile("ATG", profile)
+    result = plugin.concatenate(["AA", nested])
+    assert result.components[0] == "AA"
+    assert result.components[1].components == ["ATG", "ACG", "AGG"]
+    assert isinstance(result.components[1], CompositeAlignment)
@@ -0,0 +1,84 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+from dbg_align import DeBruijnGraph, SparseDeBruijnGraph
+from dbg_align.shared_graph import SharedGraph, attach
+from dbg_align.synthetic import generate
+
+
+def _sequences():
+    return generate(4, 300, snp_rate=0.03, indel_rate=0.01, seed=5).sequences
+
+
+def _read(segment: str, name: str) -> str:
+    return attach(segment).sequence(name)
+
+
+def test_pog_round_trip():
+    sequences = _sequences()
+    dbg = DeBruijnGraph(11)
+    dbg.add_sequence(sequences)
+    pog = dbg.to_pog()
+    with SharedGraph.publish(pog) as shared:
+        assert shared.kind == "pog" and shared.owner
+        assert shared.names() == pog.names()
+        assert shared.node_count == len(pog.topological_order())
+        for name, sequence in sequences.items():
+            assert shared.sequence(name) == sequence
+            assert shared.slice(name, 50, 120) == sequence[50:120]
+            assert shared.slice(name, -10) == sequence[-10:]
+        assert not shared.arrays["text"].flags.writeable
+        root = shared.successors(0)
+        assert set(shared.sequence_set(int(root[0])).tolist()) <= set(range(1, 5))
+        rebuilt = shared.to_graph()
+        assert [rebuilt[name] for name in sequences] == list(sequences.values())
+
+
+def test_dbg_round_trip():
+    sequences = _sequences()
+    for dbg in (DeBruijnGraph(5), SparseDeBruijnGraph(9, window=5)):
+        dbg.add_sequence(sequences)
+        with SharedGraph.publish(dbg) as shared:
+            assert shared.kind == "dbg"
+            assert [shared.sequence(name) for name in sequences] == list(sequences.values())
+            rebuilt = shared.to_graph()
+            assert [rebuilt[name] for name in sequences] == list(sequences.values())
+            assert len(rebuilt.graph) == len(dbg.graph)
+
+
+def test_lifetime():
+    dbg = DeBruijnGraph(11)
+    dbg.add_sequence(_sequences())
+    shared = SharedGraph.publish(dbg.to_pog())
+    name = shared.name
+    view = attach(name)
+    assert view is attach(name) and not view.owner
+    view.close()
+    assert view.closed and attach(name) is not view
+    attach(name).close()
+    shared.close()
+    assert shared.closed
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
+    shared.close() # closing twice is harmless
+
+    shared = SharedGraph.publish(dbg)
+    name = shared.name
+    del shared # unlinked when the owner is collected
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
+
+    with pytest.raises(ValueError):
+        SharedGraph.publish("ACGT")
+
+
+def test_workers_attach():
+    sequences = _sequences()
+    dbg = DeBruijnGraph(11)
+    dbg.add_sequence(sequences)
+    with SharedGraph.publish(dbg.to_pog()) as shared:
+        with ProcessPoolExecutor(2) as pool:
+            assert list(pool.map(_read, repeat(shared.name), list(sequences))) == list(sequences.values())
+        assert shared.sequence(next(iter(sequences))) == next(iter(sequences.values()))
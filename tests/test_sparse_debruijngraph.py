@@ -0,0 +1,63 @@
+import random
+import pytest
+import dbg_align
+from dbg_align import SparseDeBruijnGraph
+
+
+def mutated_copies(n, length, edits, seed=7):
+    rng = random.Random(seed)
+    base = "".join(rng.choice("ACGT") for _ in range(length))
+    sequences = {}
+    for i in range(n):
+        sequence = list(base)
+        for _ in range(edits):
+            position = rng.randrange(len(sequence))
+            choice = rng.random()
+            if choice < 0.6:
+                sequence[position] = rng.choice("ACGT")
+            elif choice < 0.8:
+                del sequence[position]
+            else:
+                sequence.insert(position, rng.choice("ACGT"))
+        sequences[f"seq{i+1}"] = "".join(sequence)
+    return sequences
+
+@pytest.mark.parametrize("mode", SparseDeBruijnGraph.MODES)
+def test_sparse_reconstruction(mode):
+    sequences = mutated_copies(5, 600, 12)
+    dbg = SparseDeBruijnGraph(11, mode=mode)
+    dbg.add_sequence(sequences)
+    assert not dbg.has_cycles()
+    for name, sequence in sequences.items():
+        assert dbg[name] == sequence
+    pog = dbg.to_pog()
+    for index, sequence in enumerate(sequences.values(), 1):
+        assert pog[index] == sequence
+
+def test_sparse_node_count():
+    sequences = mutated_copies(3, 2000, 10)
+    sparse = SparseDeBruijnGraph(15)
+    sparse.add_sequence(sequences)
+    dense = dbg_align.DeBruijnGraph(15)
+    dense.add_sequence(sequences)
+    assert len(sparse.graph) * 10 < len(dense.graph)
+
+def test_sparse_anchors():
+    sequence = "ACGTTGCAAGTCCGATAGGCTTACGGATCAATGCCTAGT"
+    dbg = SparseDeBruijnGraph(5, window=4)
+    anchors = dbg.anchor_positions(sequence)
+    assert anchors == sorted(anchors)
+    assert all(b - a >= 5 for a, b in zip(anchors, anchors[1:]))
+    # rearranged sequences only reuse the anchors that keep the graph acyclic
+    dbg.add_sequence(sequence, "forward")
+    dbg.add_sequence(sequence[20:] + sequence[:20], "rotated")
+    assert dbg["rotated"] == sequence[20:] + sequence[:20]
+    assert dbg.to_pog()[2] == sequence[20:] + sequence[:20]
+
+def test_sparse_unknown_mode():
+    with pytest.raises(ValueError):
+        SparseDeBruijnGraph(5, mode="sketch")
+
+def test_sparse_graphs_do_not_merge():
+    with pytest.raises(ValueError, match="Sparse graphs cannot be merged"):
+        SparseDeBruijnGraph(11).merge(SparseDeBruijnGraph(11))
@@ -0,0 +1,60 @@
+import io
+import dbg_align
+from dbg_align import AlignmentMethod, AlignmentPlanner, BandedAlignmentPlugin
+from dbg_align.cli import read_fasta
+from dbg_align.streaming import write_fasta, write_maf
+from dbg_align.synthetic import generate
+
+
+def _planner():
+    workload = generate(4, 300, snp_rate=0.03, indel_rate=0.01, seed=5)
+    dbg = dbg_align.DeBruijnGraph(11)
+    dbg.add_sequence(workload.sequences)
+    return workload, AlignmentPlanner(dbg.to_pog())
+
+
+def test_blocks_follow_graph_order():
+    workload, planner = _planner()
+    blocks = planner.blocks(BandedAlignmentPlugin(), AlignmentMethod.DEBRUIJNGRAPH)
+    assert iter(blocks) is blocks
+    first = next(blocks)
+    assert first.number == 0 and first.starts == [0] * 4
+    rows = {name: [row] for name, row in zip(first.names, first.rows())}
+    for block in blocks:
+        assert block.sizes == [len(row.replace("-", "")) for row in block.rows()]
+        for name, start, row in zip(block.names, block.starts, block.rows()):
+            assert start == sum(len(part.replace("-", "")) for part in rows[name])
+            rows[name].append(row)
+    assert {name: "".join(parts).replace("-", "") for name, parts in rows.items()} == workload.sequences
+
+    profile = planner.execute(BandedAlignmentPlugin(), AlignmentMethod.DEBRUIJNGRAPH).profile()
+    assert {name: "".join(parts) for name, parts in rows.items()} == dict(zip(profile.names, profile.rows()))
+
+
+def test_write_fasta_spools_blocks(tmp_path):
+    workload, planner = _planner()
+    path = tmp_path / "aligned.fasta"
+    written = write_fasta(planner.blocks(BandedAlignmentPlugin(), AlignmentMethod.BRAIDEDDEBRUIJGRAPH), path, width=50)
+    assert written > 1
+    aligned = read_fasta(path)
+    assert {name: row.replace("-", "") for name, row in aligned.items()} == workload.sequences
+    assert len({len(row) for row in aligned.values()}) == 1
+    assert all(len(line) <= 50 for line in path.read_text().splitlines())
+
+
+def test_write_maf():
+    workload, planner = _planner()
+    stream = io.StringIO()
+    written = write_maf(planner.blocks(BandedAlignmentPlugin(), AlignmentMethod.DEBRUIJNGRAPH), stream, planner.pog)
+    paragraphs = stream.getvalue().split("\n\n")
+    assert paragraphs[0] == "##maf version=1"
+    assert written == len([p for p in paragraphs[1:] if p.strip()])
+    sequences = {name: "" for name in workload.sequences}
+    for paragraph in paragraphs[1:]:
+        for line in paragraph.splitlines()[1:]:
+            _, name, start, size, strand, source_size, row = line.split()
+            assert int(start) == len(sequences[name])
+            assert int(size) == len(row.replace("-", ""))
+            assert int(source_size) == len(workload.sequences[name])
+            sequences[name] += row.replace("-", "")
+    assert sequences == workload.sequences
@@ -0,0 +1,43 @@
+import cogent3
+import pytest
+from dbg_align import DeBruijnGraph, POG_Bubble
+from dbg_align.synthetic import generate
+
+
+@pytest.mark.parametrize("seed,tree", [(1, False), (2, True), (3, True)])
+def test_expected_properties(seed, tree):
+    workload = generate(6, 400, kmer_length=11, snp_rate=0.02, indel_rate=0.01, tree=tree, seed=seed)
+    dbg = DeBruijnGraph(workload.kmer_length)
+    dbg.add_sequence(workload.sequences)
+    assert len(dbg.graph) == workload.expected_nodes
+    assert workload.cycle_count == 0
+    assert not dbg.has_cycles()
+    pog = dbg.to_pog()
+    assert sum(isinstance(segment, POG_Bubble) for segment in pog.segments()) == workload.expected_bubbles
+    for index, sequence in enumerate(workload.as_list(), 1):
+        assert pog[index] == sequence
+
+def test_generator_is_seeded():
+    assert generate(4, 200, seed=5).sequences == generate(4, 200, seed=5).sequences
+    assert generate(4, 200, seed=5).sequences != generate(4, 200, seed=6).sequences
+
+def test_true_alignment():
+    workload = generate(5, 300, snp_rate=0.02, indel_rate=0.02, seed=4)
+    rows = workload.alignment()
+    assert len({len(row) for row in rows.values()}) == 1
+    assert {name: row.replace("-", "") for name, row in rows.items()} == workload.sequences
+
+def test_tandem_repeats():
+    workload = generate(3, 300, kmer_length=11, tandem_repeats=2, repeat_unit=4, repeat_copies=5, seed=2)
+    assert all(count > 0 for count in workload.cycles.values())
+    assert workload.expected_bubbles is None
+    dbg = DeBruijnGraph(workload.kmer_length)
+    dbg.add_sequence(workload.sequences)
+    assert dbg.has_cycles() and workload.cycle_count == dbg.cycle_edge_count == dbg.stats().cycles
+    assert len(dbg.graph) == workload.expected_nodes
+
+def test_as_collection():
+    workload = generate(3, 100, seed=1)
+    collection = workload.as_collection()
+    assert isinstance(collection, cogent3.SequenceCollection)
+    assert collection.names == workload.names